@@ -1,14 +1,16 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.contrib.auth.models import AbstractUser
-from django.db import models
-from django.db.models.signals import post_save
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     bio = models.TextField(max_length=500, blank=True)
     profile_image = models.ImageField(upload_to='profile_images/', blank=True, null=True)
+    # Resized copies of profile_image, filled in by the derivatives task
+    profile_image_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     date_joined = models.DateTimeField(auto_now_add=True)
     
     def __str__(self):
@@ -24,4 +26,41 @@ def create_user_profile(sender, instance, created, **kwargs):
 @receiver(post_save, sender=User)
 def save_user_profile(sender, instance, **kwargs):
     """Save the UserProfile when the User is saved"""
-    instance.profile.save()
\ No newline at end of file
+    instance.profile.save()
+
+@receiver(post_save, sender=UserProfile)
+def queue_profile_image_derivatives(sender, instance, **kwargs):
+    """Generate profile image derivatives in Celery when the image changes"""
+    if (instance.profile_image.name or '') != instance.profile_image_derivatives.get('source', ''):
+        from .tasks import generate_profile_image_derivatives
+        transaction.on_commit(lambda: generate_profile_image_derivatives.delay(instance.pk))
+
+@receiver(post_save, sender='authtoken.Token')
+@receiver(post_delete, sender='authtoken.Token')
+def invalidate_cached_token(sender, instance, **kwargs):
+    """Drop a changed or deleted token, e.g. on logout, from the token cache"""
+    if kwargs.get('created'):
+        return
+    from portfolio_project.authentication import invalidate_token
+    # The key is the primary key, which a delete resets
+    key = instance.key
+    transaction.on_commit(lambda: invalidate_token(key))
+
+# User fields that decide whether, and with which rights, a cached token
+# authenticates. Saves limited to other fields, such as the last_login
+# update on every login, leave the cached copies alone.
+TOKEN_USER_FIELDS = {'password', 'is_active', 'is_staff', 'is_superuser'}
+
+@receiver(post_save, sender=User)
+def invalidate_cached_user_tokens(sender, instance, created, update_fields=None, **kwargs):
+    """Cached tokens carry a copy of the user, so drop them when it changes"""
+    if created or (update_fields is not None and not TOKEN_USER_FIELDS & set(update_fields)):
+        return
+    from rest_framework.authtoken.models import Token
+    from portfolio_project.authentication import invalidate_token
+    keys = list(Token.objects.filter(user=instance).values_list('key', flat=True))
+
+    def invalidate():
+        for key in keys:
+            invalidate_token(key)
+    transaction.on_commit(invalidate)
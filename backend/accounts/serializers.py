@@ -1,12 +1,15 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
+from portfolio_project.images import ImageDerivativesField
 from .models import UserProfile
 
 class UserProfileSerializer(serializers.ModelSerializer):
+    profile_image_srcset = ImageDerivativesField(source='profile_image_derivatives')
+
     class Meta:
         model = UserProfile
-        fields = ['bio', 'profile_image']
+        fields = ['bio', 'profile_image', 'profile_image_srcset']
 
 class UserSerializer(serializers.ModelSerializer):
     profile = UserProfileSerializer(required=False)
@@ -0,0 +1,12 @@
+from celery import shared_task
+from portfolio_project.images import refresh_derivatives
+from .models import UserProfile
+import logging
+
+logger = logging.getLogger('portfolio')
+
+@shared_task(autoretry_for=(OSError,), retry_backoff=True, max_retries=3)
+def generate_profile_image_derivatives(profile_id):
+    """Generate resized WebP/JPEG copies of a profile image"""
+    refresh_derivatives(UserProfile, profile_id, 'profile_image')
+    return f"Image derivatives generated for profile {profile_id}"
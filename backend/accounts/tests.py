@@ -1,3 +1,87 @@
-from django.test import TestCase
+from django.contrib.auth.models import User, update_last_login
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from portfolio_project.authentication import CachedTokenAuthentication, token_cache_keys
+
+LOCMEM_CACHE = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'accounts-tests',
+    }
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class CachedTokenAuthenticationTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('visitor', 'visitor@example.com', 'password')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_token_is_served_from_the_cache(self):
+        self.assertEqual(self.client.get(reverse('profile')).status_code, status.HTTP_200_OK)
+        # Only the profile serializer queries the database now
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('profile'))
+        self.assertEqual(response.data['username'], 'visitor')
+
+    def test_logout_invalidates_the_token(self):
+        self.client.get(reverse('profile'))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('logout'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(reverse('profile')).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_is_rejected(self):
+        self.client.get(reverse('profile'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertEqual(self.client.get(reverse('profile')).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_last_login_update_keeps_the_cached_token(self):
+        self.client.get(reverse('profile'))
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            update_last_login(None, self.user)
+        self.assertEqual(callbacks, [])
+        with self.assertNumQueries(1):
+            self.client.get(reverse('profile'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save(update_fields=['is_active'])
+        self.assertEqual(self.client.get(reverse('profile')).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_user_is_rejected(self):
+        self.client.get(reverse('profile'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        self.assertEqual(self.client.get(reverse('profile')).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_hash_is_not_cached(self):
+        self.client.get(reverse('profile'))
+        entry = cache.get(token_cache_keys(self.token.key)[0])
+        self.assertNotIn('password', entry['user'])
+        self.assertEqual(entry['user']['username'], 'visitor')
+
+    def test_entry_cached_during_logout_is_ignored(self):
+        # A request that read the token before the logout committed caches it afterwards
+        authentication = CachedTokenAuthentication()
+        entry_key = token_cache_keys(self.token.key)[0]
+        stale = authentication.dump(Token.objects.select_related('user').get(pk=self.token.key), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.token.delete()
+        cache.set(entry_key, stale)
+        self.assertEqual(self.client.get(reverse('profile')).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_session_authentication_still_works(self):
+        client = APIClient()
+        client.force_login(self.user)
+        self.assertEqual(client.get(reverse('profile')).status_code, status.HTTP_200_OK)
@@ -10,6 +10,7 @@ from .serializers import RegisterSerializer, UserSerializer
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.contrib.auth.models import User
+from portfolio_project.authentication import AuthenticationProfileMixin
 
 # @method_decorator(csrf_exempt, name='dispatch')
 class RegisterView(generics.CreateAPIView):
@@ -55,26 +56,32 @@ class LoginView(ObtainAuthToken):
             'errors': serializer.errors
         }, status=status.HTTP_401_UNAUTHORIZED)
 
-class UserProfileView(generics.RetrieveUpdateAPIView):
+class UserProfileView(AuthenticationProfileMixin, generics.RetrieveUpdateAPIView):
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
+    authentication_profile = 'token'
     
     def get_object(self):
         return self.request.user
 
-class UserListView(generics.ListAPIView):
-    queryset = User.objects.all()
+class UserListView(AuthenticationProfileMixin, generics.ListAPIView):
+    queryset = User.objects.select_related('profile').order_by('pk')
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAdminUser]
+    authentication_profile = 'token'
 
-class UserDeleteView(generics.DestroyAPIView):
+class UserDeleteView(AuthenticationProfileMixin, generics.DestroyAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAdminUser]  # Restrict access to admin users
+    authentication_profile = 'token'
 
-class LogoutView(APIView):
+class LogoutView(AuthenticationProfileMixin, APIView):
     permission_classes = [IsAuthenticated]
+    authentication_profile = 'token'
+
     def post(self, request, *args, **kwargs):
-        # Remove the Token associated with the user
+        # Remove the Token associated with the user; deleting it also
+        # drops it from the token cache
         request.user.auth_token.delete()
         return Response({"message": "Successfully logged out"}, status=status.HTTP_200_OK)
\ No newline at end of file
@@ -1,3 +1,49 @@
 from django.contrib import admin
+from django.utils import timezone
+from portfolio_project.admin_pagination import KeysetPaginatedAdminMixin
+from .models import ContactMessage, NewsletterSubscription, normalize_email
 
-# Register your models here.
+
+def status_action(status, label):
+    """Admin action moving the selected messages to ``status`` in one UPDATE"""
+    def action(modeladmin, request, queryset):
+        updated = queryset.update(status=status, updated_at=timezone.now())
+        modeladmin.message_user(request, f'{updated} messages marked as {label.lower()}.')
+
+    action.__name__ = f'mark_{status}'
+    return admin.action(description=f'Mark selected messages as {label.lower()}')(action)
+
+
+@admin.register(ContactMessage)
+class ContactMessageAdmin(KeysetPaginatedAdminMixin, admin.ModelAdmin):
+    list_display = ('subject', 'name', 'email', 'status', 'created_at', 'notified_at')
+    list_filter = ('status',)
+    # Exact matches only; a substring search would scan the whole table
+    search_fields = ('=email',)
+    readonly_fields = ('created_at', 'updated_at', 'notified_at')
+    actions = [status_action(status, label) for status, label in ContactMessage.STATUS_CHOICES]
+
+
+@admin.register(NewsletterSubscription)
+class NewsletterSubscriptionAdmin(KeysetPaginatedAdminMixin, admin.ModelAdmin):
+    list_display = ('email', 'name', 'is_active', 'created_at')
+    list_filter = ('is_active',)
+    search_fields = ('email',)
+    ordering = ('-created_at',)
+    actions = ['activate', 'deactivate']
+
+    def get_search_results(self, request, queryset, search_term):
+        # Emails are stored normalized, so an exact match uses the unique index
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(email=normalize_email(search_term)), False
+
+    @admin.action(description='Resubscribe selected subscribers')
+    def activate(self, request, queryset):
+        updated = queryset.update(is_active=True)
+        self.message_user(request, f'{updated} subscribers resubscribed.')
+
+    @admin.action(description='Unsubscribe selected subscribers')
+    def deactivate(self, request, queryset):
+        updated = queryset.update(is_active=False)
+        self.message_user(request, f'{updated} subscribers unsubscribed.')
@@ -0,0 +1,240 @@
+"""
+Newsletter campaign sending.
+
+Starting a campaign walks the active subscribers in keyset-paged chunks,
+creates a ``CampaignDelivery`` row for each of them and queues one
+``send_campaign_chunk`` task per chunk, so sending spreads over every
+Celery worker. A chunk claims its pending rows with ``SELECT ... FOR
+UPDATE SKIP LOCKED`` and marks them ``sending`` in the same transaction,
+before any email goes out, then sends them over one SMTP connection and
+records the outcome with bulk updates.
+
+Delivery is at most once: a row that was claimed is never sent again.
+Rows left ``sending`` by a crashed worker are marked failed by
+``recover_campaigns`` once ``CLAIM_TIMEOUT`` has passed, while rows that
+were never claimed are queued again, so a campaign always completes
+without anyone getting the email twice.
+
+All workers share one send rate, ``RATE`` emails per second, counted in
+the cache.
+"""
+import logging
+import smtplib
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Campaign, CampaignDelivery, NewsletterSubscription
+
+logger = logging.getLogger('portfolio')
+
+RATE_KEY = 'newsletter:send_rate:{}'
+
+
+def wait_for_send_slot(rate):
+    """Block until sending one more email keeps all workers within ``rate`` per second"""
+    if not rate:
+        return
+    while True:
+        second = int(time.time())
+        key = RATE_KEY.format(second)
+        cache.add(key, 0, timeout=5)
+        try:
+            count = cache.incr(key)
+        except ValueError:
+            # Expired between add and incr
+            continue
+        if count <= rate:
+            return
+        time.sleep(max(second + 1 - time.time(), 0.01))
+
+
+def id_chunks(queryset, chunk_size):
+    """Yield lists of ids from ``queryset`` in ascending keyset-paged chunks"""
+    last_id = 0
+    while True:
+        ids = list(queryset.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size])
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+def campaign_email(campaign, subscription):
+    message = EmailMultiAlternatives(
+        campaign.subject,
+        campaign.body,
+        settings.DEFAULT_FROM_EMAIL,
+        [subscription.email],
+    )
+    if campaign.html_body:
+        message.attach_alternative(campaign.html_body, 'text/html')
+    return message
+
+
+def queue_chunks(campaign, subscription_ids):
+    from .tasks import send_campaign_chunk
+
+    chunks = 0
+    for ids in id_chunks(subscription_ids, settings.NEWSLETTER_CAMPAIGNS['CHUNK_SIZE']):
+        send_campaign_chunk.delay(campaign.pk, ids[0], ids[-1])
+        chunks += 1
+    return chunks
+
+
+def start_campaign(campaign_id):
+    """
+    Create the deliveries of a draft campaign and queue its chunks. The
+    deliveries are created in the same transaction that marks the campaign
+    as sending, so no chunk can finish the campaign before every delivery
+    exists.
+    """
+    from .tasks import send_campaign_chunk
+
+    chunk_size = settings.NEWSLETTER_CAMPAIGNS['CHUNK_SIZE']
+    ranges = []
+    with transaction.atomic():
+        campaign = Campaign.objects.select_for_update().get(pk=campaign_id)
+        if campaign.status != 'draft':
+            logger.warning(f"Campaign {campaign_id} is {campaign.status}, not starting it")
+            return 0
+        campaign.status = 'sending'
+        campaign.started_at = timezone.now()
+        campaign.save(update_fields=['status', 'started_at'])
+
+        for ids in id_chunks(NewsletterSubscription.objects.filter(is_active=True), chunk_size):
+            CampaignDelivery.objects.bulk_create([CampaignDelivery(campaign=campaign, subscription_id=pk) for pk in ids])
+            ranges.append((ids[0], ids[-1]))
+
+    # Chunks that fail to queue are picked up by recover_campaigns
+    for first_id, last_id in ranges:
+        send_campaign_chunk.delay(campaign.pk, first_id, last_id)
+
+    logger.info(f"Started campaign {campaign.pk} in {len(ranges)} chunks")
+    finish_if_done(campaign.pk)
+    return len(ranges)
+
+
+def resume_campaign(campaign):
+    """Queue the pending deliveries of a sending campaign again and return the number of chunks"""
+    pending = NewsletterSubscription.objects.filter(deliveries__campaign=campaign, deliveries__status='pending')
+    chunks = queue_chunks(campaign, pending)
+    finish_if_done(campaign.pk)
+    return chunks
+
+
+def claim(campaign_id, first_id, last_id):
+    """Mark the pending deliveries in the range ``sending`` and return them"""
+    with transaction.atomic():
+        deliveries = list(
+            CampaignDelivery.objects.select_for_update(skip_locked=True, of=('self',))
+            .select_related('subscription')
+            .filter(campaign_id=campaign_id, status='pending', subscription__gte=first_id, subscription__lte=last_id)
+            .order_by('subscription_id')
+        )
+        CampaignDelivery.objects.filter(pk__in=[d.pk for d in deliveries]).update(
+            status='sending', claimed_at=timezone.now(),
+        )
+    return deliveries
+
+
+def record(deliveries):
+    """Store the outcome of sent, failed and skipped deliveries"""
+    now = timezone.now()
+    for delivery in deliveries:
+        if delivery.status == 'sent':
+            delivery.sent_at = now
+    CampaignDelivery.objects.bulk_update(deliveries, ['status', 'sent_at', 'error'])
+
+
+def send_chunk(campaign_id, first_id, last_id):
+    """
+    Send the campaign to the pending subscribers with ids in
+    ``[first_id, last_id]`` and return ``{status: count}``.
+    """
+    campaign = Campaign.objects.get(pk=campaign_id)
+    if campaign.status != 'sending':
+        return {}
+    deliveries = claim(campaign_id, first_id, last_id)
+    if not deliveries:
+        return {}
+
+    rate = settings.NEWSLETTER_CAMPAIGNS['RATE']
+    done = []
+    in_flight = None
+    connection = get_connection()
+    try:
+        connection.open()
+        for delivery in deliveries:
+            if not delivery.subscription.is_active:
+                delivery.status = 'skipped'
+            else:
+                wait_for_send_slot(rate)
+                in_flight = delivery.pk
+                try:
+                    connection.send_messages([campaign_email(campaign, delivery.subscription)])
+                    delivery.status = 'sent'
+                except (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError) as e:
+                    # Rejected for this recipient only
+                    delivery.status = 'failed'
+                    delivery.error = str(e)
+                in_flight = None
+            done.append(delivery)
+    finally:
+        connection.close()
+        record(done)
+        # Deliveries never attempted go back to the queue. One that failed
+        # mid-send stays claimed, since the server may have accepted it.
+        attempted = {delivery.pk for delivery in done} | {in_flight}
+        CampaignDelivery.objects.filter(
+            pk__in=[delivery.pk for delivery in deliveries if delivery.pk not in attempted],
+        ).update(status='pending', claimed_at=None)
+
+    finish_if_done(campaign_id)
+    counts = {}
+    for delivery in done:
+        counts[delivery.status] = counts.get(delivery.status, 0) + 1
+    return counts
+
+
+def finish_if_done(campaign_id):
+    if CampaignDelivery.objects.filter(campaign_id=campaign_id, status__in=['pending', 'sending']).exists():
+        return False
+    finished = Campaign.objects.filter(pk=campaign_id, status='sending').update(
+        status='sent', finished_at=timezone.now(),
+    )
+    if finished:
+        logger.info(f"Campaign {campaign_id} finished")
+    return bool(finished)
+
+
+def recover_campaigns():
+    """
+    Fail deliveries a crashed worker left claimed, and queue the pending
+    ones again for campaigns that made no progress within
+    ``CLAIM_TIMEOUT``. Returns the number of chunks queued.
+    """
+    stale = timezone.now() - timedelta(seconds=settings.NEWSLETTER_CAMPAIGNS['CLAIM_TIMEOUT'])
+    chunks = 0
+    for campaign in Campaign.objects.filter(status='sending'):
+        interrupted = CampaignDelivery.objects.filter(
+            campaign=campaign, status='sending', claimed_at__lt=stale,
+        ).update(status='failed', error='Interrupted while sending; not retried to avoid sending twice')
+        if interrupted:
+            logger.warning(f"Campaign {campaign.pk}: {interrupted} deliveries interrupted while sending")
+
+        # Chunks are still being worked through; queueing them again would
+        # be harmless but wasteful
+        stalled = campaign.started_at < stale and not CampaignDelivery.objects.filter(
+            campaign=campaign, claimed_at__gte=stale,
+        ).exists()
+        if stalled:
+            chunks += resume_campaign(campaign)
+        else:
+            finish_if_done(campaign.pk)
+    return chunks
@@ -0,0 +1,222 @@
+"""
+Write-behind ingestion of contact messages and newsletter subscriptions.
+
+With ``CONTACT_INGESTION['MODE']`` set to ``stream``, the views validate a
+submission, append it to a Redis stream and answer ``202 Accepted``
+without touching the database. ``drain_contact_ingestion`` reads the
+stream through a consumer group and inserts each batch with one
+``bulk_create`` per model, running side effects such as admin
+notifications once per batch.
+
+Entries are acknowledged and deleted only after their batch commits.
+Entries a crashed consumer read but never acknowledged are taken over
+after ``CLAIM_IDLE`` seconds. ``submit`` stamps each entry with a random
+id and its submission time, which contact messages store as
+``submission_id`` and ``created_at``; the pair is unique, and
+subscriptions are upserts, so a batch that is written twice, even by two
+consumers at once, is stored once. Entries that cannot be written are
+moved to a dead-letter stream instead of blocking the ones behind them.
+When Redis is unreachable the views insert directly, as in ``direct``
+mode.
+"""
+import json
+import logging
+import os
+import socket
+import uuid
+from datetime import timedelta
+
+import redis
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import InterfaceError, OperationalError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from portfolio_project.redis_client import get_redis
+from .models import ContactMessage
+from .subscriptions import subscribe_many
+
+logger = logging.getLogger('portfolio')
+
+DRAIN_SCHEDULED_KEY = 'contact:ingest:scheduled'
+
+
+def is_enabled():
+    return settings.CONTACT_INGESTION['MODE'] == 'stream'
+
+
+def get_client():
+    return get_redis(settings.CONTACT_INGESTION['REDIS_URL'])
+
+
+def dead_letter_stream():
+    return f"{settings.CONTACT_INGESTION['STREAM']}:dead"
+
+
+def submit(kind, data):
+    """
+    Buffer validated ``data`` of ``kind`` (``contact`` or ``newsletter``).
+    Returns ``False`` if it could not be buffered and must be saved directly.
+    """
+    entry = {
+        'kind': kind,
+        'id': uuid.uuid4().hex,
+        'created_at': timezone.now().isoformat(),
+        'data': json.dumps(data, cls=DjangoJSONEncoder),
+    }
+    try:
+        get_client().xadd(settings.CONTACT_INGESTION['STREAM'], entry)
+    except redis.RedisError as e:
+        logger.error(f"Failed to buffer {kind} submission, saving it directly: {str(e)}")
+        return False
+    schedule_drain()
+    return True
+
+
+def schedule_drain():
+    """Drain after ``DRAIN_DELAY`` seconds, once for a whole burst"""
+    from .tasks import drain_contact_ingestion
+
+    delay = settings.CONTACT_INGESTION['DRAIN_DELAY']
+    try:
+        if cache.add(DRAIN_SCHEDULED_KEY, True, timeout=max(delay * 10, 10)):
+            drain_contact_ingestion.apply_async(countdown=delay)
+    except Exception as e:
+        # The periodic drain picks the entry up later
+        cache.delete(DRAIN_SCHEDULED_KEY)
+        logger.error(f"Failed to schedule ingestion drain: {str(e)}")
+
+
+def ensure_group(client):
+    options = settings.CONTACT_INGESTION
+    try:
+        client.xgroup_create(options['STREAM'], options['GROUP'], id='0', mkstream=True)
+    except redis.ResponseError as e:
+        if 'BUSYGROUP' not in str(e):
+            raise
+
+
+def decode(fields):
+    fields = {key.decode(): value.decode() for key, value in fields.items()}
+    return {
+        'kind': fields['kind'],
+        'id': fields['id'],
+        # Missing on entries buffered before submission times were recorded
+        'created_at': parse_datetime(fields['created_at']) if 'created_at' in fields else None,
+        'data': json.loads(fields['data']),
+    }
+
+
+def read_batch(client, consumer):
+    """Return ``[(entry id, fields)]``, abandoned entries first"""
+    options = settings.CONTACT_INGESTION
+    claimed = client.xautoclaim(
+        options['STREAM'], options['GROUP'], consumer,
+        min_idle_time=options['CLAIM_IDLE'] * 1000, start_id='0-0', count=options['BATCH_SIZE'],
+    )[1]
+    # Entries deleted while pending come back without fields
+    claimed = [(entry_id, fields) for entry_id, fields in claimed if fields]
+    if claimed:
+        return claimed
+    response = client.xreadgroup(options['GROUP'], consumer, {options['STREAM']: '>'}, count=options['BATCH_SIZE'])
+    return response[0][1] if response else []
+
+
+def write_batch(entries):
+    """Insert decoded entries, one ``bulk_create`` per model"""
+    from .tasks import schedule_notifications
+
+    messages = [
+        ContactMessage(
+            submission_id=uuid.UUID(entry['id']), created_at=entry.get('created_at') or timezone.now(), **entry['data'],
+        )
+        for entry in entries if entry['kind'] == 'contact'
+    ]
+    subscriptions = [entry['data'] for entry in entries if entry['kind'] == 'newsletter']
+    unknown = [entry for entry in entries if entry['kind'] not in ('contact', 'newsletter')]
+    if unknown:
+        raise ValueError(f"Unknown submission kind {unknown[0]['kind']}")
+
+    inserted = []
+    with transaction.atomic():
+        if messages:
+            # Skip what an earlier delivery already inserted; redelivered
+            # entries arrive within minutes, so only recent partitions need
+            # checking. A consumer writing the same entries concurrently is
+            # caught by the unique (submission_id, created_at) instead.
+            since = min([m.created_at for m in messages] + [timezone.now() - timedelta(days=1)])
+            existing = set(ContactMessage.objects.filter(
+                submission_id__in=[message.submission_id for message in messages], created_at__gte=since,
+            ).values_list('submission_id', flat=True))
+            inserted = [m for m in messages if m.submission_id not in existing]
+            ContactMessage.objects.bulk_create(inserted, ignore_conflicts=True)
+            transaction.on_commit(schedule_notifications)
+        if subscriptions:
+            subscribe_many(subscriptions)
+
+    logger.info(
+        f"Ingested {len(inserted)} contact messages, skipped {len(messages) - len(inserted)} already stored, "
+        f"and upserted {len(subscriptions)} newsletter subscriptions"
+    )
+
+
+def write_or_dead_letter(client, batch):
+    """
+    Write ``batch``, moving entries that fail on their own to the
+    dead-letter stream. Database outages propagate and leave the whole
+    batch unacknowledged.
+    """
+    try:
+        write_batch([entry for _, entry in batch])
+        return
+    except (OperationalError, InterfaceError):
+        raise
+    except Exception as e:
+        logger.warning(f"Ingestion batch failed, retrying entries one by one: {str(e)}")
+
+    for entry_id, entry in batch:
+        try:
+            write_batch([entry])
+        except (OperationalError, InterfaceError):
+            raise
+        except Exception as e:
+            logger.error(f"Moving ingestion entry {entry_id} to {dead_letter_stream()}: {str(e)}")
+            fields = {
+                'kind': entry['kind'], 'id': entry['id'],
+                'data': json.dumps(entry['data'], cls=DjangoJSONEncoder), 'error': str(e),
+            }
+            if entry.get('created_at') is not None:
+                fields['created_at'] = entry['created_at'].isoformat()
+            client.xadd(dead_letter_stream(), fields)
+
+
+def drain():
+    """Insert everything buffered in the stream and return the number of entries"""
+    options = settings.CONTACT_INGESTION
+    client = get_client()
+    ensure_group(client)
+    consumer = f'{socket.gethostname()}-{os.getpid()}'
+    cache.delete(DRAIN_SCHEDULED_KEY)
+
+    total = 0
+    while True:
+        entries = read_batch(client, consumer)
+        if not entries:
+            break
+        batch = []
+        for entry_id, fields in entries:
+            try:
+                batch.append((entry_id, decode(fields)))
+            except (KeyError, ValueError) as e:
+                logger.error(f"Moving malformed ingestion entry {entry_id} to {dead_letter_stream()}: {str(e)}")
+                client.xadd(dead_letter_stream(), {**fields, b'error': str(e)})
+
+        write_or_dead_letter(client, batch)
+        entry_ids = [entry_id for entry_id, _ in entries]
+        client.xack(options['STREAM'], options['GROUP'], *entry_ids)
+        client.xdel(options['STREAM'], *entry_ids)
+        total += len(entries)
+
+    return total
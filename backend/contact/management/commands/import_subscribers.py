@@ -0,0 +1,53 @@
+import csv
+import sys
+import time
+from django.core.management.base import BaseCommand, CommandError
+from contact.subscriptions import (
+    DEFAULT_BATCH_SIZE, INVALID, WRITERS, SubscriberImportError, import_subscribers, read_csv,
+)
+
+class Command(BaseCommand):
+    help = 'Imports newsletter subscribers from CSV files with an "email" (and optional "name") column'
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='+', help='CSV files to import, - for stdin')
+        parser.add_argument('--method', choices=sorted(WRITERS), default='copy',
+                            help='copy: COPY into a staging table; bulk: bulk_create(ignore_conflicts=True)')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--report', help='Write the result of every row to this CSV file')
+
+    def handle(self, *args, **options):
+        def rows():
+            for path in options['files']:
+                if path == '-':
+                    yield from read_csv(sys.stdin)
+                    continue
+                with open(path, newline='', encoding='utf-8-sig') as source:
+                    yield from read_csv(source)
+
+        started = time.monotonic()
+        try:
+            report = import_subscribers(rows(), method=options['method'], batch_size=options['batch_size'])
+        except (OSError, SubscriberImportError) as e:
+            raise CommandError(str(e))
+
+        if options['report']:
+            with open(options['report'], 'w', newline='', encoding='utf-8') as output:
+                writer = csv.writer(output)
+                writer.writerow(['row', 'email', 'status', 'errors'])
+                for number, email, status, errors in report.results:
+                    writer.writerow([number, email, status, self.format_errors(errors)])
+        else:
+            for number, email, status, errors in report.results:
+                if status == INVALID:
+                    self.stdout.write(self.style.ERROR(f'Row {number}: {self.format_errors(errors)}'))
+
+        summary = report.summary()
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {summary['created']} subscribers ({summary['existing']} already subscribed, "
+            f"{summary['duplicate']} duplicate and {summary['invalid']} invalid rows) in {elapsed:.2f}s"
+        ))
+
+    def format_errors(self, errors):
+        return '; '.join(f"{name}: {' '.join(messages)}" for name, messages in errors.items())
@@ -0,0 +1,33 @@
+import argparse
+import datetime
+import json
+from django.core.management.base import BaseCommand, CommandError
+from contact.partitions import search_archives
+
+class Command(BaseCommand):
+    help = 'Searches the archived contact messages and prints the matches as NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', help='Exact sender address')
+        parser.add_argument('--text', help='Text contained in the subject or message')
+        parser.add_argument('--since', type=self.parse_month, help='First month to search, YYYY-MM')
+        parser.add_argument('--until', type=self.parse_month, help='Last month to search, YYYY-MM')
+        parser.add_argument('--limit', type=int, default=100, help='Stop after this many matches, 0 for all')
+
+    def parse_month(self, value):
+        try:
+            return datetime.datetime.strptime(value, '%Y-%m').date()
+        except ValueError:
+            raise argparse.ArgumentTypeError(f'Invalid month "{value}", expected YYYY-MM')
+
+    def handle(self, *args, **options):
+        if not options['email'] and not options['text']:
+            raise CommandError('Give --email, --text or both')
+
+        found = 0
+        for row in search_archives(options['email'], options['text'], options['since'], options['until']):
+            self.stdout.write(json.dumps(row))
+            found += 1
+            if found == options['limit']:
+                break
+        self.stderr.write(f'{found} archived messages found')
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from contact.campaigns import resume_campaign
+from contact.models import Campaign
+from contact.tasks import start_newsletter_campaign
+
+class Command(BaseCommand):
+    help = 'Starts sending a newsletter campaign through the Celery workers, or resumes one that is sending'
+
+    def add_arguments(self, parser):
+        parser.add_argument('campaign_id', type=int)
+
+    def handle(self, *args, **options):
+        try:
+            campaign = Campaign.objects.get(pk=options['campaign_id'])
+        except Campaign.DoesNotExist:
+            raise CommandError(f"Campaign {options['campaign_id']} does not exist")
+        if campaign.status not in ('draft', 'sending'):
+            raise CommandError(f'Campaign "{campaign}" is already {campaign.status}')
+
+        if campaign.status == 'sending':
+            chunks = resume_campaign(campaign)
+            self.stdout.write(self.style.SUCCESS(
+                f'Resumed campaign "{campaign}": queued {chunks} chunks of pending deliveries'
+            ))
+            return
+
+        start_newsletter_campaign.delay(campaign.pk)
+        self.stdout.write(self.style.SUCCESS(f'Queued campaign "{campaign}"'))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from contact.spam import filter_stats, reset_stats
+
+class Command(BaseCommand):
+    help = 'Reports the contact spam filter counters, memory and estimated false positive rate'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after reporting')
+
+    def handle(self, *args, **options):
+        stats = filter_stats()
+        for name, value in stats.items():
+            if name == 'false_positive_rate':
+                value = f'{value:.6%}'
+            self.stdout.write(f"{name.replace('_', ' ').capitalize()}: {value}")
+        if options['reset']:
+            reset_stats()
+            self.stdout.write(self.style.SUCCESS('Counters reset'))
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("contact", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="contactmessage",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="contact_msg_keyset_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("contact", "0002_contactmessage_keyset_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="contactmessage",
+            name="notified_at",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="contactmessage",
+            index=models.Index(
+                condition=models.Q(("notified_at__isnull", True)),
+                fields=["created_at"],
+                name="contact_msg_pending_idx",
+            ),
+        ),
+        # Messages saved before this change were already emailed
+        migrations.RunSQL(
+            "UPDATE contact_contactmessage SET notified_at = created_at",
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:56
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("contact", "0003_contactmessage_notified_at"),
+    ]
+
+    operations = [
+        # Merge addresses that only differ in case into the oldest row,
+        # keeping it active if any of them was, then lower-case the rest
+        migrations.RunSQL(
+            """
+            UPDATE contact_newslettersubscription SET is_active = true
+            WHERE id IN (
+                SELECT min(id) FROM contact_newslettersubscription
+                GROUP BY lower(trim(email)) HAVING bool_or(is_active)
+            );
+            DELETE FROM contact_newslettersubscription duplicate
+            USING contact_newslettersubscription original
+            WHERE lower(trim(duplicate.email)) = lower(trim(original.email)) AND duplicate.id > original.id;
+            UPDATE contact_newslettersubscription SET email = lower(trim(email))
+            WHERE email <> lower(trim(email));
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("contact", "0006_contactmessage_submission_id"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="contactmessage",
+            index=models.Index(
+                fields=["status", "-created_at", "-id"], name="contact_msg_status_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="newslettersubscription",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="contact_sub_keyset_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="newslettersubscription",
+            index=models.Index(
+                fields=["is_active", "-created_at", "-id"],
+                name="contact_sub_active_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,95 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:05
+
+from django.db import migrations, models
+
+COLUMNS = (
+    "id, name, email, phone, subject, message, status, "
+    "created_at, updated_at, notified_at, submission_id"
+)
+
+INDEXES = [
+    "CREATE INDEX contact_msg_keyset_idx ON contact_contactmessage (created_at DESC, id DESC)",
+    "CREATE INDEX contact_msg_status_idx ON contact_contactmessage (status, created_at DESC, id DESC)",
+    "CREATE INDEX contact_msg_pending_idx ON contact_contactmessage (created_at) WHERE notified_at IS NULL",
+    "CREATE INDEX contact_msg_submission_idx ON contact_contactmessage (submission_id)",
+]
+
+# The primary key of a partitioned table has to include the partition key.
+# Copies the whole table in the migration transaction, holding an exclusive
+# lock that blocks contact writes until it commits; see "Contact Message
+# Partitioning" in the README before running it on a large table.
+PARTITION_SQL = [
+    """
+    CREATE TABLE contact_contactmessage_partitioned (
+        id bigint NOT NULL,
+        name varchar(100) NOT NULL,
+        email varchar(254) NOT NULL,
+        phone varchar(20) NOT NULL,
+        subject varchar(200) NOT NULL,
+        message text NOT NULL,
+        status varchar(20) NOT NULL,
+        created_at timestamp with time zone NOT NULL,
+        updated_at timestamp with time zone NOT NULL,
+        notified_at timestamp with time zone NULL,
+        submission_id uuid NULL,
+        PRIMARY KEY (id, created_at)
+    ) PARTITION BY RANGE (created_at)
+    """,
+    "CREATE TABLE contact_contactmessage_default PARTITION OF contact_contactmessage_partitioned DEFAULT",
+    """
+    DO $$
+    DECLARE
+        month timestamp := date_trunc('month', coalesce(
+            (SELECT min(created_at) FROM contact_contactmessage), now()) AT TIME ZONE 'UTC');
+    BEGIN
+        WHILE month <= date_trunc('month', now() AT TIME ZONE 'UTC') + interval '3 months' LOOP
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF contact_contactmessage_partitioned FOR VALUES FROM (%L) TO (%L)',
+                'contact_contactmessage_p' || to_char(month, 'YYYYMM'),
+                month AT TIME ZONE 'UTC',
+                (month + interval '1 month') AT TIME ZONE 'UTC'
+            );
+            month := month + interval '1 month';
+        END LOOP;
+    END $$
+    """,
+    f"INSERT INTO contact_contactmessage_partitioned ({COLUMNS}) SELECT {COLUMNS} FROM contact_contactmessage",
+    "DROP TABLE contact_contactmessage",
+    "ALTER TABLE contact_contactmessage_partitioned RENAME TO contact_contactmessage",
+    "CREATE SEQUENCE contact_contactmessage_id_seq OWNED BY contact_contactmessage.id",
+    "SELECT setval('contact_contactmessage_id_seq', coalesce((SELECT max(id) FROM contact_contactmessage), 0) + 1, false)",
+    "ALTER TABLE contact_contactmessage ALTER COLUMN id SET DEFAULT nextval('contact_contactmessage_id_seq')",
+    *INDEXES,
+]
+
+UNPARTITION_SQL = [
+    "CREATE TABLE contact_contactmessage_plain (LIKE contact_contactmessage INCLUDING DEFAULTS)",
+    "ALTER SEQUENCE contact_contactmessage_id_seq OWNED BY NONE",
+    f"INSERT INTO contact_contactmessage_plain ({COLUMNS}) SELECT {COLUMNS} FROM contact_contactmessage",
+    "DROP TABLE contact_contactmessage",
+    "ALTER TABLE contact_contactmessage_plain RENAME TO contact_contactmessage",
+    "ALTER TABLE contact_contactmessage ADD PRIMARY KEY (id)",
+    "ALTER SEQUENCE contact_contactmessage_id_seq OWNED BY contact_contactmessage.id",
+    *INDEXES,
+]
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("contact", "0007_admin_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="contactmessage",
+            name="submission_id",
+            field=models.UUIDField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="contactmessage",
+            index=models.Index(
+                fields=["submission_id"], name="contact_msg_submission_idx"
+            ),
+        ),
+        migrations.RunSQL(PARTITION_SQL, UNPARTITION_SQL),
+    ]
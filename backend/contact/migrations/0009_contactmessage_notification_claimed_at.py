@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("contact", "0008_partition_contactmessage"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="contactmessage",
+            name="notification_claimed_at",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:33
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("contact", "0009_contactmessage_notification_claimed_at"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="contactmessage",
+            name="contact_msg_submission_idx",
+        ),
+        migrations.AlterField(
+            model_name="contactmessage",
+            name="created_at",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now, editable=False
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="contactmessage",
+            unique_together={("submission_id", "created_at")},
+        ),
+    ]
@@ -1,11 +1,18 @@
 # contact/models.py
 import logging
-from django.db import models
-from django.core.mail import send_mail
-from django.conf import settings
+from django.db import models, transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
 
 logger = logging.getLogger('portfolio')
 
+
+def normalize_email(email):
+    """Newsletter addresses are compared case-insensitively"""
+    return email.strip().lower()
+
+
 class ContactMessage(models.Model):
     STATUS_CHOICES = (
         ('new', 'New'),
@@ -20,11 +27,36 @@ class ContactMessage(models.Model):
     subject = models.CharField(max_length=200)
     message = models.TextField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='new')
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add, so buffered submissions keep the time they were
+    # submitted and a redelivered entry lands on the same row
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
     updated_at = models.DateTimeField(auto_now=True)
+    # Set once the admin notification email has been sent
+    notified_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # Set while a notification run is sending the email
+    notification_claimed_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # Id of the buffered submission, so a redelivered entry is inserted once
+    submission_id = models.UUIDField(null=True, blank=True, editable=False)
     
     class Meta:
         ordering = ['-created_at']
+        # The table is partitioned by month on created_at (see
+        # contact.partitions), so its primary key is (id, created_at) and
+        # it cannot have unique constraints without created_at
+        # A redelivered buffered submission conflicts with its first insert.
+        # Not a UniqueConstraint, which makes DRF 3.18 fail on Django 4.2
+        # when it builds ContactMessageSerializer.
+        unique_together = [('submission_id', 'created_at')]
+        indexes = [
+            # Serves the default ordering plus the keyset tie-breaker
+            models.Index(fields=['-created_at', '-id'], name='contact_msg_keyset_idx'),
+            # The admin inbox filtered by status, newest first
+            models.Index(fields=['status', '-created_at', '-id'], name='contact_msg_status_idx'),
+            # Messages still waiting for their notification
+            models.Index(
+                fields=['created_at'], condition=models.Q(notified_at__isnull=True), name='contact_msg_pending_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"Message from {self.name}: {self.subject}"
@@ -35,18 +67,6 @@ class ContactMessage(models.Model):
         
         if is_new:
             logger.info(f"New contact message received from: {self.email}")
-            # Send email notification to admin
-            try:
-                send_mail(
-                    f'New Contact Form Submission: {self.subject}',
-                    f'Name: {self.name}\nEmail: {self.email}\nPhone: {self.phone}\n\nMessage:\n{self.message}',
-                    settings.DEFAULT_FROM_EMAIL,
-                    [settings.ADMIN_EMAIL],
-                    fail_silently=False,
-                )
-                logger.info(f"Notification email sent for message from: {self.email}")
-            except Exception as e:
-                logger.error(f"Failed to send notification email: {str(e)}")
 
 
 class NewsletterSubscription(models.Model):
@@ -54,13 +74,83 @@ class NewsletterSubscription(models.Model):
     name = models.CharField(max_length=100, blank=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Admin changelist, all or filtered by is_active, newest first
+            models.Index(fields=['-created_at', '-id'], name='contact_sub_keyset_idx'),
+            models.Index(fields=['is_active', '-created_at', '-id'], name='contact_sub_active_idx'),
+        ]
     
     def __str__(self):
         return self.email
     
     def save(self, *args, **kwargs):
         is_new = self.pk is None
+        self.email = normalize_email(self.email)
         super().save(*args, **kwargs)
         
         if is_new:
             logger.info(f"New newsletter subscription: {self.email}")
+
+
+class Campaign(models.Model):
+    STATUS_CHOICES = (
+        ('draft', 'Draft'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('cancelled', 'Cancelled'),
+    )
+
+    subject = models.CharField(max_length=200)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='draft')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True, editable=False)
+    finished_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return self.subject
+
+
+class CampaignDelivery(models.Model):
+    """One row per campaign and recipient, created when the campaign starts"""
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        # Claimed by a worker; never sent again, see contact.campaigns
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+        ('skipped', 'Skipped'),
+    )
+
+    campaign = models.ForeignKey(Campaign, on_delete=models.CASCADE, related_name='deliveries')
+    subscription = models.ForeignKey(NewsletterSubscription, on_delete=models.CASCADE, related_name='deliveries')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['campaign', 'subscription'], name='contact_delivery_unique'),
+        ]
+        indexes = [
+            # Chunks claim their pending rows by subscription id range
+            models.Index(fields=['campaign', 'status', 'subscription'], name='contact_delivery_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.campaign} to {self.subscription}"
+
+
+@receiver(post_save, sender=ContactMessage)
+def queue_contact_notification(sender, instance, created, **kwargs):
+    """Email the admins from Celery once the message is committed"""
+    if created:
+        from .tasks import schedule_notifications
+        transaction.on_commit(schedule_notifications)
@@ -0,0 +1,218 @@
+"""
+Monthly partitions and archives of contact messages.
+
+``contact_contactmessage`` is range partitioned on ``created_at`` with
+one partition per month, named ``contact_contactmessage_pYYYYMM``, plus a
+default partition for rows outside them. ``ensure_partitions`` creates
+the partitions for the coming months ahead of time; creating a partition
+moves its rows out of the default partition.
+
+Partitions older than ``RETENTION_MONTHS`` are archived: their rows are
+read in primary key order, in batches, into a gzipped NDJSON file that is
+uploaded to the archive storage, and only then is the partition detached
+and dropped, all in one transaction holding a share lock on the
+partition. ``search_archives`` scans the archives line by line.
+"""
+import datetime
+import gzip
+import json
+import logging
+import os
+import re
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import ContactMessage
+
+logger = logging.getLogger('portfolio')
+
+PARENT_TABLE = ContactMessage._meta.db_table
+DEFAULT_PARTITION = f'{PARENT_TABLE}_default'
+PARTITION_PATTERN = re.compile(rf'^{PARENT_TABLE}_p(\d{{4}})(\d{{2}})$')
+ARCHIVE_PATTERN = re.compile(r'^contact-messages-(\d{4})-(\d{2})\.ndjson\.gz$')
+
+
+def add_months(month, months):
+    """First day of the month ``months`` after the one ``month`` is in"""
+    index = month.year * 12 + month.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'{PARENT_TABLE}_p{month:%Y%m}'
+
+
+def archive_name(month):
+    return f"{settings.CONTACT_ARCHIVE['PREFIX']}/contact-messages-{month:%Y-%m}.ndjson.gz"
+
+
+def get_storage():
+    storage_class = settings.CONTACT_ARCHIVE['STORAGE']
+    return import_string(storage_class)() if storage_class else default_storage
+
+
+def list_partitions():
+    """Return ``[(month, table name)]`` of the monthly partitions, oldest first"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "WHERE parent.relname = %s",
+            [PARENT_TABLE],
+        )
+        names = [name for (name,) in cursor.fetchall()]
+    partitions = []
+    for name in names:
+        match = PARTITION_PATTERN.match(name)
+        if match:
+            partitions.append((datetime.date(int(match[1]), int(match[2]), 1), name))
+    return sorted(partitions)
+
+
+def create_partition(month):
+    """
+    Create the partition for ``month``, moving any of its rows that landed
+    in the default partition into it.
+    """
+    name = partition_name(month)
+    start = f"{month.isoformat()} 00:00+00"
+    end = f"{add_months(month, 1).isoformat()} 00:00+00"
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS)')
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE created_at >= %s AND created_at < %s RETURNING *) '
+            f'INSERT INTO {name} SELECT * FROM moved',
+            [start, end],
+        )
+        cursor.execute(f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} FOR VALUES FROM ('{start}') TO ('{end}')")
+    logger.info(f"Created contact message partition {name}")
+    return name
+
+
+def ensure_partitions(months_ahead=None):
+    """Create the missing partitions from this month to ``months_ahead`` months ahead"""
+    if months_ahead is None:
+        months_ahead = settings.CONTACT_ARCHIVE['PREMAKE_MONTHS']
+    this_month = timezone.now().date().replace(day=1)
+    existing = {month for month, _ in list_partitions()}
+    return [
+        create_partition(month)
+        for month in (add_months(this_month, offset) for offset in range(months_ahead + 1))
+        if month not in existing
+    ]
+
+
+def stream_rows(cursor, table, batch_size):
+    """Yield the rows of ``table`` as dicts, in batches seeking on the primary key"""
+    last_id = 0
+    while True:
+        cursor.execute(f'SELECT * FROM {table} WHERE id > %s ORDER BY id LIMIT %s', [last_id, batch_size])
+        columns = [column.name for column in cursor.description]
+        rows = cursor.fetchall()
+        if not rows:
+            return
+        for row in rows:
+            yield dict(zip(columns, row))
+        last_id = rows[-1][columns.index('id')]
+
+
+def archive_partition(month, table):
+    """Archive one partition to gzipped NDJSON, then detach and drop it"""
+    options = settings.CONTACT_ARCHIVE
+    storage = get_storage()
+    path = archive_name(month)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Rows cannot change between reading and dropping them
+        cursor.execute(f'LOCK TABLE {table} IN SHARE MODE')
+        cursor.execute(f'SELECT count(*) FROM {table}')
+        expected = cursor.fetchone()[0]
+
+        with tempfile.NamedTemporaryFile(suffix='.ndjson.gz', delete=False) as temp:
+            try:
+                written = 0
+                with gzip.open(temp, 'wt', encoding='utf-8') as archive:
+                    for row in stream_rows(cursor, table, options['BATCH_SIZE']):
+                        archive.write(json.dumps(row, cls=DjangoJSONEncoder) + '\n')
+                        written += 1
+                if written != expected:
+                    raise RuntimeError(f'Archived {written} of {expected} rows from {table}')
+
+                # A previous run may have uploaded the archive and failed later
+                if storage.exists(path):
+                    storage.delete(path)
+                with open(temp.name, 'rb') as source:
+                    storage.save(path, File(source))
+            finally:
+                os.unlink(temp.name)
+
+        cursor.execute(f'ALTER TABLE {PARENT_TABLE} DETACH PARTITION {table}')
+        cursor.execute(f'DROP TABLE {table}')
+
+    logger.info(f"Archived {written} contact messages from {table} to {path}")
+    return written
+
+
+def archive_old_partitions():
+    """Archive the months that ended before the retention window; return ``{table: rows}``"""
+    cutoff = add_months(timezone.now().date(), -settings.CONTACT_ARCHIVE['RETENTION_MONTHS'])
+
+    # Old rows that ended up in the default partition get a partition first
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT DISTINCT date_trunc('month', created_at AT TIME ZONE 'UTC')::date FROM {DEFAULT_PARTITION} "
+            f"WHERE created_at < %s",
+            [f'{cutoff.isoformat()} 00:00+00'],
+        )
+        stray_months = [month for (month,) in cursor.fetchall()]
+    for month in stray_months:
+        create_partition(month)
+
+    archived = {}
+    for month, table in list_partitions():
+        if add_months(month, 1) <= cutoff:
+            archived[table] = archive_partition(month, table)
+    return archived
+
+
+def list_archives(since=None, until=None):
+    """Return ``[(month, path)]`` of the archives between ``since`` and ``until`` months"""
+    storage = get_storage()
+    prefix = settings.CONTACT_ARCHIVE['PREFIX']
+    try:
+        _, files = storage.listdir(prefix)
+    except FileNotFoundError:
+        return []
+    archives = []
+    for name in files:
+        match = ARCHIVE_PATTERN.match(name)
+        if not match:
+            continue
+        month = datetime.date(int(match[1]), int(match[2]), 1)
+        if (since is None or month >= since) and (until is None or month <= until):
+            archives.append((month, f'{prefix}/{name}'))
+    return sorted(archives)
+
+
+def search_archives(email=None, text=None, since=None, until=None):
+    """Yield archived messages matching ``email`` exactly and containing ``text``"""
+    storage = get_storage()
+    email = email.lower() if email else None
+    text = text.casefold() if text else None
+    for _, path in list_archives(since, until):
+        with storage.open(path, 'rb') as source, gzip.open(source, 'rt', encoding='utf-8') as archive:
+            for line in archive:
+                row = json.loads(line)
+                if email and row['email'].lower() != email:
+                    continue
+                if text and text not in f"{row['subject']}\n{row['message']}".casefold():
+                    continue
+                yield row
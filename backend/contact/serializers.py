@@ -1,6 +1,6 @@
 # contact/serializers.py
 from rest_framework import serializers
-from .models import ContactMessage, NewsletterSubscription
+from .models import ContactMessage, NewsletterSubscription, normalize_email
 
 class ContactMessageSerializer(serializers.ModelSerializer):
     class Meta:
@@ -14,3 +14,8 @@ class NewsletterSubscriptionSerializer(serializers.ModelSerializer):
         model = NewsletterSubscription
         fields = ['id', 'email', 'name']
         read_only_fields = ['id']
+        # Existing addresses are handled by the insert itself, see subscriptions.subscribe
+        extra_kwargs = {'email': {'validators': []}}
+
+    def validate_email(self, value):
+        return normalize_email(value)
@@ -0,0 +1,201 @@
+"""
+Duplicate and flood pre-filter for contact form submissions.
+
+Every submission is fingerprinted by a SHA-256 of its normalized email,
+subject and message and checked against a shared, time-windowed store,
+so a payload repeated within ``WINDOW`` seconds is collapsed without
+touching Postgres. A fingerprint is only recorded with
+``record_submission`` once its message has been saved or buffered, so a
+submission that failed can be retried:
+
+``cache``
+    One cache key per fingerprint with a ``WINDOW`` TTL. Exact, about a
+    hundred bytes per distinct message.
+``bloom``
+    Two rotating Redis bitmaps, the current and the previous window,
+    sized for ``CAPACITY`` messages per window at ``ERROR_RATE`` false
+    positives. Memory is fixed; a false positive silently drops a genuine
+    message, so keep the rate low.
+
+Per-IP and per-email counters, also in the cache, reject floods. The
+filter fails open: if the store is unreachable submissions go through.
+"""
+import hashlib
+import logging
+import math
+import re
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from portfolio_project.redis_client import get_redis
+
+logger = logging.getLogger('portfolio')
+
+ACCEPTED = 'accepted'
+DUPLICATE = 'duplicate'
+RATE_LIMITED = 'rate_limited'
+
+STATS_KEY = 'contact:spam:stats:{}'
+
+
+def fingerprint(data):
+    """Hash of the normalized email, subject and message"""
+    def normalize(value):
+        return re.sub(r'\s+', ' ', (value or '')).strip().casefold()
+
+    payload = '\x1f'.join(normalize(data.get(name)) for name in ('email', 'subject', 'message'))
+    return hashlib.sha256(payload.encode()).digest()
+
+
+class CacheStore:
+    """Exact fingerprints in the Django cache"""
+
+    def key(self, digest):
+        return f'contact:spam:seen:{digest.hex()}'
+
+    def seen(self, digest):
+        """Return whether ``digest`` was recorded in the window"""
+        return cache.get(self.key(digest)) is not None
+
+    def record(self, digest):
+        cache.set(self.key(digest), True, timeout=settings.CONTACT_SPAM_FILTER['WINDOW'])
+
+    def stats(self):
+        return {'store': 'cache', 'false_positive_rate': 0.0}
+
+
+class BloomStore:
+    """Rotating Bloom filter in two Redis bitmaps"""
+
+    def __init__(self):
+        options = settings.CONTACT_SPAM_FILTER
+        self.window = options['WINDOW']
+        # Optimal size and hash count for the capacity and error rate
+        self.bits = math.ceil(-options['CAPACITY'] * math.log(options['ERROR_RATE']) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.bits / options['CAPACITY'] * math.log(2)))
+
+    def client(self):
+        return get_redis(settings.CONTACT_SPAM_FILTER['REDIS_URL'])
+
+    def key(self, slot):
+        return f'contact:spam:bloom:{slot}'
+
+    def positions(self, digest):
+        first = int.from_bytes(digest[:8], 'big')
+        step = int.from_bytes(digest[8:16], 'big') | 1
+        return [(first + i * step) % self.bits for i in range(self.hashes)]
+
+    def seen(self, digest):
+        slot = int(time.time() // self.window)
+        positions = self.positions(digest)
+        pipe = self.client().pipeline(transaction=False)
+        for key in (self.key(slot), self.key(slot - 1)):
+            for position in positions:
+                pipe.getbit(key, position)
+        results = pipe.execute()
+        current, previous = results[:self.hashes], results[self.hashes:]
+        return all(current) or all(previous)
+
+    def record(self, digest):
+        slot = int(time.time() // self.window)
+        pipe = self.client().pipeline(transaction=False)
+        for position in self.positions(digest):
+            pipe.setbit(self.key(slot), position, 1)
+        pipe.expire(self.key(slot), self.window * 2 + 60)
+        pipe.execute()
+
+    def stats(self):
+        slot = int(time.time() // self.window)
+        pipe = self.client().pipeline(transaction=False)
+        pipe.bitcount(self.key(slot))
+        pipe.bitcount(self.key(slot - 1))
+        fill, previous_fill = (filled / self.bits for filled in pipe.execute())
+        estimated = -self.bits / self.hashes * math.log(1 - fill) if fill < 1 else float('inf')
+        return {
+            'store': 'bloom',
+            'bits': self.bits,
+            'hashes': self.hashes,
+            # Two windows are kept
+            'memory_bytes': math.ceil(self.bits / 8) * 2,
+            'fill_ratio': round(fill, 6),
+            'previous_fill_ratio': round(previous_fill, 6),
+            'estimated_messages': round(estimated),
+            # A lookup matches if either window's bits are all set
+            'false_positive_rate': 1 - (1 - fill ** self.hashes) * (1 - previous_fill ** self.hashes),
+        }
+
+
+STORES = {
+    'cache': CacheStore,
+    'bloom': BloomStore,
+}
+
+
+def get_store():
+    return STORES[settings.CONTACT_SPAM_FILTER['STORE']]()
+
+
+def over_limit(kind, value, limit, window):
+    """Count a submission for ``value`` in the current window and return whether it exceeds ``limit``"""
+    if not limit or not value:
+        return False
+    key = f'contact:spam:{kind}:{value}:{int(time.time() // window)}'
+    cache.add(key, 0, timeout=window)
+    try:
+        return cache.incr(key) > limit
+    except ValueError:
+        return False
+
+
+def count(result):
+    key = STATS_KEY.format(result)
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass
+
+
+def check_submission(data, ip):
+    """Return ``ACCEPTED``, ``DUPLICATE`` or ``RATE_LIMITED`` for validated ``data``"""
+    options = settings.CONTACT_SPAM_FILTER
+    if not options['ENABLED']:
+        return ACCEPTED
+    try:
+        if (over_limit('ip', ip, options['MAX_PER_IP'], options['RATE_WINDOW'])
+                or over_limit('email', data.get('email', '').lower(), options['MAX_PER_EMAIL'], options['RATE_WINDOW'])):
+            result = RATE_LIMITED
+        elif get_store().seen(fingerprint(data)):
+            result = DUPLICATE
+        else:
+            result = ACCEPTED
+        count(result)
+    except Exception as e:
+        logger.error(f"Contact spam filter unavailable, accepting submission: {str(e)}")
+        return ACCEPTED
+    if result != ACCEPTED:
+        logger.info(f"Contact submission from {ip} ({data.get('email')}) {result.replace('_', ' ')}")
+    return result
+
+
+def record_submission(data):
+    """Remember accepted ``data`` once it has been saved, so resubmissions are duplicates"""
+    if not settings.CONTACT_SPAM_FILTER['ENABLED']:
+        return
+    try:
+        get_store().record(fingerprint(data))
+    except Exception as e:
+        logger.error(f"Failed to record contact submission in the spam filter: {str(e)}")
+
+
+def filter_stats():
+    """Counters since the last reset, plus the store's own figures"""
+    stats = {result: cache.get(STATS_KEY.format(result), 0) for result in (ACCEPTED, DUPLICATE, RATE_LIMITED)}
+    stats.update(get_store().stats())
+    return stats
+
+
+def reset_stats():
+    cache.delete_many([STATS_KEY.format(result) for result in (ACCEPTED, DUPLICATE, RATE_LIMITED)])
@@ -0,0 +1,206 @@
+"""
+Newsletter subscribing without a lookup before the insert.
+
+A single subscription is one ``INSERT ... ON CONFLICT (email)`` statement
+whose ``RETURNING`` clause tells a new subscriber from an existing one, so
+concurrent submissions of the same address never race into an
+``IntegrityError``. Lists are imported in batches, either through
+``bulk_create(ignore_conflicts=True)`` or through ``COPY`` into a
+temporary staging table, with a result for every input row.
+
+Emails are stored lower-cased, which makes the unique constraint on
+``email`` case-insensitive.
+"""
+import csv
+import io
+from dataclasses import dataclass, field
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+
+from .models import NewsletterSubscription, normalize_email
+
+CREATED = 'created'
+REACTIVATED = 'reactivated'
+EXISTING = 'existing'
+DUPLICATE = 'duplicate'
+INVALID = 'invalid'
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+class SubscriberImportError(Exception):
+    pass
+
+
+@dataclass
+class ImportReport:
+    # (row number, email, status, errors)
+    results: list = field(default_factory=list)
+
+    def add(self, number, email, status, errors=None):
+        self.results.append((number, email, status, errors or {}))
+
+    def count(self, status):
+        return sum(1 for _, _, row_status, _ in self.results if row_status == status)
+
+    def summary(self):
+        return {status: self.count(status) for status in (CREATED, EXISTING, DUPLICATE, INVALID)}
+
+
+def subscribe(email, name=''):
+    """
+    Subscribe ``email`` and return ``(id, status)``. An inactive
+    subscription is reactivated; an active one is left untouched and
+    reported as ``EXISTING`` with an id of ``None``.
+    """
+    table = NewsletterSubscription._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (email, name, is_active, created_at) VALUES (%s, %s, true, now()) "
+            f"ON CONFLICT (email) DO UPDATE SET is_active = true WHERE NOT {table}.is_active "
+            f"RETURNING id, (xmax = 0)",
+            [normalize_email(email), name],
+        )
+        row = cursor.fetchone()
+    if row is None:
+        return None, EXISTING
+    return row[0], CREATED if row[1] else REACTIVATED
+
+
+def subscribe_many(rows):
+    """
+    Subscribe every ``{'email', 'name'}`` row in one statement, with the
+    same reactivation as ``subscribe`` but without per-row results.
+    """
+    unique = {normalize_email(row['email']): row.get('name', '') for row in rows}
+    NewsletterSubscription.objects.bulk_create(
+        [NewsletterSubscription(email=email, name=name) for email, name in unique.items()],
+        update_conflicts=True,
+        unique_fields=['email'],
+        update_fields=['is_active'],
+    )
+    return len(unique)
+
+
+def read_csv(source):
+    """Yield ``{'email', 'name'}`` rows from a CSV text stream with a header"""
+    reader = csv.DictReader(source)
+    if not reader.fieldnames or 'email' not in [name.strip().lower() for name in reader.fieldnames]:
+        raise SubscriberImportError('CSV files need a header with an "email" column')
+    for row in reader:
+        row = {(key or '').strip().lower(): value for key, value in row.items()}
+        yield {'email': row.get('email') or '', 'name': row.get('name') or ''}
+
+
+def clean_row(raw):
+    """Normalize a row and run the model field validators"""
+    if isinstance(raw, str):
+        raw = {'email': raw}
+    if not isinstance(raw, dict):
+        raise ValidationError({'email': ['Expected an object or an email address']})
+
+    cleaned, errors = {}, {}
+    for name in ('email', 'name'):
+        value = raw.get(name)
+        if value is None:
+            value = ''
+        elif not isinstance(value, str):
+            errors[name] = ['Expected a string']
+            continue
+        value = normalize_email(value) if name == 'email' else value.strip()
+        try:
+            cleaned[name] = NewsletterSubscription._meta.get_field(name).clean(value, None)
+        except ValidationError as e:
+            errors[name] = e.messages
+    if errors:
+        raise ValidationError(errors)
+    return cleaned
+
+
+def validated_batches(rows, report, batch_size):
+    """Group valid rows into ``(row number, row)`` batches, reporting the rest"""
+    seen = set()
+    batch = []
+    for number, raw in enumerate(rows, start=1):
+        try:
+            row = clean_row(raw)
+        except ValidationError as e:
+            email = raw.get('email') if isinstance(raw, dict) else raw
+            report.add(number, email, INVALID, e.message_dict)
+            continue
+        if row['email'] in seen:
+            report.add(number, row['email'], DUPLICATE)
+            continue
+        seen.add(row['email'])
+        batch.append((number, row))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def write_bulk_create(batch):
+    """
+    Insert with ``bulk_create(ignore_conflicts=True)``. Postgres does not
+    return the rows it skipped, so existing addresses are looked up first;
+    a concurrent insert can only make that report, not the write, wrong.
+    """
+    emails = [row['email'] for _, row in batch]
+    existing = set(NewsletterSubscription.objects.filter(email__in=emails).values_list('email', flat=True))
+    NewsletterSubscription.objects.bulk_create(
+        [NewsletterSubscription(**row) for _, row in batch if row['email'] not in existing],
+        ignore_conflicts=True,
+    )
+    return set(emails) - existing
+
+
+def write_copy(batch):
+    """COPY the batch into a staging table and insert what is new in one statement"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for _, row in batch:
+        writer.writerow([row['email'], row['name']])
+    buffer.seek(0)
+
+    table = NewsletterSubscription._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'CREATE TEMPORARY TABLE IF NOT EXISTS contact_subscribers_staging '
+            '(email text, name text) ON COMMIT DROP'
+        )
+        cursor.execute('TRUNCATE contact_subscribers_staging')
+        cursor.copy_expert('COPY contact_subscribers_staging (email, name) FROM STDIN WITH (FORMAT csv)', buffer)
+        cursor.execute(
+            f"INSERT INTO {table} (email, name, is_active, created_at) "
+            f"SELECT email, name, true, now() FROM contact_subscribers_staging "
+            f"ON CONFLICT (email) DO NOTHING RETURNING email"
+        )
+        return {email for (email,) in cursor.fetchall()}
+
+
+WRITERS = {
+    'bulk': write_bulk_create,
+    'copy': write_copy,
+}
+
+
+def import_subscribers(rows, method='bulk', batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Subscribe every valid row and return an ``ImportReport``. Unlike a
+    single subscribe, an import never reactivates an address that
+    unsubscribed. Each batch commits on its own, so an interrupted import
+    can simply be run again.
+    """
+    report = ImportReport()
+    write = WRITERS[method]
+
+    for batch in validated_batches(rows, report, batch_size):
+        with transaction.atomic():
+            created = write(batch)
+        for number, row in batch:
+            report.add(number, row['email'], CREATED if row['email'] in created else EXISTING)
+
+    report.results.sort(key=lambda result: result[0])
+    return report
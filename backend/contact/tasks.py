@@ -0,0 +1,188 @@
+"""
+Celery tasks of the contact app: admin notifications for contact
+messages, newsletter campaign sending (see ``contact.campaigns``),
+draining the write-behind ingestion buffer (see ``contact.ingestion``)
+and the monthly partition maintenance and archiving (see
+``contact.partitions``).
+
+Notifications: messages are marked with ``notified_at`` once their email is out. Each
+run claims a batch of pending rows with ``SELECT ... FOR UPDATE SKIP
+LOCKED``, stamps them with ``notification_claimed_at`` and commits, so
+concurrent runs never pick the same messages and no row lock is held
+while talking to the mail server. The batch is sent over a single SMTP
+connection and the outcome is written with one update per result.
+Messages a crashed run had claimed are claimed again after
+``CLAIM_TIMEOUT``. With ``DIGEST_WINDOW`` set, messages arriving within
+the window are grouped into one digest email.
+"""
+import logging
+
+from celery import shared_task
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ContactMessage
+
+logger = logging.getLogger('portfolio')
+
+SCHEDULED_KEY = 'contact:notifications:scheduled'
+
+
+def schedule_notifications():
+    """
+    Queue a notification run. In digest mode the run is delayed by the
+    window and only queued once per window.
+    """
+    window = settings.CONTACT_NOTIFICATIONS['DIGEST_WINDOW']
+    try:
+        if not window:
+            send_contact_notifications.delay()
+        elif cache.add(SCHEDULED_KEY, True, timeout=window):
+            send_contact_notifications.apply_async(countdown=window)
+    except Exception as e:
+        # The periodic sweep picks the message up later
+        cache.delete(SCHEDULED_KEY)
+        logger.error(f"Failed to queue contact notification: {str(e)}")
+
+
+def notification_email(message):
+    return EmailMessage(
+        f'New Contact Form Submission: {message.subject}',
+        f'Name: {message.name}\nEmail: {message.email}\nPhone: {message.phone}\n\nMessage:\n{message.message}',
+        settings.DEFAULT_FROM_EMAIL,
+        [settings.ADMIN_EMAIL],
+        reply_to=[message.email],
+    )
+
+
+def digest_email(messages):
+    sections = [
+        f'From: {m.name} <{m.email}>\nPhone: {m.phone}\nSubject: {m.subject}\nReceived: {m.created_at:%Y-%m-%d %H:%M}\n\n{m.message}'
+        for m in messages
+    ]
+    return EmailMessage(
+        f'{len(messages)} new contact form submissions',
+        ('\n\n' + '-' * 40 + '\n\n').join(sections),
+        settings.DEFAULT_FROM_EMAIL,
+        [settings.ADMIN_EMAIL],
+    )
+
+
+def send_batch(messages, digest=False):
+    """
+    Send notifications for ``messages`` over one connection and return
+    the ids that were sent, plus the error that stopped the batch, if any.
+    """
+    connection = get_connection()
+    sent = []
+    try:
+        connection.open()
+        if digest:
+            connection.send_messages([digest_email(messages)])
+            sent = [m.pk for m in messages]
+        else:
+            for message in messages:
+                connection.send_messages([notification_email(message)])
+                sent.append(message.pk)
+    except Exception as e:
+        return sent, e
+    finally:
+        connection.close()
+    return sent, None
+
+
+def claim_notifications(limit):
+    """Claim up to ``limit`` messages waiting for their notification and return them"""
+    now = timezone.now()
+    expired = now - timedelta(seconds=settings.CONTACT_NOTIFICATIONS['CLAIM_TIMEOUT'])
+    with transaction.atomic():
+        messages = list(
+            ContactMessage.objects.select_for_update(skip_locked=True)
+            .filter(notified_at__isnull=True)
+            .filter(Q(notification_claimed_at__isnull=True) | Q(notification_claimed_at__lt=expired))
+            .order_by('created_at')[:limit]
+        )
+        ContactMessage.objects.filter(pk__in=[m.pk for m in messages]).update(notification_claimed_at=now)
+    return messages
+
+
+@shared_task(autoretry_for=(OSError,), retry_backoff=True, retry_backoff_max=600, max_retries=6)
+def send_contact_notifications():
+    """Email the admins about every contact message not notified yet"""
+    options = settings.CONTACT_NOTIFICATIONS
+    digest = bool(options['DIGEST_WINDOW'])
+    cache.delete(SCHEDULED_KEY)
+
+    messages = claim_notifications(options['BATCH_SIZE'])
+    if not messages:
+        return "No pending contact notifications"
+
+    sent, error = send_batch(messages, digest=digest)
+    ContactMessage.objects.filter(pk__in=sent).update(notified_at=timezone.now())
+    # Hand the rest back to the retry straight away
+    sent_ids = set(sent)
+    unsent = [m.pk for m in messages if m.pk not in sent_ids]
+    if unsent:
+        ContactMessage.objects.filter(pk__in=unsent).update(notification_claimed_at=None)
+
+    if error is not None:
+        logger.warning(f"Contact notifications stopped after {len(sent)} of {len(messages)}: {str(error)}")
+        raise error
+    if len(messages) == options['BATCH_SIZE']:
+        # More are waiting
+        send_contact_notifications.delay()
+
+    logger.info(f"Sent {len(sent)} contact notifications{' as a digest' if digest else ''}")
+    return f"Sent {len(sent)} contact notifications"
+
+
+@shared_task
+def start_newsletter_campaign(campaign_id):
+    """Fan a campaign out into chunk tasks"""
+    from .campaigns import start_campaign
+    chunks = start_campaign(campaign_id)
+    return f"Queued {chunks} chunks for campaign {campaign_id}"
+
+
+# acks_late redelivers the chunk if its worker dies; rows it had already
+# claimed are not sent again
+@shared_task(acks_late=True, autoretry_for=(OSError,), retry_backoff=True, retry_backoff_max=600, max_retries=6)
+def send_campaign_chunk(campaign_id, first_id, last_id):
+    from .campaigns import send_chunk
+    counts = send_chunk(campaign_id, first_id, last_id)
+    logger.info(f"Campaign {campaign_id} subscribers {first_id}-{last_id}: {counts}")
+    return counts
+
+
+@shared_task
+def recover_newsletter_campaigns():
+    """Resume campaigns interrupted by worker crashes"""
+    from .campaigns import recover_campaigns
+    chunks = recover_campaigns()
+    return f"Queued {chunks} chunks again"
+
+
+# No retries: unacknowledged entries are picked up by the next periodic run
+@shared_task
+def drain_contact_ingestion():
+    """Insert buffered contact form and newsletter submissions"""
+    from .ingestion import drain, is_enabled
+    if not is_enabled():
+        return "Contact ingestion buffer disabled"
+    total = drain()
+    return f"Ingested {total} buffered submissions"
+
+
+@shared_task
+def archive_contact_messages():
+    """Create upcoming monthly partitions and archive the expired ones"""
+    from .partitions import archive_old_partitions, ensure_partitions
+    ensure_partitions()
+    archived = archive_old_partitions()
+    return f"Archived {sum(archived.values())} contact messages from {len(archived)} partitions"
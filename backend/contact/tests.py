@@ -1,3 +1,461 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from .campaigns import claim, recover_campaigns, send_chunk, wait_for_send_slot
+from .ingestion import write_batch
+from . import spam
+from .models import Campaign, CampaignDelivery, ContactMessage, NewsletterSubscription
+from .partitions import (
+    add_months, archive_name, archive_old_partitions, list_partitions, partition_name, search_archives,
+)
+from .subscriptions import (
+    CREATED, EXISTING, INVALID, REACTIVATED, SubscriberImportError, clean_row, import_subscribers, read_csv, subscribe,
+)
+from .tasks import send_contact_notifications, start_newsletter_campaign
+from .views import ContactMessageViewSet
+
+LOCMEM_CACHE = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'contact-tests',
+    }
+}
+
+
+def create_message(number):
+    return ContactMessage.objects.create(
+        name=f"Visitor {number}",
+        email=f"visitor{number}@example.com",
+        subject=f"Question {number}",
+        message="Hello",
+    )
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ContactNotificationTestCase(TestCase):
+    def setUp(self):
+        # Identical submissions from other tests would be collapsed
+        cache.clear()
+
+    def test_message_is_notified_after_commit(self):
+        data = {'name': "Visitor", 'email': "visitor@example.com", 'subject': "Hi", 'message': "Hello"}
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('contactmessage-list'), data, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, "New Contact Form Submission: Hi")
+        self.assertEqual(mail.outbox[0].reply_to, ["visitor@example.com"])
+        self.assertIsNotNone(ContactMessage.objects.get().notified_at)
+
+        send_contact_notifications()
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_batch_uses_one_connection(self):
+        for number in range(3):
+            create_message(number)
+        with mock.patch('contact.tasks.get_connection', wraps=mail.get_connection) as get_connection:
+            send_contact_notifications()
+        get_connection.assert_called_once_with()
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertFalse(ContactMessage.objects.filter(notified_at__isnull=True).exists())
+
+    @override_settings(CONTACT_NOTIFICATIONS={**settings.CONTACT_NOTIFICATIONS, 'DIGEST_WINDOW': 60})
+    def test_digest_groups_messages(self):
+        for number in range(3):
+            create_message(number)
+        send_contact_notifications()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, "3 new contact form submissions")
+        self.assertIn("visitor2@example.com", mail.outbox[0].body)
+
+    def test_failure_only_marks_sent_messages(self):
+        first, second = create_message(1), create_message(2)
+        sent = []
+
+        def send_messages(messages):
+            if sent:
+                raise OSError("Connection lost")
+            sent.extend(messages)
+            return len(messages)
+
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=send_messages):
+            with self.assertRaises(OSError):
+                send_contact_notifications.run()
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertIsNotNone(first.notified_at)
+        self.assertIsNone(second.notified_at)
+        self.assertIsNone(second.notification_claimed_at)
+
+    def test_claimed_messages_are_skipped_until_the_claim_expires(self):
+        message = create_message(1)
+        ContactMessage.objects.filter(pk=message.pk).update(notification_claimed_at=timezone.now())
+        send_contact_notifications()
+        self.assertEqual(len(mail.outbox), 0)
+
+        timeout = settings.CONTACT_NOTIFICATIONS['CLAIM_TIMEOUT']
+        ContactMessage.objects.filter(pk=message.pk).update(
+            notification_claimed_at=timezone.now() - timedelta(seconds=timeout + 1),
+        )
+        send_contact_notifications()
+        self.assertEqual(len(mail.outbox), 1)
+
+
+class SubscriberRowTestCase(SimpleTestCase):
+    def test_rows_are_normalized(self):
+        self.assertEqual(clean_row({'email': ' Jane@Example.COM ', 'name': ' Jane '}),
+                         {'email': 'jane@example.com', 'name': 'Jane'})
+        self.assertEqual(clean_row('jane@example.com')['email'], 'jane@example.com')
+        with self.assertRaises(ValidationError):
+            clean_row({'email': 'not-an-email'})
+
+    def test_non_string_values_are_invalid(self):
+        with self.assertRaises(ValidationError) as caught:
+            clean_row({'email': 123, 'name': []})
+        self.assertEqual(set(caught.exception.message_dict), {'email', 'name'})
+
+        report = import_subscribers([{'email': 123}, {'email': 'jane@example.com', 'name': {}}])
+        self.assertEqual([result for _, _, result, _ in report.results], [INVALID, INVALID])
+
+    def test_csv_needs_an_email_column(self):
+        rows = list(read_csv(io.StringIO('Name,Email\nJane,jane@example.com\n')))
+        self.assertEqual(rows, [{'email': 'jane@example.com', 'name': 'Jane'}])
+        with self.assertRaises(SubscriberImportError):
+            list(read_csv(io.StringIO('address\njane@example.com\n')))
+
+
+class NewsletterSubscriptionTestCase(TestCase):
+    def setUp(self):
+        self.url = reverse('newslettersubscription-list')
+
+    def test_subscribe_is_case_insensitive(self):
+        data = {'email': 'Jane@Example.com', 'name': 'Jane'}
+        response = self.client.post(self.url, data, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        with self.assertNumQueries(1):
+            response = self.client.post(self.url, {'email': 'jane@example.COM'}, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(NewsletterSubscription.objects.values_list('email', flat=True)), ['jane@example.com'])
+
+    def test_subscribe_reactivates(self):
+        subscription = NewsletterSubscription.objects.create(email='jane@example.com', is_active=False)
+        self.assertEqual(subscribe('JANE@example.com'), (subscription.pk, REACTIVATED))
+        self.assertEqual(subscribe('jane@example.com'), (None, EXISTING))
+        self.assertEqual(subscribe('john@example.com')[1], CREATED)
+
+    def test_import_reports_every_row(self):
+        NewsletterSubscription.objects.create(email='jane@example.com', is_active=False)
+        rows = [{'email': 'john@example.com'}, 'JANE@example.com', {'email': 'bad'}, {'email': 'John@example.com'}]
+        report = import_subscribers(rows, batch_size=2)
+        self.assertEqual([result[2] for result in report.results], ['created', 'existing', 'invalid', 'duplicate'])
+        # Imports never resubscribe
+        self.assertFalse(NewsletterSubscription.objects.get(email='jane@example.com').is_active)
+
+        report = import_subscribers(['john@example.com', 'new@example.com'], method='copy')
+        self.assertEqual(report.summary(), {'created': 1, 'existing': 1, 'duplicate': 0, 'invalid': 0})
+
+    def test_bulk_endpoint_is_for_admins(self):
+        url = reverse('newslettersubscription-bulk')
+        rows = [{'email': 'jane@example.com'}, {'email': 'john@example.com', 'name': 'John'}]
+        client = APIClient()
+        self.assertIn(client.post(url, rows, format='json').status_code,
+                      (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+
+        admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+        client.force_authenticate(admin)
+        response = client.post(url, rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['created'], 2)
+
+        upload = io.BytesIO(b'email,name\njohn@example.com,John\nnew@example.com,\n')
+        upload.name = 'subscribers.csv'
+        response = client.post(url, {'file': upload}, format='multipart')
+        self.assertEqual([row['status'] for row in response.data['results']], ['existing', 'created'])
+
+    def test_import_command(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'subscribers.csv')
+        with open(path, 'w') as source:
+            source.write('email,name\njane@example.com,Jane\nbad,\n')
+        report_path = os.path.join(directory, 'report.csv')
+
+        call_command('import_subscribers', path, report=report_path, stdout=io.StringIO())
+        self.assertTrue(NewsletterSubscription.objects.filter(email='jane@example.com').exists())
+        with open(report_path) as report:
+            self.assertIn('invalid', report.read())
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class SendRateTestCase(SimpleTestCase):
+    def test_workers_share_the_rate(self):
+        clock = [1000.0]
+        fake_time = mock.Mock(time=lambda: clock[0], sleep=lambda seconds: clock.__setitem__(0, clock[0] + seconds))
+        with mock.patch('contact.campaigns.time', fake_time):
+            for _ in range(5):
+                wait_for_send_slot(2)
+        # Two emails in each of the first two seconds, the fifth in the third
+        self.assertEqual(int(clock[0]), 1002)
+
+
+@override_settings(NEWSLETTER_CAMPAIGNS={**settings.NEWSLETTER_CAMPAIGNS, 'CHUNK_SIZE': 2, 'RATE': 0})
+class NewsletterCampaignTestCase(TestCase):
+    def setUp(self):
+        for number in range(3):
+            NewsletterSubscription.objects.create(email=f'reader{number}@example.com')
+        NewsletterSubscription.objects.create(email='gone@example.com', is_active=False)
+        self.campaign = Campaign.objects.create(subject="News", body="Hello", html_body="<p>Hello</p>")
+
+    def test_campaign_is_sent_once_to_active_subscribers(self):
+        start_newsletter_campaign(self.campaign.pk)
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox),
+                         ['reader0@example.com', 'reader1@example.com', 'reader2@example.com'])
+        self.assertEqual(CampaignDelivery.objects.filter(status='sent').count(), 3)
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.status, 'sent')
+
+        # Redelivered chunks find nothing left to send
+        last_id = NewsletterSubscription.objects.latest('id').id
+        self.campaign.status = 'sending'
+        self.campaign.save()
+        self.assertEqual(send_chunk(self.campaign.pk, 0, last_id), {})
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_interrupted_deliveries_are_not_sent_twice(self):
+        with mock.patch('contact.tasks.send_campaign_chunk.delay'):
+            start_newsletter_campaign(self.campaign.pk)
+        first = NewsletterSubscription.objects.order_by('id').first()
+        # A worker claimed the first subscriber and died
+        claim(self.campaign.pk, first.pk, first.pk)
+
+        long_ago = timezone.now() - timedelta(hours=1)
+        Campaign.objects.filter(pk=self.campaign.pk).update(started_at=long_ago)
+        CampaignDelivery.objects.filter(status='sending').update(claimed_at=long_ago)
+        recover_campaigns()
+
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertNotIn(first.email, [message.to[0] for message in mail.outbox])
+        self.assertEqual(CampaignDelivery.objects.get(subscription=first).status, 'failed')
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.status, 'sent')
+
+    def test_command_resumes_a_sending_campaign(self):
+        with mock.patch('contact.tasks.send_campaign_chunk.delay'):
+            start_newsletter_campaign(self.campaign.pk)
+        self.assertEqual(len(mail.outbox), 0)
+
+        out = io.StringIO()
+        call_command('send_campaign', self.campaign.pk, stdout=out)
+        self.assertTrue(out.getvalue().startswith('Resumed campaign "News"'))
+        self.assertEqual(len(mail.outbox), 3)
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.status, 'sent')
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ContactIngestionTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_redelivered_batches_are_stored_once(self):
+        NewsletterSubscription.objects.create(email='jane@example.com', is_active=False)
+        entries = [
+            {'kind': 'contact', 'id': '6f1c0c3e5b8a4d2e9f7a1b2c3d4e5f60',
+             'data': {'name': "Visitor", 'email': "visitor@example.com", 'subject': "Hi", 'message': "Hello"}},
+            {'kind': 'newsletter', 'id': '7f1c0c3e5b8a4d2e9f7a1b2c3d4e5f60', 'data': {'email': 'jane@example.com'}},
+            {'kind': 'newsletter', 'id': '8f1c0c3e5b8a4d2e9f7a1b2c3d4e5f60', 'data': {'email': 'john@example.com'}},
+        ]
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            write_batch(entries)
+        write_batch(entries)
+
+        # One notification run per batch, not per message
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(ContactMessage.objects.count(), 1)
+        self.assertEqual(NewsletterSubscription.objects.filter(is_active=True).count(), 2)
+
+    def test_concurrent_redelivery_is_stored_once(self):
+        entry = {
+            'kind': 'contact', 'id': '6f1c0c3e5b8a4d2e9f7a1b2c3d4e5f60', 'created_at': timezone.now(),
+            'data': {'name': "Visitor", 'email': "visitor@example.com", 'subject': "Hi", 'message': "Hello"},
+        }
+        write_batch([entry])
+        # A second consumer that checked before the first one committed
+        with mock.patch.object(ContactMessage.objects, 'filter', return_value=ContactMessage.objects.none()):
+            write_batch([entry])
+        self.assertEqual(ContactMessage.objects.count(), 1)
+        self.assertEqual(ContactMessage.objects.get().created_at, entry['created_at'])
+
+    @override_settings(CONTACT_INGESTION={
+        **settings.CONTACT_INGESTION, 'MODE': 'stream', 'REDIS_URL': 'redis://127.0.0.1:1/0',
+    })
+    def test_unreachable_buffer_saves_directly(self):
+        data = {'name': "Visitor", 'email': "visitor@example.com", 'subject': "Hi", 'message': "Hello"}
+        response = self.client.post(reverse('contactmessage-list'), data, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(ContactMessage.objects.exists())
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class SpamFilterTestCase(SimpleTestCase):
+    data = {'email': 'Bot@Example.com', 'subject': 'Offer', 'message': 'Buy  now'}
+
+    def setUp(self):
+        cache.clear()
+
+    def test_duplicates_are_detected_after_normalization(self):
+        self.assertEqual(spam.check_submission(self.data, '10.0.0.1'), spam.ACCEPTED)
+        spam.record_submission(self.data)
+        resubmitted = {'email': 'bot@example.com ', 'subject': 'OFFER', 'message': 'Buy now\n'}
+        self.assertEqual(spam.check_submission(resubmitted, '10.0.0.2'), spam.DUPLICATE)
+        self.assertEqual(spam.filter_stats()['duplicate'], 1)
+
+    @override_settings(CONTACT_SPAM_FILTER={**settings.CONTACT_SPAM_FILTER, 'MAX_PER_IP': 2})
+    def test_floods_are_rate_limited(self):
+        results = [
+            spam.check_submission({**self.data, 'message': f'Message {number}'}, '10.0.0.1') for number in range(3)
+        ]
+        self.assertEqual(results, [spam.ACCEPTED, spam.ACCEPTED, spam.RATE_LIMITED])
+
+    @override_settings(CONTACT_SPAM_FILTER={**settings.CONTACT_SPAM_FILTER, 'CAPACITY': 1000, 'ERROR_RATE': 0.01})
+    def test_bloom_filter_is_sized_for_the_error_rate(self):
+        store = spam.BloomStore()
+        self.assertEqual((store.bits, store.hashes), (9586, 7))
+        positions = store.positions(spam.fingerprint(self.data))
+        self.assertEqual(len(set(positions)), 7)
+        self.assertTrue(all(0 <= position < store.bits for position in positions))
+
+    def test_unrecorded_submissions_are_not_duplicates(self):
+        self.assertEqual(spam.check_submission(self.data, '10.0.0.1'), spam.ACCEPTED)
+        self.assertEqual(spam.check_submission(self.data, '10.0.0.1'), spam.ACCEPTED)
+
+    @override_settings(CONTACT_SPAM_FILTER={**settings.CONTACT_SPAM_FILTER, 'CAPACITY': 1000, 'ERROR_RATE': 0.01})
+    def test_bloom_false_positive_rate_covers_both_windows(self):
+        store = spam.BloomStore()
+        client = mock.Mock()
+        client.pipeline.return_value.execute.return_value = [store.bits // 2, store.bits // 2]
+        with mock.patch.object(spam.BloomStore, 'client', return_value=client):
+            stats = store.stats()
+        self.assertAlmostEqual(stats['false_positive_rate'], 1 - (1 - 0.5 ** 7) ** 2, places=4)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ContactSpamViewTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_duplicate_submissions_are_collapsed(self):
+        data = {'name': "Bot", 'email': "bot@example.com", 'subject': "Offer", 'message': "Buy now"}
+        for _ in range(3):
+            response = self.client.post(reverse('contactmessage-list'), data, content_type='application/json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(ContactMessage.objects.count(), 1)
+
+    def test_failed_save_can_be_retried(self):
+        data = {'name': "Jane", 'email': "jane@example.com", 'subject': "Hello", 'message': "Hi"}
+        with mock.patch.object(ContactMessageViewSet, 'perform_create', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self.client.post(reverse('contactmessage-list'), data, content_type='application/json')
+        response = self.client.post(reverse('contactmessage-list'), data, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(ContactMessage.objects.count(), 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ContactAdminTestCase(TestCase):
+    def setUp(self):
+        admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(admin)
+        self.messages = [create_message(number) for number in range(5)]
+        self.url = reverse('admin:contact_contactmessage_changelist')
+
+    def test_changelist_pages_with_a_cursor(self):
+        from contact.admin import ContactMessageAdmin
+        with mock.patch.object(ContactMessageAdmin, 'list_per_page', 2):
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, 200)
+            changelist = response.context['cl']
+            self.assertEqual(changelist.result_count, 5)
+            self.assertEqual([m.pk for m in changelist.result_list], [m.pk for m in self.messages[:-3:-1]])
+
+            response = self.client.get(changelist.next_url)
+            changelist = response.context['cl']
+            self.assertEqual([m.pk for m in changelist.result_list], [self.messages[2].pk, self.messages[1].pk])
+            self.assertIsNotNone(changelist.previous_url)
+
+            response = self.client.get(self.url, {'status': 'new', 'cursor': 'garbage'})
+            self.assertEqual(response.status_code, 302)
+
+    def test_changelist_sorted_by_nullable_column_uses_page_numbers(self):
+        from contact.admin import ContactMessageAdmin
+        ContactMessage.objects.filter(pk__in=[m.pk for m in self.messages[:2]]).update(notified_at=timezone.now())
+        # notified_at is the sixth column of list_display
+        with mock.patch.object(ContactMessageAdmin, 'list_per_page', 2):
+            response = self.client.get(self.url, {'o': '6.5'})
+        self.assertEqual(response.status_code, 200)
+        changelist = response.context['cl']
+        self.assertIsNone(changelist.keyset)
+        self.assertTrue(changelist.multi_page)
+
+    def test_bulk_status_action(self):
+        data = {
+            'action': 'mark_closed',
+            '_selected_action': [message.pk for message in self.messages[:3]],
+        }
+        response = self.client.post(self.url, data)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(ContactMessage.objects.filter(status='closed').count(), 3)
+
+
+class PartitionNameTestCase(SimpleTestCase):
+    def test_months_wrap_around_years(self):
+        self.assertEqual(add_months(date(2025, 11, 17), 3), date(2026, 2, 1))
+        self.assertEqual(add_months(date(2026, 1, 31), -1), date(2025, 12, 1))
+
+    def test_names(self):
+        self.assertEqual(partition_name(date(2026, 3, 1)), 'contact_contactmessage_p202603')
+        self.assertEqual(archive_name(date(2026, 3, 1)), 'contact_archive/contact-messages-2026-03.ndjson.gz')
+
+
+class ContactArchiveTestCase(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_old_messages_are_archived_and_searchable(self):
+        old, recent = create_message(1), create_message(2)
+        two_years_ago = timezone.now() - timedelta(days=730)
+        ContactMessage.objects.filter(pk=old.pk).update(created_at=two_years_ago)
+
+        archived = archive_old_partitions()
+
+        old_month = two_years_ago.date().replace(day=1)
+        self.assertEqual(archived, {partition_name(old_month): 1})
+        self.assertNotIn(old_month, [month for month, _ in list_partitions()])
+        self.assertEqual(list(ContactMessage.objects.values_list('pk', flat=True)), [recent.pk])
+
+        rows = list(search_archives(email='VISITOR1@example.com'))
+        self.assertEqual([row['id'] for row in rows], [old.pk])
+        self.assertEqual(list(search_archives(text='question 2')), [])
@@ -1,30 +1,54 @@
 # contact/views.py
+import io
 import logging
+from django.conf import settings
 from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import Throttled, ValidationError
+from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.response import Response
+from rest_framework.throttling import AnonRateThrottle
+from . import ingestion, spam
 from .models import ContactMessage, NewsletterSubscription
 from .serializers import ContactMessageSerializer, NewsletterSubscriptionSerializer
+from .subscriptions import EXISTING, REACTIVATED, SubscriberImportError, import_subscribers, read_csv, subscribe
 
 logger = logging.getLogger('portfolio')
 
 class ContactMessageViewSet(viewsets.ModelViewSet):
     queryset = ContactMessage.objects.all()
     serializer_class = ContactMessageSerializer
+    permission_classes = [permissions.AllowAny]  # Public form
     http_method_names = ['post']  # Only allow POST requests
     
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
+        message = "Your message has been sent successfully! We'll get back to you soon."
+
+        result = spam.check_submission(serializer.validated_data, AnonRateThrottle().get_ident(request))
+        if result == spam.RATE_LIMITED:
+            raise Throttled()
+        if result == spam.DUPLICATE:
+            # Answer as if it was saved, so resubmitting bots learn nothing
+            return Response({"message": message}, status=status.HTTP_201_CREATED)
+
+        # Buffered submissions are inserted in batches by drain_contact_ingestion
+        if ingestion.is_enabled() and ingestion.submit('contact', serializer.validated_data):
+            spam.record_submission(serializer.validated_data)
+            return Response({"message": message}, status=status.HTTP_202_ACCEPTED)
         
         # Call perform_create to save the instance
         self.perform_create(serializer)
+        # Only now, so a submission that failed to save can be retried
+        spam.record_submission(serializer.validated_data)
         
         # Log the successful message creation
         logger.info(f"Contact form submitted by {serializer.data.get('email')}")
         
         headers = self.get_success_headers(serializer.data)
         return Response(
-            {"message": "Your message has been sent successfully! We'll get back to you soon."},
+            {"message": message},
             status=status.HTTP_201_CREATED, 
             headers=headers
         )
@@ -33,28 +57,66 @@ class ContactMessageViewSet(viewsets.ModelViewSet):
 class NewsletterSubscriptionViewSet(viewsets.ModelViewSet):
     queryset = NewsletterSubscription.objects.all()
     serializer_class = NewsletterSubscriptionSerializer
+    permission_classes = [permissions.AllowAny]  # Public form
     http_method_names = ['post']  # Only allow POST requests
     
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
-        
-        # Check if email already exists
-        email = request.data.get('email')
-        if NewsletterSubscription.objects.filter(email=email).exists():
+        serializer.is_valid(raise_exception=True)
+        email = serializer.validated_data['email']
+
+        if ingestion.is_enabled() and ingestion.submit('newsletter', serializer.validated_data):
+            return Response(
+                {"message": "Thank you for subscribing to our newsletter!"},
+                status=status.HTTP_202_ACCEPTED
+            )
+
+        # One INSERT ... ON CONFLICT, no lookup that concurrent requests could race past
+        subscription_id, result = subscribe(email, serializer.validated_data.get('name', ''))
+        if result == EXISTING:
             logger.info(f"Newsletter subscription attempt with existing email: {email}")
             return Response(
                 {"message": "You're already subscribed to our newsletter!"},
                 status=status.HTTP_200_OK
             )
         
-        serializer.is_valid(raise_exception=True)
-        self.perform_create(serializer)
-        
-        logger.info(f"New newsletter subscription: {email}")
+        logger.info(f"New newsletter subscription: {email}" + (" (reactivated)" if result == REACTIVATED else ""))
         
-        headers = self.get_success_headers(serializer.data)
         return Response(
             {"message": "Thank you for subscribing to our newsletter!"},
-            status=status.HTTP_201_CREATED, 
-            headers=headers
+            status=status.HTTP_201_CREATED
         )
+
+    @action(detail=False, methods=['post'], url_path='bulk', permission_classes=[permissions.IsAdminUser],
+            parser_classes=[JSONParser, MultiPartParser])
+    def bulk(self, request):
+        """
+        Import a JSON list of ``{"email", "name"}`` objects (or plain
+        addresses), or a CSV upload in ``file``, and report every row.
+        """
+        options = settings.NEWSLETTER_IMPORT
+        upload = request.FILES.get('file')
+        if upload is not None:
+            try:
+                rows = list(read_csv(io.TextIOWrapper(upload.file, encoding='utf-8-sig')))
+            except (SubscriberImportError, UnicodeDecodeError) as e:
+                raise ValidationError({'file': [str(e)]})
+        elif isinstance(request.data, list):
+            rows = request.data
+        else:
+            raise ValidationError({'detail': 'Send a JSON list of subscribers or a CSV file.'})
+
+        if len(rows) > options['MAX_ROWS']:
+            raise ValidationError({
+                'detail': f"At most {options['MAX_ROWS']} rows per request, use import_subscribers for more."
+            })
+
+        report = import_subscribers(rows, batch_size=options['BATCH_SIZE'])
+        logger.info(f"Bulk newsletter import by {request.user}: {report.summary()}")
+        return Response({
+            **report.summary(),
+            'results': [
+                {'row': number, 'email': email, 'status': result, **({'errors': errors} if errors else {})}
+                for number, email, result, errors in report.results
+            ],
+        })
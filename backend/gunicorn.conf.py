@@ -0,0 +1,25 @@
+# gunicorn.conf.py
+#
+# Run with: gunicorn -c gunicorn.conf.py portfolio_project.wsgi
+import os
+import threading
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 3))
+
+
+def post_worker_init(worker):
+    """
+    Warm the services cache once the worker has loaded Django, so the first
+    requests after a deploy or restart do not all go to the database. The
+    warmup runs in a background thread and the worker serves requests
+    meanwhile. With a shared cache only one worker does the work.
+    """
+    from django.conf import settings
+
+    if not settings.SERVICES_WARMUP['ON_WORKER_BOOT']:
+        return
+
+    from services.warmup import warm_once
+
+    threading.Thread(target=warm_once, name='cache-warmup', daemon=True).start()
@@ -0,0 +1,114 @@
+"""
+Token authentication without a database query per request.
+
+``CachedTokenAuthentication`` is a drop-in ``TokenAuthentication`` that
+keeps the token's user in the shared cache for ``TOKEN_CACHE['TIMEOUT']``
+seconds. Only the user's concrete fields other than the password hash are
+cached; the user is rebuilt from them without a query.
+
+Every token also has a version in the cache, and entries are only used
+while their version is current. Deleting a token (logout, user deletion)
+or saving its user bumps the version once the transaction commits, so a
+request that read the token just before the delete cannot put it back in
+the cache, and a deactivated user loses access immediately rather than
+when the entry expires. If the cache is unreachable the token is looked
+up in the database as usual.
+
+Views choose which authenticators run, and in which order, by naming one
+of the ``AUTHENTICATION_PROFILES`` in ``authentication_profile`` through
+``AuthenticationProfileMixin``.
+"""
+import hashlib
+import logging
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+logger = logging.getLogger('portfolio')
+
+
+def token_cache_keys(key):
+    """Return the entry and version cache keys of token ``key``"""
+    # Raw tokens are credentials, keep them out of the cache keys
+    digest = hashlib.sha256(key.encode()).hexdigest()
+    return f'auth:token:{digest}', f'auth:token:version:{digest}'
+
+
+def version_timeout():
+    # Outlives every entry stamped with an older version
+    return settings.TOKEN_CACHE['TIMEOUT'] * 2
+
+
+def invalidate_token(key):
+    entry_key, version_key = token_cache_keys(key)
+    try:
+        cache.add(version_key, 0, timeout=version_timeout())
+        cache.incr(version_key)
+        cache.touch(version_key, timeout=version_timeout())
+        cache.delete(entry_key)
+    except Exception as e:
+        logger.error(f"Failed to invalidate cached token: {str(e)}")
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        entry_key, version_key = token_cache_keys(key)
+        try:
+            cached = cache.get_many([entry_key, version_key])
+        except Exception as e:
+            logger.error(f"Token cache unavailable, using the database: {str(e)}")
+            return super().authenticate_credentials(key)
+
+        # Read before the database, so a concurrent invalidation always
+        # leaves this request's entry stale
+        version = cached.get(version_key, 0)
+        entry = cached.get(entry_key)
+        if entry is not None and entry['version'] == version:
+            user, token = self.restore(key, entry)
+        else:
+            try:
+                token = self.get_model().objects.select_related('user').get(key=key)
+            except self.get_model().DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            user = token.user
+            try:
+                cache.set(entry_key, self.dump(token, version), timeout=settings.TOKEN_CACHE['TIMEOUT'])
+            except Exception as e:
+                logger.error(f"Failed to cache token: {str(e)}")
+
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        return user, token
+
+    def dump(self, token, version):
+        user = token.user
+        fields = [field.attname for field in user._meta.concrete_fields if field.name != 'password']
+        return {
+            'version': version,
+            'db': token._state.db,
+            'created': token.created,
+            'user': {name: getattr(user, name) for name in fields},
+        }
+
+    def restore(self, key, entry):
+        # The password is left deferred and only loaded if something reads it
+        user = get_user_model().from_db(entry['db'], list(entry['user']), list(entry['user'].values()))
+        token = self.get_model().from_db(entry['db'], ['key', 'user_id', 'created'], [key, user.pk, entry['created']])
+        token.user = user
+        return user, token
+
+
+class AuthenticationProfileMixin:
+    """Runs the authenticators of ``AUTHENTICATION_PROFILES[authentication_profile]``"""
+    authentication_profile = None
+
+    def get_authenticators(self):
+        if self.authentication_profile is None:
+            return super().get_authenticators()
+        paths = settings.AUTHENTICATION_PROFILES[self.authentication_profile]
+        return [import_string(path)() for path in paths]
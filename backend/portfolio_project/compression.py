@@ -0,0 +1,109 @@
+"""
+Response compression negotiated from ``Accept-Encoding``.
+
+Brotli is used when the optional ``brotli`` package is installed and the
+client accepts it, gzip otherwise. Responses that already carry a
+``Content-Encoding``, such as the pre-compressed cached services payloads,
+are passed through untouched.
+
+Brotli has no equivalent of the random padding Django adds to gzip
+against BREACH, so live responses are only brotli-compressed when they
+cannot hold a secret: the request carried no cookies or credentials and
+the response sets no cookie. Everything else, such as admin pages, CSRF
+tokens and authenticated API responses, is gzipped with padding.
+"""
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def available_encodings():
+    """Supported encodings, most preferred first"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate_encoding(request):
+    """Return the best encoding ``request`` accepts, or ``None`` for identity"""
+    accepted = {}
+    for item in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, _, params = item.strip().partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            accepted[coding.lower()] = quality
+
+    for encoding in available_encodings():
+        if accepted.get(encoding, accepted.get('*', 0)) > 0:
+            return encoding
+    return None
+
+
+def compress(content, encoding, best=False):
+    """
+    Compress ``content`` with ``encoding``. ``best`` trades CPU for size
+    and suits payloads that are compressed once and served many times.
+    """
+    options = settings.COMPRESSION
+    if encoding == 'br':
+        return brotli.compress(content, quality=11 if best else options['BROTLI_QUALITY'])
+    # Cached payloads are public catalog data, so they do not need the
+    # random padding that protects secrets in live responses from BREACH
+    return compress_string(content, max_random_bytes=0 if best else GZipMiddleware.max_random_bytes)
+
+
+def is_anonymous(request, response):
+    """Whether ``response`` went to a client without cookies or credentials and sets none"""
+    return not (request.COOKIES or 'HTTP_AUTHORIZATION' in request.META or response.cookies)
+
+
+def compress_variants(content):
+    """Return ``{encoding: compressed}`` for each encoding that makes ``content`` smaller"""
+    if len(content) < settings.COMPRESSION['MIN_SIZE']:
+        return {}
+    variants = {}
+    for encoding in available_encodings():
+        compressed = compress(content, encoding, best=True)
+        if len(compressed) < len(content):
+            variants[encoding] = compressed
+    return variants
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    ``GZipMiddleware`` with brotli support and a configurable minimum
+    size. Streaming responses, and responses that may hold a secret, are
+    only ever gzipped.
+    """
+
+    def process_response(self, request, response):
+        if not response.streaming and len(response.content) < settings.COMPRESSION['MIN_SIZE']:
+            return response
+        if response.streaming or negotiate_encoding(request) != 'br' or not is_anonymous(request, response):
+            return super().process_response(request, response)
+        if response.has_header('Content-Encoding'):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        compressed = compress(response.content, 'br')
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
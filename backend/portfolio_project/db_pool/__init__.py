@@ -0,0 +1,6 @@
+"""
+PostgreSQL backend with an in-process connection pool.
+
+Use ``'ENGINE': 'portfolio_project.db_pool'`` with ``CONN_MAX_AGE = 0`` so
+connections go back to the pool at the end of every request.
+"""
@@ -0,0 +1,213 @@
+"""
+PostgreSQL backend that checks connections out of a per-process pool.
+
+Closing a connection (which Django does at the end of each request when
+``CONN_MAX_AGE`` is 0) returns it to the pool instead of ending the
+session, so requests and async views running on many threads share a
+bounded number of already authenticated connections.
+
+Pools are keyed by process id. A process forked by gunicorn or Celery
+starts with empty pools and never uses, nor closes, the sockets it
+inherited from its parent.
+
+Options, under ``DATABASES[alias]['POOL']``:
+
+``MAX_SIZE``
+    Connections per process. Further checkouts wait for a free one.
+``TIMEOUT``
+    Seconds to wait for a free connection before raising
+    ``OperationalError``.
+``MAX_IDLE``
+    Idle connections are checked with ``SELECT 1`` when they have been
+    unused for longer than this many seconds.
+``MAX_LIFETIME``
+    Connections older than this many seconds are closed when returned.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from django.db.backends.postgresql.base import DatabaseWrapper as PostgresDatabaseWrapper
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+from django.db.utils import OperationalError
+from psycopg2 import extensions
+
+logger = logging.getLogger('portfolio')
+
+DEFAULT_OPTIONS = {
+    'MAX_SIZE': 10,
+    'TIMEOUT': 10,
+    'MAX_IDLE': 30,
+    'MAX_LIFETIME': 60 * 30,
+    # Seconds between stats log lines, 0 disables them
+    'STATS_INTERVAL': 300,
+}
+
+_pools_lock = threading.Lock()
+# (pid, alias, connection parameters) -> ConnectionPool
+_pools = {}
+# Connections inherited across a fork; kept referenced so that garbage
+# collection never sends a termination message on the parent's socket
+_inherited = []
+
+
+class ConnectionPool:
+    def __init__(self, alias, options):
+        self.alias = alias
+        self.pid = os.getpid()
+        self.options = options
+        self.slots = threading.BoundedSemaphore(options['MAX_SIZE'])
+        self.lock = threading.Lock()
+        # (connection, returned_at), most recently returned last
+        self.idle = deque()
+        self.created_at = {}
+        self.stats = {'opened': 0, 'reused': 0, 'closed': 0, 'errors': 0, 'timeouts': 0, 'wait_seconds': 0.0}
+        self.stats_logged_at = time.monotonic()
+
+    def getconn(self, connect):
+        started = time.monotonic()
+        if not self.slots.acquire(timeout=self.options['TIMEOUT']):
+            self.count('timeouts')
+            raise OperationalError(
+                f"No connection available in the {self.alias} pool after {self.options['TIMEOUT']}s"
+            )
+        waited = time.monotonic() - started
+
+        try:
+            conn = self.take_idle()
+            if conn is None:
+                conn = connect()
+                with self.lock:
+                    self.created_at[id(conn)] = time.monotonic()
+                self.count('opened')
+            else:
+                self.count('reused')
+        except Exception:
+            self.count('errors')
+            self.slots.release()
+            raise
+
+        with self.lock:
+            self.stats['wait_seconds'] += waited
+        self.maybe_log_stats()
+        return conn
+
+    def take_idle(self):
+        while True:
+            with self.lock:
+                if not self.idle:
+                    return None
+                conn, returned_at = self.idle.pop()
+            if not conn.closed and self.is_usable(conn, returned_at):
+                return conn
+            self.discard(conn)
+
+    def is_usable(self, conn, returned_at):
+        if time.monotonic() - returned_at < self.options['MAX_IDLE']:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            if not conn.autocommit:
+                conn.rollback()
+            return True
+        except Exception:
+            self.count('errors')
+            return False
+
+    def putconn(self, conn):
+        try:
+            reusable = not conn.closed and self.reset(conn)
+            with self.lock:
+                created_at = self.created_at.get(id(conn), 0)
+            if reusable and time.monotonic() - created_at < self.options['MAX_LIFETIME']:
+                with self.lock:
+                    self.idle.append((conn, time.monotonic()))
+            else:
+                self.discard(conn)
+        finally:
+            self.slots.release()
+
+    def reset(self, conn):
+        """Roll back anything left open so the next user starts clean"""
+        try:
+            if conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+            return True
+        except Exception:
+            self.count('errors')
+            return False
+
+    def discard(self, conn):
+        with self.lock:
+            self.created_at.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self.count('closed')
+
+    def count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {**self.stats, 'idle': len(self.idle), 'open': len(self.created_at)}
+
+    def maybe_log_stats(self):
+        interval = self.options['STATS_INTERVAL']
+        now = time.monotonic()
+        if not interval or now - self.stats_logged_at < interval:
+            return
+        self.stats_logged_at = now
+        logger.info(f"Connection pool {self.alias} (pid {self.pid}): {self.snapshot()}")
+
+
+def get_pool(alias, conn_params, options):
+    key = (os.getpid(), alias, tuple(sorted((name, str(value)) for name, value in conn_params.items())))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(alias, options)
+        return pool
+
+
+def pool_stats():
+    """Return the counters of every pool in the current process by alias"""
+    pid = os.getpid()
+    with _pools_lock:
+        pools = [pool for (owner, _, _), pool in _pools.items() if owner == pid]
+    stats = {}
+    for pool in pools:
+        for name, value in pool.snapshot().items():
+            stats.setdefault(pool.alias, {}).setdefault(name, 0)
+            stats[pool.alias][name] += value
+    return stats
+
+
+class DatabaseWrapper(PostgresDatabaseWrapper):
+    pool = None
+
+    def get_new_connection(self, conn_params):
+        options = {**DEFAULT_OPTIONS, **self.settings_dict.get('POOL', {})}
+        self.pool = get_pool(self.alias, conn_params, options)
+        conn = self.pool.getconn(lambda: super(DatabaseWrapper, self).get_new_connection(conn_params))
+        # The superclass only sets this when it opens a new connection
+        self.isolation_level = IsolationLevel(
+            self.settings_dict['OPTIONS'].get('isolation_level', IsolationLevel.READ_COMMITTED)
+        )
+        return conn
+
+    def _close(self):
+        if self.connection is None:
+            return
+        if self.pool is None:
+            return super()._close()
+        if self.pool.pid != os.getpid():
+            _inherited.append(self.connection)
+            return
+        with self.wrap_database_errors:
+            self.pool.putconn(self.connection)
@@ -0,0 +1,162 @@
+"""
+Primary/replica database routing.
+
+Reads go to a replica only while a safe-method, non-admin API request is
+being handled (see ``ReplicaRoutingMiddleware``); everything else, such as
+Celery tasks, management commands and writes, uses the primary. A client
+that just wrote gets a short-lived cookie that pins its following requests
+to the primary, so it always reads its own writes. Replicas that lag
+behind by more than ``MAX_LAG`` seconds or fail the lag check are skipped
+until the next check.
+
+Anything shared between clients, such as cached payloads and their
+validators, must be computed inside ``primary_reads()``: a replica may
+not have the write that just invalidated the cache yet, and whatever is
+cached then is served to every client, the writer included.
+"""
+import contextvars
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.urls import reverse
+
+logger = logging.getLogger('portfolio')
+
+PRIMARY = 'default'
+PIN_COOKIE = 'db_primary_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Seconds since the last replayed transaction, or 0 when the replica has
+# replayed everything it received. NULL on a server that is not a standby.
+LAG_SQL = (
+    'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+    'ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END'
+)
+
+
+@dataclass
+class RoutingState:
+    use_replica: bool = False
+    wrote: bool = False
+
+
+_state = contextvars.ContextVar('db_routing_state', default=None)
+
+_lag_lock = threading.Lock()
+# alias -> (checked_at, healthy)
+_lag_checks = {}
+
+
+def replica_is_healthy(alias):
+    """Return whether ``alias`` is reachable and within ``MAX_LAG``, rechecking periodically"""
+    options = settings.DATABASE_REPLICA_OPTIONS
+    now = time.monotonic()
+    with _lag_lock:
+        checked = _lag_checks.get(alias)
+        if checked is not None and now - checked[0] < options['LAG_CHECK_INTERVAL']:
+            return checked[1]
+
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute(LAG_SQL)
+            lag = cursor.fetchone()[0]
+        healthy = lag is not None and lag <= options['MAX_LAG']
+        if not healthy:
+            logger.warning(f"Replica {alias} is lagging ({lag}s), reading from the primary")
+    except DatabaseError as e:
+        logger.warning(f"Replica {alias} is unavailable, reading from the primary: {str(e)}")
+        healthy = False
+
+    with _lag_lock:
+        _lag_checks[alias] = (now, healthy)
+    return healthy
+
+
+@contextmanager
+def primary_reads():
+    """Read from the primary inside the block, even in a replica-routed request"""
+    state = _state.get()
+    if state is None:
+        yield
+        return
+    use_replica = state.use_replica
+    state.use_replica = False
+    try:
+        yield
+    finally:
+        # A write inside the block keeps the rest of the request on the primary
+        state.use_replica = use_replica and not state.wrote
+
+
+class PrimaryReplicaRouter:
+    """Send reads to a healthy replica when the current request allows it"""
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not state.use_replica:
+            return PRIMARY
+        replicas = [alias for alias in settings.DATABASE_REPLICAS if replica_is_healthy(alias)]
+        return random.choice(replicas) if replicas else PRIMARY
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            # Read the rest of this request, and the client's next ones,
+            # from the primary
+            state.use_replica = False
+            state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
+
+
+@lru_cache(maxsize=None)
+def admin_prefix():
+    return reverse('admin:index')
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Allow replica reads for safe-method API requests and pin the client to
+    the primary for ``PIN_SECONDS`` after it writes.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = RoutingState(use_replica=self.allows_replica(request))
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+
+        # Without replicas every read already sees the client's writes
+        if settings.DATABASE_REPLICAS and (state.wrote or request.method not in SAFE_METHODS):
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.DATABASE_REPLICA_OPTIONS['PIN_SECONDS'],
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+    def allows_replica(self, request):
+        return (
+            bool(settings.DATABASE_REPLICAS)
+            and request.method in SAFE_METHODS
+            and PIN_COOKIE not in request.COOKIES
+            and not request.path.startswith(admin_prefix())
+        )
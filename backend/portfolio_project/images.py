@@ -0,0 +1,150 @@
+"""
+Resized image derivatives for uploaded images.
+
+Derivatives are generated by Celery tasks after an upload is committed,
+never in the request path. Their filenames embed a hash of the original's
+content, so they are immutable and can be cached forever by browsers and
+CDNs. The derivative map stored on the model looks like::
+
+    {'source': 'services/web.jpg', 'webp': {'320': 'services/derivatives/web-1a2b3c4d5e6f-320w.webp', ...}, ...}
+"""
+import hashlib
+import logging
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from PIL import Image, ImageOps
+from rest_framework import serializers
+
+logger = logging.getLogger('portfolio')
+
+PIL_FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+
+
+def _prepare(image, fmt):
+    """
+    Convert to a mode the target format supports. JPEG has no alpha
+    channel, so transparent images are composited onto white.
+    """
+    has_alpha = image.mode in ('RGBA', 'LA', 'P')
+    if fmt == 'webp':
+        return image.convert('RGBA' if has_alpha else 'RGB')
+    if has_alpha:
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def generate_derivatives(field_file):
+    """
+    Write resized copies of ``field_file`` in every configured format and
+    width, and return the derivative map. Images are never upscaled; the
+    original width is always included so the largest size is available
+    in the efficient formats too.
+    """
+    options = settings.IMAGE_DERIVATIVES
+    storage = field_file.storage
+
+    with field_file.open('rb') as source:
+        data = source.read()
+    digest = hashlib.sha256(data).hexdigest()[:12]
+
+    image = ImageOps.exif_transpose(Image.open(BytesIO(data)))
+    widths = sorted({width for width in options['WIDTHS'] if width < image.width} | {image.width})
+
+    directory, filename = os.path.split(field_file.name)
+    stem = os.path.splitext(filename)[0]
+    derivatives = {'source': field_file.name}
+
+    for width in widths:
+        resized = image.copy()
+        if width < image.width:
+            resized.thumbnail((width, image.height), Image.LANCZOS)
+
+        for fmt in options['FORMATS']:
+            name = os.path.join(directory, 'derivatives', f'{stem}-{digest}-{width}w.{fmt}')
+            if not storage.exists(name):
+                encoded = _prepare(resized, fmt)
+                buffer = BytesIO()
+                encoded.save(buffer, format=PIL_FORMATS[fmt], quality=options['QUALITY'], optimize=True)
+                name = storage.save(name, ContentFile(buffer.getvalue()))
+            derivatives.setdefault(fmt, {})[str(width)] = name
+
+    logger.info(f"Generated {len(widths) * len(options['FORMATS'])} derivatives for {field_file.name}")
+    return derivatives
+
+
+def delete_stale_derivatives(storage, old, new):
+    """Remove files referenced by ``old`` but no longer by ``new``"""
+    keep = {name for fmt, names in new.items() if fmt != 'source' for name in names.values()}
+    for fmt, names in old.items():
+        if fmt == 'source':
+            continue
+        for name in names.values():
+            if name not in keep:
+                try:
+                    storage.delete(name)
+                except Exception as e:
+                    logger.warning(f"Failed to delete derivative {name}: {str(e)}")
+
+
+def refresh_derivatives(model, pk, field_name):
+    """
+    Regenerate derivatives of ``field_name`` on one ``model`` row and store
+    the map in ``<field_name>_derivatives``. The write is skipped if the
+    image changed again meanwhile; the task queued by that save wins.
+    """
+    map_name = f'{field_name}_derivatives'
+    instance = model._default_manager.filter(pk=pk).only(field_name, map_name).first()
+    if instance is None:
+        return None
+
+    field_file = getattr(instance, field_name)
+    old = getattr(instance, map_name)
+    derivatives = generate_derivatives(field_file) if field_file else {}
+
+    changes = {map_name: derivatives}
+    if any(field.name == 'updated_at' for field in model._meta.concrete_fields):
+        changes['updated_at'] = timezone.now()
+    updated = model._default_manager.filter(pk=pk, **{field_name: field_file.name}).update(**changes)
+
+    if updated:
+        delete_stale_derivatives(field_file.storage, old, derivatives)
+    return derivatives
+
+
+class ImageDerivativesField(serializers.Field):
+    """
+    Read-only ``srcset``-style map of derivative URLs::
+
+        {"webp": {"320": "https://.../web-1a2b3c4d5e6f-320w.webp", ...}, "jpeg": {...}}
+
+    Empty until the derivatives task has run.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        storage = self.parent.Meta.model._meta.get_field(self.derivatives_of).storage
+        result = {}
+        for fmt, names in (value or {}).items():
+            if fmt == 'source':
+                continue
+            result[fmt] = {}
+            for width, name in names.items():
+                url = storage.url(name)
+                result[fmt][width] = request.build_absolute_uri(url) if request is not None else url
+        return result
+
+    def bind(self, field_name, parent):
+        super().bind(field_name, parent)
+        # image_derivatives -> image, profile_image_derivatives -> profile_image
+        self.derivatives_of = self.source.rsplit('_derivatives', 1)[0]
@@ -0,0 +1,250 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over the queryset's own ordering.
+
+    Unlike DRF's ``CursorPagination``, which only seeks on the first
+    ordering field and falls back to OFFSET for ties, the cursor holds the
+    values of every ordering field plus the primary key, so each page is a
+    single indexed range scan no matter how deep it is. The ordering is
+    taken from the queryset (falling back to ``Meta.ordering``) and a
+    primary key tie-breaker is appended when missing.
+
+    Orderings on annotations are refused: a computed value such as a float
+    search rank does not survive the JSON round trip exactly, so seeking
+    on equality with it would skip or repeat tied rows. So are orderings
+    on nullable columns, since ``NULL`` compares neither greater, less nor
+    equal and rows holding it could never be sought past.
+    """
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_queryset, cursor = self.get_page_queryset(queryset, request)
+        return self.set_page(list(page_queryset), cursor)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        page_queryset, cursor = self.get_page_queryset(queryset, request)
+        return self.set_page([obj async for obj in page_queryset], cursor)
+
+    def get_page_queryset(self, queryset, request):
+        """Return the unevaluated query for the requested page and the decoded cursor"""
+        self.model = queryset.model
+        self.base_url = remove_query_param(request.build_absolute_uri(), 'page')
+        self.ordering = self.get_ordering(queryset)
+
+        cursor = self.decode_cursor(request)
+        reverse = cursor is not None and cursor['reverse']
+        ordering = [(name, not descending) for name, descending in self.ordering] if reverse else self.ordering
+
+        queryset = queryset.order_by(*[f"{'-' if descending else ''}{name}" for name, descending in ordering])
+        if cursor is not None:
+            queryset = queryset.filter(self.seek_filter(ordering, cursor['values']))
+        # One extra row tells whether there is a next page
+        return queryset[:self.page_size + 1], cursor
+
+    def set_page(self, results, cursor):
+        reverse = cursor is not None and cursor['reverse']
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+
+        self.page = results
+        return results
+
+    def get_ordering(self, queryset):
+        """Return ``[(field_name, descending), ...]`` ending in the primary key"""
+        opts = queryset.model._meta
+        ordering = []
+        for field in queryset.query.order_by or opts.ordering:
+            if not isinstance(field, str):
+                raise TypeError('KeysetPagination only supports ordering by field names')
+            descending = field.startswith('-')
+            name = field.lstrip('-')
+            if name in queryset.query.annotations:
+                raise TypeError('KeysetPagination does not support ordering by annotations')
+            try:
+                nullable = opts.get_field(name).null
+            except FieldDoesNotExist:
+                nullable = False
+            if nullable:
+                raise TypeError('KeysetPagination does not support ordering by nullable fields')
+            ordering.append((opts.pk.name if name == 'pk' else name, descending))
+
+        if not any(name == opts.pk.name for name, _ in ordering):
+            # Break ties in the direction of the last ordering field so a
+            # single composite index can serve the whole ORDER BY
+            ordering.append((opts.pk.name, ordering[-1][1] if ordering else False))
+        return ordering
+
+    def supports(self, queryset):
+        try:
+            self.get_ordering(queryset)
+        except TypeError:
+            return False
+        return True
+
+    def seek_filter(self, ordering, values):
+        """
+        Build ``(a > x) OR (a = x AND b > y) OR ...`` for the rows that
+        come after ``values`` in ``ordering``.
+        """
+        condition = Q()
+        equal = Q()
+        for (name, descending), value in zip(ordering, values):
+            lookup = 'lt' if descending else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def get_field(self, name):
+        try:
+            return self.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # Not a concrete field of the model
+            return None
+
+    def position(self, obj):
+        values = []
+        for name, _ in self.ordering:
+            field = self.get_field(name)
+            value = getattr(obj, field.attname if field is not None else name)
+            if hasattr(value, 'isoformat'):
+                value = value.isoformat()
+            values.append(value)
+        return values
+
+    def encode_cursor(self, values, reverse):
+        payload = json.dumps({'v': values, 'r': reverse}, separators=(',', ':'))
+        encoded = urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4)))
+            values, reverse = payload['v'], bool(payload['r'])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return {'values': self.to_python(values), 'reverse': reverse}
+
+    def to_python(self, values):
+        converted = []
+        for (name, _), value in zip(self.ordering, values):
+            field = self.get_field(name)
+            try:
+                converted.append(field.to_python(value) if field is not None else value)
+            except ValidationError:
+                raise NotFound(self.invalid_cursor_message)
+        return converted
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.position(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.position(self.page[0]), reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class PageNumberOrKeysetPagination(PageNumberPagination):
+    """
+    Page-number pagination by default, keyset pagination on request.
+
+    Clients opt in with ``?pagination=keyset`` for the first page and then
+    follow the ``next``/``previous`` links, which carry a ``cursor``.
+    Keyset pages skip the ``COUNT(*)`` and ``OFFSET`` of page numbers.
+    Querysets keyset pagination cannot seek on, such as search results
+    ordered by rank, always get page numbers.
+    """
+    mode_query_param = 'pagination'
+    keyset_class = KeysetPagination
+
+    def use_keyset(self, queryset, request):
+        requested = (
+            request.query_params.get(self.mode_query_param) == 'keyset'
+            or self.keyset_class.cursor_query_param in request.query_params
+        )
+        return requested and self.keyset_class().supports(queryset)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.use_keyset(queryset, request):
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Async counterpart of ``paginate_queryset`` for the async views"""
+        self.keyset = None
+        if self.use_keyset(queryset, request):
+            self.keyset = self.keyset_class()
+            return await self.keyset.apaginate_queryset(queryset, request, view)
+
+        # Mirrors PageNumberPagination.paginate_queryset, with the count and
+        # the page fetched through the async ORM
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        self.page.object_list = [obj async for obj in self.page.object_list]
+
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        return list(self.page)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
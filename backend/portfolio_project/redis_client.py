@@ -0,0 +1,25 @@
+"""
+Redis connections for features that need more than the cache API, such
+as streams. Clients are shared per process and URL; forked workers get
+their own connection pools.
+"""
+import os
+import threading
+
+import redis
+from django.conf import settings
+
+_lock = threading.Lock()
+# (pid, url) -> redis.Redis
+_clients = {}
+
+
+def get_redis(url=None):
+    """Return a client for ``url``, ``REDIS_URL`` by default"""
+    url = url or settings.REDIS_URL
+    key = (os.getpid(), url)
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = redis.Redis.from_url(url, socket_timeout=5, socket_connect_timeout=5)
+        return client
@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 import os
 from pathlib import Path
 import environ
+from django.core.exceptions import ImproperlyConfigured
 
 # Initialize environment variables
 env = environ.Env()
@@ -63,6 +64,8 @@ APPEND_SLASH = False
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     "django.middleware.security.SecurityMiddleware",
+    "portfolio_project.compression.CompressionMiddleware",
+    "portfolio_project.db_router.ReplicaRoutingMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -111,13 +114,205 @@ DATABASES = {
     }
 }
 
+# Connection reuse, chosen with DB_CONNECTION_MODE:
+# - persistent: each thread keeps its connection for DB_CONN_MAX_AGE seconds
+# - pool: connections are returned to an in-process pool after every request
+#   (portfolio_project.db_pool); use this under ASGI, where requests do not
+#   stay on one thread
+# - pgbouncer: persistent connections to PgBouncer in transaction pooling
+#   mode, which cannot keep server-side cursors open across transactions
+DB_CONNECTION_MODE = env('DB_CONNECTION_MODE', default='persistent')
+DATABASES['default'].update({
+    'CONN_MAX_AGE': env.int('DB_CONN_MAX_AGE', default=60),
+    # Check persistent connections before reusing them in a new request
+    'CONN_HEALTH_CHECKS': env.bool('DB_CONN_HEALTH_CHECKS', default=True),
+})
+if DB_CONNECTION_MODE == 'pool':
+    DATABASES['default'].update({
+        'ENGINE': 'portfolio_project.db_pool',
+        'CONN_MAX_AGE': 0,
+        'POOL': {
+            'MAX_SIZE': env.int('DB_POOL_MAX_SIZE', default=10),
+            'TIMEOUT': env.int('DB_POOL_TIMEOUT', default=10),
+        },
+    })
+elif DB_CONNECTION_MODE == 'pgbouncer':
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+elif DB_CONNECTION_MODE != 'persistent':
+    raise ImproperlyConfigured(f'Unknown DB_CONNECTION_MODE: {DB_CONNECTION_MODE}')
+
+# Optional read replicas, e.g. DB_REPLICA_HOSTS=replica1:5432,replica2
+# Safe-method API requests read from them (see portfolio_project.db_router)
+DATABASE_REPLICAS = []
+for index, replica in enumerate(env.list('DB_REPLICA_HOSTS', default=[]), start=1):
+    host, _, port = replica.partition(':')
+    alias = f'replica{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['portfolio_project.db_router.PrimaryReplicaRouter']
+
+DATABASE_REPLICA_OPTIONS = {
+    # Replicas further behind the primary than this many seconds are skipped
+    'MAX_LAG': env.int('DB_REPLICA_MAX_LAG', default=5),
+    # Seconds between replica lag checks in each process
+    'LAG_CHECK_INTERVAL': 10,
+    # Seconds a client reads from the primary after it writes
+    'PIN_SECONDS': env.int('DB_REPLICA_PIN_SECONDS', default=10),
+}
+
+# Shared cache so invalidations made by one worker are seen by all of them
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+        'BACKEND': env('CACHE_BACKEND', default='django.core.cache.backends.redis.RedisCache'),
+        'LOCATION': env('CACHE_URL', default='redis://localhost:6379/1'),
+        'KEY_PREFIX': 'portfolio',
     }
 }
 
+# Email
+EMAIL_BACKEND = env('EMAIL_BACKEND', default='django.core.mail.backends.smtp.EmailBackend')
+EMAIL_HOST = env('EMAIL_HOST', default='localhost')
+EMAIL_PORT = env.int('EMAIL_PORT', default=25)
+EMAIL_HOST_USER = env('EMAIL_HOST_USER', default='')
+EMAIL_HOST_PASSWORD = env('EMAIL_HOST_PASSWORD', default='')
+EMAIL_USE_TLS = env.bool('EMAIL_USE_TLS', default=False)
+EMAIL_TIMEOUT = env.int('EMAIL_TIMEOUT', default=30)
+DEFAULT_FROM_EMAIL = env('DEFAULT_FROM_EMAIL', default='webmaster@localhost')
+# Receives the contact form notifications
+ADMIN_EMAIL = env('ADMIN_EMAIL', default='admin@example.com')
+
+CONTACT_NOTIFICATIONS = {
+    # Seconds to collect messages into one digest email, 0 sends one email
+    # per message as soon as it is saved
+    'DIGEST_WINDOW': env.int('CONTACT_NOTIFICATIONS_DIGEST_WINDOW', default=0),
+    # Messages sent per task run over a single SMTP connection
+    'BATCH_SIZE': 100,
+    # Seconds after which messages claimed by a run that died are claimed again
+    'CLAIM_TIMEOUT': 60 * 10,
+}
+
+NEWSLETTER_IMPORT = {
+    # Rows per INSERT when importing subscriber lists
+    'BATCH_SIZE': 1000,
+    # Larger lists go through the import_subscribers command
+    'MAX_ROWS': 10000,
+}
+
+NEWSLETTER_CAMPAIGNS = {
+    # Subscribers per send_campaign_chunk task
+    'CHUNK_SIZE': 500,
+    # Emails per second across all workers, 0 for no limit
+    'RATE': env.int('NEWSLETTER_SEND_RATE', default=10),
+    # Seconds after which a delivery claimed by a worker that never
+    # reported back is marked failed
+    'CLAIM_TIMEOUT': 60 * 30,
+}
+
+CONTACT_INGESTION = {
+    # direct: every POST inserts and commits; stream: validated POSTs are
+    # appended to a Redis stream, answered with 202 and inserted in batches
+    'MODE': env('CONTACT_INGESTION_MODE', default='direct'),
+    # Run Redis with appendonly so buffered submissions survive a restart
+    'REDIS_URL': env('CONTACT_INGESTION_REDIS_URL', default=None),
+    'STREAM': 'contact:ingest',
+    'GROUP': 'contact-ingest',
+    'BATCH_SIZE': 500,
+    # Seconds to collect a burst before draining it
+    'DRAIN_DELAY': 1,
+    # Entries read but not acknowledged for this many seconds are taken
+    # over from a consumer that died
+    'CLAIM_IDLE': 60,
+}
+
+CONTACT_SPAM_FILTER = {
+    'ENABLED': env.bool('CONTACT_SPAM_FILTER', default=True),
+    # cache: exact, one key per message; bloom: fixed-size Redis bitmaps
+    'STORE': env('CONTACT_SPAM_FILTER_STORE', default='cache'),
+    'REDIS_URL': env('CONTACT_SPAM_FILTER_REDIS_URL', default=None),
+    # Identical messages within this many seconds are collapsed into one
+    'WINDOW': 60 * 60 * 24,
+    # Bloom filter sizing: distinct messages per window and false positive rate
+    'CAPACITY': env.int('CONTACT_SPAM_FILTER_CAPACITY', default=100000),
+    'ERROR_RATE': env.float('CONTACT_SPAM_FILTER_ERROR_RATE', default=0.0001),
+    # Submissions allowed per client IP and per email address in RATE_WINDOW
+    'MAX_PER_IP': 10,
+    'MAX_PER_EMAIL': 5,
+    'RATE_WINDOW': 60 * 60,
+}
+
+CONTACT_ARCHIVE = {
+    # Months of contact messages kept in the database; older monthly
+    # partitions are moved to gzipped NDJSON archives
+    'RETENTION_MONTHS': env.int('CONTACT_ARCHIVE_RETENTION_MONTHS', default=12),
+    # Partitions created ahead of time
+    'PREMAKE_MONTHS': 3,
+    # Dotted path of the archive storage class, default_storage if unset
+    'STORAGE': env('CONTACT_ARCHIVE_STORAGE', default=None),
+    'PREFIX': 'contact_archive',
+    # Rows read per query while archiving
+    'BATCH_SIZE': 5000,
+}
+
+# Services catalog cache settings
+SERVICES_CACHE = {
+    # Seconds an entry is fresh; the actual value is jittered by +/- JITTER
+    'TIMEOUT': env.int('SERVICES_CACHE_TIMEOUT', default=60 * 60),
+    # Seconds an expired entry may still be served while it is refreshed
+    'STALE_TIMEOUT': env.int('SERVICES_CACHE_STALE_TIMEOUT', default=60 * 60 * 24),
+    'JITTER': 0.1,
+    # How long a recompute lock is held, and how long others wait for it
+    'LOCK_TIMEOUT': 30,
+    'LOCK_WAIT': 2,
+    # 'inline' refreshes in the request that wins the lock, 'celery' in a task
+    'REFRESH': env('SERVICES_CACHE_REFRESH', default='inline'),
+}
+
+# Response compression (portfolio_project.compression); brotli is used when
+# the optional brotli package is installed (poetry install --extras brotli)
+COMPRESSION = {
+    # Responses smaller than this many bytes are sent uncompressed
+    'MIN_SIZE': env.int('COMPRESSION_MIN_SIZE', default=1024),
+    # Quality for live responses; cached payloads always use the best one
+    'BROTLI_QUALITY': 5,
+}
+
+# Static JSON snapshots of the catalog (services.snapshots), republished
+# DEBOUNCE seconds after changes
+SERVICES_SNAPSHOTS = {
+    'ENABLED': env.bool('SERVICES_SNAPSHOTS_ENABLED', default=False),
+    # Storage class path, empty for the default (media) storage
+    'STORAGE': env('SERVICES_SNAPSHOTS_STORAGE', default=''),
+    'PREFIX': 'snapshots',
+    # Public host the absolute image URLs are rendered for
+    'HOST': env('SERVICES_SNAPSHOTS_HOST', default='localhost:8000'),
+    'SECURE': env.bool('SERVICES_SNAPSHOTS_SECURE', default=False),
+    'DEBOUNCE': env.int('SERVICES_SNAPSHOTS_DEBOUNCE', default=60),
+}
+
+# Serve the services list, detail and featured endpoints from async views
+# (services.async_views); only worthwhile when running under ASGI
+SERVICES_ASYNC_VIEWS = env.bool('SERVICES_ASYNC_VIEWS', default=False)
+
+# Services cache warmup (warm_caches command, task and gunicorn hook)
+SERVICES_WARMUP = {
+    # Hosts the API is served under; cached payloads vary by host
+    'HOSTS': env.list('SERVICES_WARMUP_HOSTS', default=['localhost:8000']),
+    'SECURE': env.bool('SERVICES_WARMUP_SECURE', default=False),
+    # Number of list pages to precompute
+    'LIST_PAGES': env.int('SERVICES_WARMUP_LIST_PAGES', default=3),
+    'THREADS': env.int('SERVICES_WARMUP_THREADS', default=4),
+    # Seconds after which remaining requests are skipped
+    'BUDGET': env.int('SERVICES_WARMUP_BUDGET', default=30),
+    # Warm up from each gunicorn worker after it boots
+    'ON_WORKER_BOOT': env.bool('SERVICES_WARMUP_ON_WORKER_BOOT', default=False),
+}
+
 
 # Session configuration
 SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
@@ -165,6 +360,14 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Resized copies generated in Celery for Service.image and
+# UserProfile.profile_image
+IMAGE_DERIVATIVES = {
+    'WIDTHS': env.list('IMAGE_DERIVATIVE_WIDTHS', cast=int, default=[320, 640, 1024, 1600]),
+    'FORMATS': ['webp', 'jpeg'],
+    'QUALITY': 80,
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -184,8 +387,9 @@ CORS_ALLOW_CREDENTIALS = True
 CORS_ALLOW_ALL_ORIGINS = True
 
 # Add to portfolio_project/settings.py
-CELERY_BROKER_URL = env('REDIS_URL', default='redis://localhost:6379/0')
-CELERY_RESULT_BACKEND = env('REDIS_URL', default='redis://localhost:6379/0')
+REDIS_URL = env('REDIS_URL', default='redis://localhost:6379/0')
+CELERY_BROKER_URL = REDIS_URL
+CELERY_RESULT_BACKEND = REDIS_URL
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
@@ -201,6 +405,22 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'services.tasks.backup_database',
         'schedule': 60 * 60 * 24 * 7,  # Run weekly
     },
+    'send-contact-notifications': {
+        'task': 'contact.tasks.send_contact_notifications',
+        'schedule': 60 * 10,  # Catch messages whose notification failed to queue
+    },
+    'recover-newsletter-campaigns': {
+        'task': 'contact.tasks.recover_newsletter_campaigns',
+        'schedule': 60 * 5,
+    },
+    'archive-contact-messages': {
+        'task': 'contact.tasks.archive_contact_messages',
+        'schedule': 60 * 60 * 24,  # Run daily
+    },
+    'drain-contact-ingestion': {
+        'task': 'contact.tasks.drain_contact_ingestion',
+        'schedule': 60,  # Picks up entries a crashed drain left unacknowledged
+    },
 }
 
 # REST Framework settings
@@ -208,7 +428,7 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
+        'portfolio_project.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
@@ -227,10 +447,27 @@ REST_FRAMEWORK = {
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    # Page numbers by default, keyset pages with ?pagination=keyset
+    'DEFAULT_PAGINATION_CLASS': 'portfolio_project.pagination.PageNumberOrKeysetPagination',
     'PAGE_SIZE': 10,
 }
 
+# Authenticators of the views that set authentication_profile, in order
+AUTHENTICATION_PROFILES = {
+    # The frontend and API clients send "Authorization: Token <key>", so
+    # check it first; sessions and basic auth keep working after it
+    'token': [
+        'portfolio_project.authentication.CachedTokenAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ],
+}
+
+TOKEN_CACHE = {
+    # Seconds an authenticated token is served from the cache
+    'TIMEOUT': env.int('TOKEN_CACHE_TIMEOUT', default=300),
+}
+
 # Logging Configuration
 LOGGING = {
     'version': 1,
@@ -5,4 +5,7 @@ CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
     }
-}
\ No newline at end of file
+}
+
+# Run Celery tasks in-process so tests never need a broker
+CELERY_TASK_ALWAYS_EAGER = True
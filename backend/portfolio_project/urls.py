@@ -3,12 +3,14 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from .views import DatabasePoolStatsView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/accounts/', include('accounts.urls')),
     path('api/services/', include('services.urls')),
     path('api/contact/', include('contact.urls')),
+    path('api/db-pool/', DatabasePoolStatsView.as_view(), name='db-pool-stats'),
 ]
 
 # Serve media files in development
@@ -0,0 +1,12 @@
+import os
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .db_pool.base import pool_stats
+
+class DatabasePoolStatsView(APIView):
+    """Connection pool counters of the worker process that serves the request"""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response({'pid': os.getpid(), 'pools': pool_stats()})
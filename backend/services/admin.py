@@ -5,4 +5,11 @@ from .models import Service
 class ServiceAdmin(admin.ModelAdmin):
     list_display = ('title', 'created_at', 'updated_at')
     prepopulated_fields = {'slug': ('title',)}
-    search_fields = ('title', 'description', 'category__name')
\ No newline at end of file
+    # Only needed to show the search box; searching goes through the
+    # full-text index in get_search_results.
+    search_fields = ('title',)
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return queryset.search(search_term), False
\ No newline at end of file
@@ -0,0 +1,126 @@
+"""
+Async variants of the hottest read endpoints: the services list, detail
+and featured listings.
+
+Under ASGI these run on the event loop instead of occupying a thread for
+the whole request, so a worker can hold many slow clients at once. They
+reuse ``ServiceViewSet`` for content negotiation, authentication,
+throttling, querysets and serializers, read through the async ORM and
+cache APIs, and share cache entries and validators with the sync views.
+Other methods fall back to the sync view. Enable them with
+``SERVICES_ASYNC_VIEWS``.
+"""
+import functools
+
+from asgiref.sync import sync_to_async
+from django.http import Http404
+
+from portfolio_project.compression import negotiate_encoding
+from .cache import (
+    amake_key, aget_or_refresh, aget_catalog_state, aget_service_state,
+    request_variant, render_payload, payload_response, get_validators, conditional_response, set_validators,
+)
+from .models import Service
+from .views import ServiceViewSet
+
+ASYNC_METHODS = ('GET', 'HEAD')
+
+
+def async_action(action, **initkwargs):
+    """
+    Turn ``handler(view, request, **kwargs)`` into an async Django view
+    running the ``ServiceViewSet`` request lifecycle for ``action``.
+    """
+    actions = {'get': action, 'head': action}
+    sync_view = sync_to_async(ServiceViewSet.as_view({'get': action}, **initkwargs))
+
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def view(request, *args, **kwargs):
+            if request.method not in ASYNC_METHODS:
+                return await sync_view(request, *args, **kwargs)
+
+            viewset = ServiceViewSet(action_map=actions, args=args, kwargs=kwargs, **initkwargs)
+            viewset.request = drf_request = viewset.initialize_request(request, *args, **kwargs)
+            viewset.headers = viewset.default_response_headers
+            try:
+                # Authentication and throttling may hit the database
+                await sync_to_async(viewset.initial)(drf_request, *args, **kwargs)
+                response = await handler(viewset, drf_request, *args, **kwargs)
+            except Exception as exc:
+                response = viewset.handle_exception(exc)
+            return viewset.finalize_response(drf_request, response, *args, **kwargs)
+
+        view.csrf_exempt = True
+        return view
+
+    return decorator
+
+
+async def cached_response(view, name, abuild, state=None, include_query=False):
+    """Async counterpart of ``ServiceViewSet.cached_response``"""
+    variant = request_variant(view.request, include_query, fieldset=view.get_fieldset())
+    encoding = negotiate_encoding(view.request)
+
+    if state is not None:
+        etag, last_modified = get_validators(state, variant, encoding)
+        if not view.refreshing_cache:
+            not_modified = conditional_response(view.request, etag, last_modified)
+            if not_modified is not None:
+                return not_modified
+
+    async def compute():
+        return render_payload(await abuild(), view.request, view.get_renderer_context())
+
+    entry = await aget_or_refresh(
+        await amake_key(f'{name}:{variant}'),
+        compute,
+        schedule_refresh=view.get_refresh_scheduler(),
+        force=view.refreshing_cache,
+    )
+
+    response = payload_response(entry, encoding)
+    if state is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+@async_action('list')
+async def service_list(view, request):
+    async def build():
+        queryset = view.filter_queryset(view.get_queryset())
+        page = await view.paginator.apaginate_queryset(queryset, request, view=view)
+        serializer = view.get_serializer(page, many=True)
+        return view.get_paginated_response(serializer.data).data
+
+    return await cached_response(
+        view, 'services_list', build, state=await aget_catalog_state(view.queryset), include_query=True,
+    )
+
+
+@async_action('retrieve')
+async def service_detail(view, request, slug):
+    async def build():
+        queryset = view.filter_queryset(view.get_queryset())
+        try:
+            service = await queryset.aget(slug=slug)
+        except Service.DoesNotExist:
+            raise Http404('No Service matches the given query.')
+        view.check_object_permissions(request, service)
+        return view.get_serializer(service).data
+
+    return await cached_response(
+        view, f'service_{slug}', build, state=await aget_service_state(view.queryset, slug),
+    )
+
+
+@async_action('featured')
+async def featured_services(view, request):
+    async def build():
+        queryset = view.get_queryset().filter(is_featured=True)
+        services = [service async for service in queryset]
+        return view.get_serializer(services, many=True).data
+
+    return await cached_response(
+        view, 'featured_services', build, state=await aget_catalog_state(view.queryset),
+    )
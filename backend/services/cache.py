@@ -0,0 +1,409 @@
+"""
+Cache helpers for the services catalog.
+
+Every cache key derived from the catalog is namespaced by a generation
+number kept in the shared cache. Bumping the generation makes all derived
+keys unreachable for every worker at once, so invalidation is a single
+INCR no matter how many slugs, pages or variants are cached.
+"""
+import asyncio
+import hashlib
+import logging
+import random
+import threading
+import time
+from calendar import timegm
+from contextlib import contextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max
+from django.dispatch import Signal
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from portfolio_project.compression import compress_variants
+from portfolio_project.db_router import primary_reads
+
+logger = logging.getLogger('portfolio')
+
+GENERATION_KEY = 'services:generation'
+CHANGED_AT_KEY = 'services:changed_at'
+
+_batch = threading.local()
+
+# Sent after the catalog cache has been invalidated, i.e. once per
+# committed change to the catalog, including bulk writes
+catalog_changed = Signal()
+
+
+def _new_generation():
+    # Seed from the clock so a generation lost to eviction or a cache flush
+    # can never be reissued while entries from the old namespace still exist.
+    return int(time.time() * 1000)
+
+
+def get_generation():
+    """Return the current catalog generation, creating it if missing."""
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, _new_generation(), timeout=None)
+        generation = cache.get(GENERATION_KEY, 0)
+    return generation
+
+
+async def aget_generation():
+    generation = await cache.aget(GENERATION_KEY)
+    if generation is None:
+        await cache.aadd(GENERATION_KEY, _new_generation(), timeout=None)
+        generation = await cache.aget(GENERATION_KEY, 0)
+    return generation
+
+
+def make_key(name):
+    """Build a generation-scoped cache key for a catalog entry."""
+    return f'services:{get_generation()}:{name}'
+
+
+async def amake_key(name):
+    return f'services:{await aget_generation()}:{name}'
+
+
+def invalidate_catalog():
+    """Invalidate every cached catalog entry across all workers."""
+    try:
+        generation = cache.incr(GENERATION_KEY)
+    except ValueError:
+        generation = _new_generation()
+        cache.set(GENERATION_KEY, generation, timeout=None)
+    # Deletes do not move max(updated_at), so remember when the catalog
+    # last changed for Last-Modified.
+    cache.set(CHANGED_AT_KEY, timezone.now(), timeout=None)
+    logger.info(f"Services cache invalidated, generation is now {generation}")
+    catalog_changed.send(sender=None, generation=generation)
+    return generation
+
+
+def invalidate_catalog_on_commit():
+    """
+    Invalidate once the surrounding transaction commits.
+
+    Invalidating earlier would let another worker repopulate the new
+    generation with rows that are about to change. Inside
+    ``batched_invalidation()`` this is deferred to the end of the batch.
+    """
+    if getattr(_batch, 'depth', 0):
+        _batch.pending = True
+        return
+    transaction.on_commit(invalidate_catalog)
+
+
+@contextmanager
+def batched_invalidation():
+    """Collapse every invalidation made inside the block into a single one"""
+    _batch.depth = getattr(_batch, 'depth', 0) + 1
+    if _batch.depth == 1:
+        _batch.pending = False
+    try:
+        yield
+    finally:
+        _batch.depth -= 1
+        if _batch.depth == 0 and _batch.pending:
+            invalidate_catalog_on_commit()
+
+
+def _lock_key(key):
+    return f'{key}:lock'
+
+
+def acquire_lock(key):
+    """Try to become the single worker allowed to recompute ``key``."""
+    return cache.add(_lock_key(key), 1, settings.SERVICES_CACHE['LOCK_TIMEOUT'])
+
+
+def release_lock(key):
+    cache.delete(_lock_key(key))
+
+
+async def aacquire_lock(key):
+    return await cache.aadd(_lock_key(key), 1, settings.SERVICES_CACHE['LOCK_TIMEOUT'])
+
+
+async def arelease_lock(key):
+    await cache.adelete(_lock_key(key))
+
+
+def _jittered(seconds):
+    jitter = settings.SERVICES_CACHE['JITTER']
+    return seconds * random.uniform(1 - jitter, 1 + jitter)
+
+
+def _envelope(value):
+    options = settings.SERVICES_CACHE
+    fresh_for = _jittered(options['TIMEOUT'])
+    return {'value': value, 'fresh_until': time.time() + fresh_for}, fresh_for + options['STALE_TIMEOUT']
+
+
+def store(key, value):
+    """
+    Cache ``value`` as fresh for a jittered soft TTL, then keep it around
+    for ``STALE_TIMEOUT`` more seconds so it can be served while refreshing.
+    """
+    envelope, timeout = _envelope(value)
+    cache.set(key, envelope, timeout)
+    return value
+
+
+async def astore(key, value):
+    envelope, timeout = _envelope(value)
+    await cache.aset(key, envelope, timeout)
+    return value
+
+
+def _wait_for(key):
+    deadline = time.time() + settings.SERVICES_CACHE['LOCK_WAIT']
+    while time.time() < deadline:
+        time.sleep(0.05)
+        envelope = cache.get(key)
+        if envelope is not None:
+            return envelope
+    return None
+
+
+async def _await_for(key):
+    deadline = time.time() + settings.SERVICES_CACHE['LOCK_WAIT']
+    while time.time() < deadline:
+        await asyncio.sleep(0.05)
+        envelope = await cache.aget(key)
+        if envelope is not None:
+            return envelope
+    return None
+
+
+def _compute(compute):
+    # Cached values are shared by every client, so never build them from a
+    # replica that may not have the change that invalidated them yet
+    with primary_reads():
+        return compute()
+
+
+async def _acompute(acompute):
+    with primary_reads():
+        return await acompute()
+
+
+def _compute_and_store(key, compute):
+    try:
+        return store(key, _compute(compute))
+    finally:
+        release_lock(key)
+
+
+def get_or_refresh(key, compute, schedule_refresh=None, force=False):
+    """
+    Return the cached value for ``key``, recomputing it with ``compute``
+    at most once across all workers.
+
+    Fresh values are returned as is. Once the soft TTL has passed the
+    stale value is still returned while a single lock holder refreshes
+    it, either inline or by calling ``schedule_refresh``, which must
+    release the lock when done. On a hard miss, workers that lose the
+    race wait briefly for the lock holder instead of hitting the
+    database themselves. ``force`` recomputes unconditionally.
+    """
+    if force:
+        return _compute_and_store(key, compute)
+
+    envelope = cache.get(key)
+
+    if envelope is not None:
+        if envelope['fresh_until'] > time.time() or not acquire_lock(key):
+            return envelope['value']
+        if schedule_refresh is not None:
+            try:
+                schedule_refresh()
+                return envelope['value']
+            except Exception as e:
+                logger.error(f"Failed to schedule refresh of {key}, refreshing inline: {str(e)}")
+        return _compute_and_store(key, compute)
+
+    if acquire_lock(key):
+        return _compute_and_store(key, compute)
+
+    envelope = _wait_for(key)
+    if envelope is not None:
+        return envelope['value']
+    logger.warning(f"Timed out waiting for {key} to be recomputed")
+    return store(key, _compute(compute))
+
+
+async def _acompute_and_store(key, acompute):
+    try:
+        return await astore(key, await _acompute(acompute))
+    finally:
+        await arelease_lock(key)
+
+
+async def aget_or_refresh(key, acompute, schedule_refresh=None, force=False):
+    """
+    Async counterpart of ``get_or_refresh``; ``acompute`` is a coroutine
+    function and waiting for another worker never blocks the event loop.
+    """
+    if force:
+        return await _acompute_and_store(key, acompute)
+
+    envelope = await cache.aget(key)
+
+    if envelope is not None:
+        if envelope['fresh_until'] > time.time() or not await aacquire_lock(key):
+            return envelope['value']
+        if schedule_refresh is not None:
+            try:
+                await sync_to_async(schedule_refresh)()
+                return envelope['value']
+            except Exception as e:
+                logger.error(f"Failed to schedule refresh of {key}, refreshing inline: {str(e)}")
+        return await _acompute_and_store(key, acompute)
+
+    if await aacquire_lock(key):
+        return await _acompute_and_store(key, acompute)
+
+    envelope = await _await_for(key)
+    if envelope is not None:
+        return envelope['value']
+    logger.warning(f"Timed out waiting for {key} to be recomputed")
+    return await astore(key, await _acompute(acompute))
+
+
+def _catalog_state(aggregate, changed_at, generation):
+    last_modified = aggregate['last_modified']
+    if changed_at is not None and (last_modified is None or changed_at > last_modified):
+        last_modified = changed_at
+    return {
+        'version': f"{generation}:{aggregate['count']}:{last_modified}",
+        'last_modified': last_modified,
+    }
+
+
+def _service_state(slug, last_modified):
+    if last_modified is None:
+        return None
+    return {'version': f'{slug}:{last_modified}', 'last_modified': last_modified}
+
+
+def get_catalog_state(queryset):
+    """
+    Return the version and last-modified time of the whole catalog.
+
+    Computed with a single aggregate query once per generation, so
+    validators never require serializing the payload.
+    """
+    def compute():
+        aggregate = queryset.aggregate(last_modified=Max('updated_at'), count=Count('pk'))
+        return _catalog_state(aggregate, cache.get(CHANGED_AT_KEY), get_generation())
+
+    return get_or_refresh(make_key('catalog_state'), compute)
+
+
+async def aget_catalog_state(queryset):
+    async def compute():
+        aggregate = await queryset.aaggregate(last_modified=Max('updated_at'), count=Count('pk'))
+        return _catalog_state(aggregate, await cache.aget(CHANGED_AT_KEY), await aget_generation())
+
+    return await aget_or_refresh(await amake_key('catalog_state'), compute)
+
+
+def get_service_state(queryset, slug):
+    """
+    Return the version and last-modified time of a single service, or
+    ``None`` if no service matches ``slug``.
+    """
+    def compute():
+        return _service_state(slug, queryset.filter(slug=slug).values_list('updated_at', flat=True).first())
+
+    return get_or_refresh(make_key(f'service_state_{slug}'), compute)
+
+
+async def aget_service_state(queryset, slug):
+    async def compute():
+        return _service_state(slug, await queryset.filter(slug=slug).values_list('updated_at', flat=True).afirst())
+
+    return await aget_or_refresh(await amake_key(f'service_state_{slug}'), compute)
+
+
+def request_variant(request, include_query=False, fieldset=None):
+    """
+    Digest of the request attributes that change the rendered bytes.
+
+    Image and pagination URLs are absolute, so the host is part of the
+    variant, as is the negotiated media type (``indent`` and friends)
+    and the sparse fieldset, if any.
+    """
+    parts = [request.build_absolute_uri('/'), request.accepted_media_type]
+    if fieldset is not None:
+        parts.append(','.join(fieldset))
+    if include_query:
+        parts.append(request.query_params.urlencode())
+    return hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+
+def render_payload(data, request, renderer_context):
+    """
+    Render ``data`` exactly as a DRF ``Response`` would and return a
+    cacheable entry holding the encoded body, its content type and its
+    compressed variants, so hits never compress.
+    """
+    renderer = request.accepted_renderer
+    content_type = renderer.media_type
+    if renderer.charset is not None:
+        content_type = f'{content_type}; charset={renderer.charset}'
+    body = renderer.render(data, request.accepted_media_type, renderer_context)
+    if isinstance(body, str):
+        body = body.encode(renderer.charset)
+    return {'body': body, 'content_type': content_type, 'encodings': compress_variants(body)}
+
+
+def payload_response(entry, encoding=None):
+    """
+    Build an ``HttpResponse`` straight from a cached entry, using its
+    variant compressed with ``encoding`` if there is one.
+    """
+    body = entry.get('encodings', {}).get(encoding) if encoding is not None else None
+    response = HttpResponse(body or entry['body'], content_type=entry['content_type'])
+    if body is not None:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Content-Length'] = str(len(response.content))
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+def get_validators(state, variant, encoding=None):
+    """
+    Return a strong ETag and a Last-Modified timestamp for the
+    representation of ``state`` identified by ``variant``. Each content
+    encoding is a distinct representation with its own ETag.
+    """
+    etag = quote_etag(hashlib.md5(f"{state['version']}|{variant}|{encoding}".encode()).hexdigest())
+    last_modified = state['last_modified']
+    if last_modified is not None:
+        last_modified = timegm(last_modified.utctimetuple())
+    return etag, last_modified
+
+
+def conditional_response(request, etag, last_modified):
+    """Return a 304 response when the request validators still match."""
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+        patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+def set_validators(response, etag, last_modified):
+    response.headers['ETag'] = etag
+    if last_modified is not None:
+        response.headers['Last-Modified'] = http_date(last_modified)
+    return response
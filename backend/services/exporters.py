@@ -0,0 +1,119 @@
+"""
+Streaming exports of the service catalog.
+
+Rows are read through a server-side cursor and encoded one at a time, so
+memory use stays flat however large the catalog is. Under ASGI the
+``a``-prefixed async iterators must be used: Django reads a synchronous
+streaming iterator to the end before sending anything there.
+"""
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import BaseRenderer
+
+from .models import Service
+
+EXPORT_FIELDS = [
+    'id', 'title', 'slug', 'description', 'short_description', 'image',
+    'is_featured', 'features', 'created_at', 'updated_at',
+]
+
+# Separator for the features array in CSV exports
+CSV_LIST_SEPARATOR = '|'
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def _export_queryset():
+    return Service.objects.order_by('pk').values_list(*EXPORT_FIELDS)
+
+
+def _export_row(values, image_field):
+    row = dict(zip(EXPORT_FIELDS, values))
+    row['image'] = image_field.storage.url(row['image']) if row['image'] else None
+    return row
+
+
+def iter_services(chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield every service as a dict of ``EXPORT_FIELDS``, in primary key order"""
+    image_field = Service._meta.get_field('image')
+    for values in _export_queryset().iterator(chunk_size=chunk_size):
+        yield _export_row(values, image_field)
+
+
+async def aiter_services(chunk_size=DEFAULT_CHUNK_SIZE):
+    image_field = Service._meta.get_field('image')
+    async for values in _export_queryset().aiterator(chunk_size=chunk_size):
+        yield _export_row(values, image_field)
+
+
+def _ndjson_line(row):
+    return json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+def iter_ndjson(rows):
+    for row in rows:
+        yield _ndjson_line(row)
+
+
+async def aiter_ndjson(rows):
+    async for row in rows:
+        yield _ndjson_line(row)
+
+
+class _Line:
+    """File-like object whose write() hands back the line instead of storing it"""
+
+    def write(self, value):
+        return value
+
+
+def _csv_values(row):
+    row['features'] = CSV_LIST_SEPARATOR.join(row['features'])
+    row['created_at'] = row['created_at'].isoformat()
+    row['updated_at'] = row['updated_at'].isoformat()
+    return [row[field] for field in EXPORT_FIELDS]
+
+
+def iter_csv(rows):
+    writer = csv.writer(_Line())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow(_csv_values(row))
+
+
+async def aiter_csv(rows):
+    writer = csv.writer(_Line())
+    yield writer.writerow(EXPORT_FIELDS)
+    async for row in rows:
+        yield writer.writerow(_csv_values(row))
+
+
+EXPORTERS = {
+    'ndjson': iter_ndjson,
+    'csv': iter_csv,
+}
+
+ASYNC_EXPORTERS = {
+    'ndjson': aiter_ndjson,
+    'csv': aiter_csv,
+}
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Lets clients negotiate an export with ``Accept`` or ``?format=``.
+    Exports themselves are streamed; this only renders error payloads.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, cls=DjangoJSONEncoder)
+
+
+class CSVRenderer(NDJSONRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
@@ -0,0 +1,271 @@
+"""
+Bulk catalog loading.
+
+Rows are read lazily from JSON, NDJSON, YAML or CSV files, validated with
+the model field validators and written in batches with a single
+``INSERT ... ON CONFLICT (slug) DO UPDATE`` per batch, either through
+``bulk_create(update_conflicts=True)`` or through ``COPY`` into a
+temporary staging table. The whole load runs in one transaction and
+invalidates the catalog cache once at the end.
+
+JSON arrays, NDJSON and CSV are streamed row by row. PyYAML has no
+incremental loader for a single list, so YAML is streamed per document:
+a file with one list is loaded whole, while a multi-document file (rows
+separated by ``---``) is read one document at a time.
+"""
+import csv
+import io
+import json
+import os
+from dataclasses import dataclass, field
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.utils.text import slugify
+
+from .cache import batched_invalidation, invalidate_catalog_on_commit
+from .models import Service
+
+LOAD_FIELDS = ['title', 'slug', 'description', 'short_description', 'image', 'is_featured', 'features']
+
+# Separator for the features array in CSV files, as written by export_services
+CSV_LIST_SEPARATOR = '|'
+
+DEFAULT_BATCH_SIZE = 1000
+
+JSON_CHUNK_SIZE = 64 * 1024
+
+
+class CatalogLoadError(Exception):
+    def __init__(self, message, report=None):
+        super().__init__(message)
+        self.report = report
+
+
+@dataclass
+class LoadReport:
+    created: int = 0
+    updated: int = 0
+    errors: list = field(default_factory=list)
+
+    @property
+    def written(self):
+        return self.created + self.updated
+
+
+def iter_json_array(source, chunk_size=JSON_CHUNK_SIZE):
+    """Yield the elements of the top-level JSON array in ``source`` one at a time"""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    eof = False
+
+    def read_more():
+        nonlocal buffer, eof
+        chunk = source.read(chunk_size)
+        eof = not chunk
+        buffer += chunk
+
+    def peek():
+        """Skip whitespace and return the next character, '' at the end"""
+        nonlocal buffer
+        while True:
+            buffer = buffer.lstrip()
+            if buffer or eof:
+                return buffer[:1]
+            read_more()
+
+    if peek() != '[':
+        raise CatalogLoadError('JSON catalog files must contain an array')
+    buffer = buffer[1:]
+    if peek() == ']':
+        return
+
+    while True:
+        peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer)
+                # A number at the end of the buffer may continue in the next chunk
+                if end < len(buffer) or eof:
+                    break
+            except json.JSONDecodeError as e:
+                if eof:
+                    raise CatalogLoadError(f'Invalid JSON: {e}')
+            read_more()
+        yield value
+
+        buffer = buffer[end:]
+        separator = peek()
+        if separator == ']':
+            return
+        if separator != ',':
+            raise CatalogLoadError('Invalid JSON: expected "," or "]" between rows')
+        buffer = buffer[1:]
+
+
+def read_rows(path):
+    """Yield raw row dicts from ``path``, picking the reader by extension"""
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension in ('.ndjson', '.jsonl'):
+        with open(path, encoding='utf-8') as source:
+            for line in source:
+                if line.strip():
+                    yield json.loads(line)
+
+    elif extension == '.json':
+        with open(path, encoding='utf-8') as source:
+            yield from iter_json_array(source)
+
+    elif extension in ('.yaml', '.yml'):
+        try:
+            import yaml
+        except ImportError:
+            raise CatalogLoadError('Loading YAML requires PyYAML (pip install pyyaml)')
+        with open(path, encoding='utf-8') as source:
+            for document in yaml.safe_load_all(source):
+                if isinstance(document, list):
+                    yield from document
+                elif document is not None:
+                    yield document
+
+    elif extension == '.csv':
+        with open(path, newline='', encoding='utf-8') as source:
+            for row in csv.DictReader(source):
+                features = row.get('features')
+                row['features'] = [f for f in features.split(CSV_LIST_SEPARATOR) if f] if features else []
+                yield row
+
+    else:
+        raise CatalogLoadError(f'Unsupported catalog file type: {extension}')
+
+
+def clean_row(raw):
+    """
+    Normalize a flat row or a Django fixture entry and run the model field
+    validators. Unknown keys, such as the removed category and price, are
+    ignored. Raises ``ValidationError`` with a dict of field errors.
+    """
+    values = raw.get('fields', raw) if isinstance(raw, dict) else raw
+    if not isinstance(values, dict):
+        raise ValidationError({'fields': ['Expected an object of service fields']})
+    if not values.get('slug') and values.get('title'):
+        values = {**values, 'slug': slugify(values['title'])}
+
+    cleaned, errors = {}, {}
+    for name in LOAD_FIELDS:
+        model_field = Service._meta.get_field(name)
+        value = values.get(name)
+        if value in (None, '') and model_field.has_default():
+            value = model_field.get_default()
+        if name == 'is_featured' and isinstance(value, str):
+            value = value.strip().lower() in ('1', 'true', 'yes')
+        if name in ('description', 'short_description', 'title') and isinstance(value, str):
+            value = value.strip()
+        try:
+            cleaned[name] = model_field.clean(value, None)
+        except ValidationError as e:
+            errors[name] = e.messages
+        except (TypeError, ValueError):
+            # e.g. features given as a string that is not a JSON list
+            errors[name] = [f'Invalid value for {name}']
+    if errors:
+        raise ValidationError(errors)
+    return cleaned
+
+
+def validated_batches(rows, report, batch_size):
+    """Group valid rows into batches, recording invalid and duplicate rows"""
+    seen = set()
+    batch = []
+    for number, raw in enumerate(rows, start=1):
+        try:
+            row = clean_row(raw)
+        except ValidationError as e:
+            report.errors.append((number, e.message_dict))
+            continue
+        if row['slug'] in seen:
+            report.errors.append((number, {'slug': [f"Duplicate slug {row['slug']} in input"]}))
+            continue
+        seen.add(row['slug'])
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def write_bulk_create(batch, report):
+    existing = set(Service.objects.filter(slug__in=[row['slug'] for row in batch]).values_list('slug', flat=True))
+    Service.objects.bulk_create(
+        [Service(**row) for row in batch],
+        update_conflicts=True,
+        unique_fields=['slug'],
+        update_fields=[name for name in LOAD_FIELDS if name != 'slug'] + ['updated_at'],
+    )
+    report.updated += len(existing)
+    report.created += len(batch) - len(existing)
+
+
+def _pg_array(values):
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"') for value in values)
+    return '{' + ','.join(f'"{value}"' for value in escaped) + '}'
+
+
+def write_copy(batch, report):
+    """COPY the batch into a staging table, then merge it in one statement"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in batch:
+        writer.writerow([
+            row['title'], row['slug'], row['description'], row['short_description'],
+            row['image'], 't' if row['is_featured'] else 'f', _pg_array(row['features']),
+        ])
+    buffer.seek(0)
+
+    table = Service._meta.db_table
+    columns = ', '.join(LOAD_FIELDS)
+    updates = ', '.join(f'{name} = EXCLUDED.{name}' for name in LOAD_FIELDS if name != 'slug')
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'CREATE TEMPORARY TABLE IF NOT EXISTS services_catalog_staging ('
+            'title text, slug text, description text, short_description text, '
+            'image text, is_featured boolean, features text[]) ON COMMIT DROP'
+        )
+        cursor.execute('TRUNCATE services_catalog_staging')
+        cursor.copy_expert(f'COPY services_catalog_staging ({columns}) FROM STDIN WITH (FORMAT csv)', buffer)
+        cursor.execute(
+            f"INSERT INTO {table} ({columns}, image_derivatives, created_at, updated_at) "
+            f"SELECT {columns}, '{{}}'::jsonb, now(), now() FROM services_catalog_staging "
+            f"ON CONFLICT (slug) DO UPDATE SET {updates}, updated_at = EXCLUDED.updated_at "
+            f"RETURNING (xmax = 0)"
+        )
+        inserted = sum(1 for (created,) in cursor.fetchall() if created)
+    report.created += inserted
+    report.updated += len(batch) - inserted
+    invalidate_catalog_on_commit()
+
+
+WRITERS = {
+    'bulk': write_bulk_create,
+    'copy': write_copy,
+}
+
+
+def load_services(rows, method='bulk', batch_size=DEFAULT_BATCH_SIZE, skip_invalid=False):
+    """
+    Upsert ``rows`` into the catalog keyed on slug and return a
+    ``LoadReport``. Nothing is written if a row is invalid, unless
+    ``skip_invalid`` is set.
+    """
+    report = LoadReport()
+    write = WRITERS[method]
+
+    with transaction.atomic(), batched_invalidation():
+        for batch in validated_batches(rows, report, batch_size):
+            write(batch, report)
+        if report.errors and not skip_invalid:
+            raise CatalogLoadError(f'{len(report.errors)} invalid rows, nothing was loaded', report)
+
+    return report
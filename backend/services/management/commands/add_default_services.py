@@ -1,53 +1,15 @@
-
 # services/management/commands/add_default_services.py
-import os
-from django.core.management.base import BaseCommand
-from django.utils.text import slugify
-from django.core.files.base import ContentFile
-from services.models import ServiceCategory, Service
+from django.core.management.base import BaseCommand, CommandError
+from services.loaders import CatalogLoadError, load_services
 
 class Command(BaseCommand):
     help = 'Adds default services to the database'
 
     def handle(self, *args, **options):
-        # Create or get the "Development" category
-        dev_category, created = ServiceCategory.objects.get_or_create(
-            name="Development",
-            defaults={
-                'slug': 'development',
-                'description': 'Custom software development services for various platforms and needs'
-            }
-        )
-        if created:
-            self.stdout.write(self.style.SUCCESS(f'Created service category: {dev_category.name}'))
-        
-        # Create or get the "Digital Marketing" category
-        marketing_category, created = ServiceCategory.objects.get_or_create(
-            name="Digital Marketing",
-            defaults={
-                'slug': 'digital-marketing',
-                'description': 'Services to enhance your online presence and reach'
-            }
-        )
-        if created:
-            self.stdout.write(self.style.SUCCESS(f'Created service category: {marketing_category.name}'))
-        
-        # Create or get the "Automation" category
-        automation_category, created = ServiceCategory.objects.get_or_create(
-            name="Automation",
-            defaults={
-                'slug': 'automation',
-                'description': 'Services to automate repetitive tasks and improve efficiency'
-            }
-        )
-        if created:
-            self.stdout.write(self.style.SUCCESS(f'Created service category: {automation_category.name}'))
-
         # Define services
         services = [
             {
                 'title': 'Web Development',
-                'category': dev_category,
                 'description': """
                     Professional web development services tailored to your needs. We create responsive, 
                     user-friendly websites optimized for all devices. Our development stack includes.
@@ -60,12 +22,10 @@ class Command(BaseCommand):
                     "Database: PostgreSQL, MySQL, MongoDB"
                 ],
                 'short_description': 'Custom, responsive website development using modern technologies',
-                'is_featured': True,
-                'price': 1499.99 
+                'is_featured': True
             },
             {
                 'title': 'App Development',
-                'category': dev_category,
                 'description': """
                     Mobile application development for iOS and Android platforms. We build native 
                     and cross-platform applications using modern frameworks.                   
@@ -79,12 +39,10 @@ class Command(BaseCommand):
                     "Flutter for beautiful UI and performance"
                 ],
                 'short_description': 'Native and cross-platform mobile apps for iOS and Android',
-                'is_featured': True,
-                'price': 2499.99
+                'is_featured': True
             },
             {
                 'title': 'Social Media Management',
-                'category': marketing_category,
                 'description': """
                     Comprehensive social media management services to boost your online presence.
                     Our services include.
@@ -99,12 +57,10 @@ class Command(BaseCommand):
                     "Ad campaign management"
                 ],
                 'short_description': 'Content creation, posting and engagement for all social platforms',
-                'is_featured': False,
-                'price': 799.99
+                'is_featured': False
             },
             {
                 'title': 'Automations',
-                'category': automation_category,
                 'description': """
                     Custom automation solutions to streamline your business processes and save time.
                     Our automation services include.                    
@@ -119,55 +75,17 @@ class Command(BaseCommand):
                     "Integration between different software systems"
                 ],
                 'short_description': 'Custom workflow and process automation to save time and resources',
-                'is_featured': True,
-                'price': 1299.99
+                'is_featured': True
             },
         ]
 
-        # Add services to the database
-        for service_data in services:
-            slug = slugify(service_data['title'])
-            
-            # Check if service already exists
-            if not Service.objects.filter(slug=slug).exists():
-                # Create a blank image placeholder (in a real scenario, you would have actual images)
-                # This is a placeholder implementation - in production you would need real images
-                service = Service(
-                    title=service_data['title'],
-                    slug=slug,
-                    category=service_data['category'],
-                    description=service_data['description'].strip(),
-                    short_description=service_data['short_description'],
-                    features=service_data['features'],
-                    is_featured=service_data['is_featured'],
-                    price=service_data['price'],
-                )
-                
-                # This is a placeholder. In practice, you would need to add real images
-                # For now, we'll skip the image to avoid errors
-                # Uncomment this section when you have actual images to add
-                """
-                image_name = f"{slug}.jpg"
-                image_path = os.path.join('fixtures', 'images', image_name)
-                if os.path.exists(image_path):
-                    with open(image_path, 'rb') as img_file:
-                        service.image.save(image_name, ContentFile(img_file.read()), save=False)
-                """
-                
-                # Note: Since the model requires an image but we don't have one,
-                # you'll need to either:
-                # 1. Make the image field nullable in the model
-                # 2. Provide actual images
-                # 3. Modify this script to use dummy images
-                
-                # Save the service (will raise an error if image is required)
-                try:
-                    service.save()
-                    self.stdout.write(self.style.SUCCESS(f'Created service: {service.title}'))
-                except Exception as e:
-                    self.stdout.write(self.style.ERROR(f'Failed to create service {service_data["title"]}: {str(e)}'))
-            else:
-                self.stdout.write(self.style.WARNING(f'Service already exists: {service_data["title"]}'))
-
-        self.stdout.write(self.style.SUCCESS('Default services added successfully'))
+        # Upsert all services in one statement, keyed on the slug derived
+        # from the title
+        try:
+            report = load_services(services)
+        except CatalogLoadError as e:
+            raise CommandError(str(e))
 
+        self.stdout.write(self.style.SUCCESS(
+            f'Default services added successfully ({report.created} created, {report.updated} updated)'
+        ))
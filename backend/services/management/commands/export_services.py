@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from services.exporters import DEFAULT_CHUNK_SIZE, EXPORTERS, iter_services
+
+class Command(BaseCommand):
+    help = 'Streams every service as NDJSON or CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(EXPORTERS), default='ndjson')
+        parser.add_argument('--output', help='File to write to (default: stdout)')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='Rows fetched per round trip from the server-side cursor')
+
+    def handle(self, *args, **options):
+        lines = EXPORTERS[options['format']](iter_services(options['chunk_size']))
+
+        if options['output']:
+            count = 0
+            with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+                for line in lines:
+                    output.write(line)
+                    count += 1
+            self.stderr.write(self.style.SUCCESS(f"Exported {count} lines to {options['output']}"))
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
@@ -0,0 +1,44 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from services.loaders import DEFAULT_BATCH_SIZE, WRITERS, CatalogLoadError, load_services, read_rows
+
+class Command(BaseCommand):
+    help = 'Bulk upserts services from JSON, NDJSON, YAML or CSV files, keyed on slug'
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='+', help='Catalog files to load')
+        parser.add_argument('--method', choices=sorted(WRITERS), default='bulk',
+                            help='bulk: bulk_create(update_conflicts=True); copy: COPY into a staging table and merge')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--skip-invalid', action='store_true',
+                            help='Load the valid rows even if some rows are invalid')
+
+    def handle(self, *args, **options):
+        def rows():
+            for path in options['files']:
+                yield from read_rows(path)
+
+        started = time.monotonic()
+        try:
+            report = load_services(
+                rows(),
+                method=options['method'],
+                batch_size=options['batch_size'],
+                skip_invalid=options['skip_invalid'],
+            )
+        except CatalogLoadError as e:
+            if e.report is not None:
+                self.report_errors(e.report)
+            raise CommandError(str(e))
+
+        self.report_errors(report)
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Loaded {report.written} services ({report.created} created, {report.updated} updated) '
+            f'in {elapsed:.2f}s'
+        ))
+
+    def report_errors(self, report):
+        for number, errors in report.errors:
+            details = '; '.join(f"{name}: {' '.join(messages)}" for name, messages in errors.items())
+            self.stdout.write(self.style.ERROR(f'Row {number}: {details}'))
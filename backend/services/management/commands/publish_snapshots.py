@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from services.snapshots import publish_snapshots
+
+class Command(BaseCommand):
+    help = 'Publishes static JSON snapshots of the services catalog, e.g. before a frontend build'
+
+    def handle(self, *args, **options):
+        manifest = publish_snapshots()
+        self.stdout.write(self.style.SUCCESS(
+            f"Published snapshot {manifest['version']} with {len(manifest['files'])} files"
+        ))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from services.warmup import warm_service_caches
+
+class Command(BaseCommand):
+    help = 'Precomputes cached responses for featured services, list pages and every service detail'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', action='append', dest='hosts',
+                            help='Host to warm, may be repeated (default: SERVICES_WARMUP["HOSTS"])')
+        parser.add_argument('--list-pages', type=int, help='Number of list pages to warm')
+        parser.add_argument('--threads', type=int, help='Number of parallel requests')
+        parser.add_argument('--budget', type=int, help='Seconds after which remaining requests are skipped')
+        parser.add_argument('--force', action='store_true', help='Recompute entries that are still fresh')
+
+    def handle(self, *args, **options):
+        report = warm_service_caches(
+            hosts=options['hosts'],
+            list_pages=options['list_pages'],
+            threads=options['threads'],
+            budget=options['budget'],
+            force=options['force'],
+        )
+
+        if options['verbosity'] > 1:
+            for path, host, status, seconds in report.timings:
+                self.stdout.write(f"{status or 'ERR':>4} {seconds * 1000:8.1f}ms {host}{path}")
+
+        style = self.style.SUCCESS if not report.failed and not report.skipped else self.style.WARNING
+        self.stdout.write(style(report.summary()))
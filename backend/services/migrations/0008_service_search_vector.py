@@ -0,0 +1,55 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:37
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Keeps search_vector in sync on every insert or text update, including
+# bulk writes and COPY that bypass model signals.
+CREATE_TRIGGER = """
+CREATE OR REPLACE FUNCTION services_service_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(NEW.short_description, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(array_to_string(NEW.features, ' '), '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(NEW.description, '')), 'C');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER services_service_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, short_description, description, features, search_vector
+    ON services_service
+    FOR EACH ROW EXECUTE FUNCTION services_service_search_vector_update();
+
+UPDATE services_service SET title = title;
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER IF EXISTS services_service_search_vector_trigger ON services_service;
+DROP FUNCTION IF EXISTS services_service_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("services", "0007_remove_service_category_remove_service_price_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="service",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="service",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="service_search_vector_idx"
+            ),
+        ),
+        migrations.RunSQL(CREATE_TRIGGER, DROP_TRIGGER),
+    ]
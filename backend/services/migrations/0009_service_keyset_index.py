@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("services", "0008_service_search_vector"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="service",
+            index=models.Index(
+                fields=["-is_featured", "title", "id"], name="service_keyset_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("services", "0009_service_keyset_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="service",
+            name="image_derivatives",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
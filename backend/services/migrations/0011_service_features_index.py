@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:48
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("services", "0010_service_image_derivatives"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="service",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["features"], name="service_features_idx"
+            ),
+        ),
+    ]
@@ -1,10 +1,105 @@
 import logging
-from django.db import models
-from django.core.cache import cache
+import re
+from django.db import connections, models, transaction
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVectorField
+from .cache import catalog_changed, invalidate_catalog_on_commit
 
 logger = logging.getLogger('portfolio')
 
+# Text search configuration used by the search_vector trigger (migration 0008)
+SEARCH_CONFIG = 'english'
+
+
+def build_search_query(terms):
+    """
+    Turn free text into a prefix-matching tsquery, so "web dev" matches
+    "Web Development". Returns ``None`` if there is nothing to search for.
+    """
+    words = re.findall(r'[^\W_]+', terms)
+    if not words:
+        return None
+    return SearchQuery(' & '.join(f'{word}:*' for word in words), search_type='raw', config=SEARCH_CONFIG)
+
+
+class ServiceQuerySet(models.QuerySet):
+    """QuerySet that invalidates the catalog cache on bulk writes."""
+
+    def search(self, terms, headline=False):
+        """
+        Filter by full-text match on ``search_vector``, best matches first.
+
+        With ``headline`` each row is annotated with a snippet of its
+        description where matches are wrapped in ``<mark>`` tags.
+        """
+        query = build_search_query(terms)
+        if query is None:
+            return self.none()
+        queryset = (
+            self.filter(search_vector=query)
+            .annotate(rank=SearchRank(F('search_vector'), query))
+            .order_by('-rank', 'title')
+        )
+        if headline:
+            queryset = queryset.annotate(headline=SearchHeadline(
+                'description', query, config=SEARCH_CONFIG,
+                start_sel='<mark>', stop_sel='</mark>', max_words=35, min_words=15,
+            ))
+        return queryset
+
+    def with_features(self, all_of=(), any_of=()):
+        """
+        Filter to services having every feature in ``all_of`` and at least
+        one in ``any_of``. Both use the GIN index on ``features``.
+        """
+        queryset = self
+        if all_of:
+            queryset = queryset.filter(features__contains=list(all_of))
+        if any_of:
+            queryset = queryset.filter(features__overlap=list(any_of))
+        return queryset
+
+    def feature_counts(self):
+        """Return ``[(feature, number of services), ...]``, most common first"""
+        queryset = self.order_by().values_list('features')
+        sql, params = queryset.query.sql_with_params()
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(
+                f'SELECT feature, COUNT(*) FROM ({sql}) AS services (features), '
+                f'unnest(services.features) AS feature '
+                f'GROUP BY feature ORDER BY COUNT(*) DESC, feature',
+                params,
+            )
+            return cursor.fetchall()
+
+    def update(self, **kwargs):
+        rows = super().update(**kwargs)
+        if rows:
+            invalidate_catalog_on_commit()
+        return rows
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        if objs:
+            invalidate_catalog_on_commit()
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        rows = super().bulk_update(objs, fields, *args, **kwargs)
+        if rows:
+            invalidate_catalog_on_commit()
+        return rows
+
+
+class ServiceManager(models.Manager.from_queryset(ServiceQuerySet)):
+    def get_queryset(self):
+        # The tsvector is only ever used inside queries, never read back
+        return super().get_queryset().defer('search_vector')
+
 
 class Service(models.Model):
     title = models.CharField(max_length=200)
@@ -16,17 +111,49 @@ class Service(models.Model):
     features = ArrayField(models.CharField(max_length=200), blank=True, help_text='List of key features', default=list)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    
+    # Resized copies of image, filled in by the derivatives task
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)
+    # Maintained by a database trigger over title, short_description,
+    # description and features
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = ServiceManager()
+
     class Meta:
         ordering = ['-is_featured', 'title']
-    
+        indexes = [
+            GinIndex(fields=['search_vector'], name='service_search_vector_idx'),
+            # Serves the features__contains (@>) and features__overlap (&&) filters
+            GinIndex(fields=['features'], name='service_features_idx'),
+            # Serves the default ordering plus the keyset tie-breaker
+            models.Index(fields=['-is_featured', 'title', 'id'], name='service_keyset_idx'),
+        ]
+
     def __str__(self):
         return self.title
-    
+
     def save(self, *args, **kwargs):
         logger.info(f"Saving service: {self.title}")
-        # Clear relevant caches
-        cache.delete(f'service_{self.slug}')
-        cache.delete('featured_services')
-        cache.delete(f'category_services_{self.category.slug}')
         super().save(*args, **kwargs)
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+def invalidate_service_cache(sender, instance, **kwargs):
+    """Drop every cached catalog payload when a service changes"""
+    invalidate_catalog_on_commit()
+
+
+@receiver(post_save, sender=Service)
+def queue_service_image_derivatives(sender, instance, **kwargs):
+    """Generate image derivatives in Celery when the image changes"""
+    if (instance.image.name or '') != instance.image_derivatives.get('source', ''):
+        from .tasks import generate_service_image_derivatives
+        transaction.on_commit(lambda: generate_service_image_derivatives.delay(instance.pk))
+
+
+@receiver(catalog_changed)
+def schedule_catalog_snapshot(sender, **kwargs):
+    """Republish the static catalog snapshots after changes settle"""
+    from .snapshots import schedule_publish
+    schedule_publish()
@@ -0,0 +1,40 @@
+"""
+Replay read-only API requests outside of a client request.
+
+Used to refresh or pre-populate cached responses from Celery workers and
+management commands. The replayed request goes through the regular view,
+so it produces exactly the same cache keys and bytes as live traffic.
+"""
+import asyncio
+
+from asgiref.sync import async_to_sync
+from django.test import RequestFactory
+from django.urls import resolve
+
+
+def describe_request(request):
+    """Capture what is needed to replay ``request`` later."""
+    return {
+        'path': request.get_full_path(),
+        'host': request.get_host(),
+        'secure': request.is_secure(),
+        'accept': request.META.get('HTTP_ACCEPT', 'application/json'),
+    }
+
+
+def replay_request(path, host, secure=False, accept='application/json', refresh=True):
+    """
+    Dispatch a GET for ``path`` to its view and return the response.
+
+    Replayed requests are not throttled. With ``refresh`` the view
+    recomputes its cached entry instead of serving it.
+    """
+    request = RequestFactory().get(path, HTTP_HOST=host, HTTP_ACCEPT=accept, secure=secure)
+    request.replayed = True
+    request.refresh_cache = refresh
+    match = resolve(request.path_info)
+    view = match.func
+    if asyncio.iscoroutinefunction(view):
+        # services.async_views, when enabled
+        view = async_to_sync(view)
+    return view(request, *match.args, **match.kwargs)
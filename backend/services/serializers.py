@@ -1,12 +1,48 @@
 from rest_framework import serializers
+from portfolio_project.images import ImageDerivativesField
 from .models import Service
 
-class ServiceSerializer(serializers.ModelSerializer):    
+
+def get_requested_fields(request, available):
+    """
+    Return the names from ``available`` selected by ``?fields=`` and
+    ``?omit=``, in their original order, or ``None`` when the request
+    asks for the full representation. Unknown names are ignored.
+    """
+    if request is None:
+        return None
+    fields = request.query_params.get('fields')
+    omit = request.query_params.get('omit')
+    if not fields and not omit:
+        return None
+
+    selected = list(available)
+    if fields:
+        wanted = {name.strip() for name in fields.split(',')}
+        selected = [name for name in selected if name in wanted]
+    if omit:
+        unwanted = {name.strip() for name in omit.split(',')}
+        selected = [name for name in selected if name not in unwanted]
+    return None if selected == list(available) else selected
+
+
+class SparseFieldsetMixin:
+    """Let clients trim the representation with ``?fields=`` / ``?omit=``"""
+
+    def get_field_names(self, declared_fields, info):
+        names = super().get_field_names(declared_fields, info)
+        selected = get_requested_fields(self.context.get('request'), names)
+        return names if selected is None else selected
+
+
+class ServiceSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    image_srcset = ImageDerivativesField(source='image_derivatives')
+
     class Meta:
         model = Service
         fields = [
             'id', 'title', 'slug', 
-            'description', 'short_description', 'image', 
+            'description', 'short_description', 'image', 'image_srcset',
             'is_featured', 'features', 'created_at'
         ]
 
@@ -14,3 +50,11 @@ class ServiceSerializer(serializers.ModelSerializer):
 class ServiceDetailSerializer(ServiceSerializer):
     class Meta(ServiceSerializer.Meta):
         fields = ServiceSerializer.Meta.fields + ['updated_at']
+
+
+class ServiceSearchSerializer(ServiceSerializer):
+    rank = serializers.FloatField(read_only=True)
+    headline = serializers.CharField(read_only=True)
+
+    class Meta(ServiceSerializer.Meta):
+        fields = ServiceSerializer.Meta.fields + ['rank', 'headline']
@@ -0,0 +1,149 @@
+"""
+Static JSON snapshots of the services catalog.
+
+Every publish renders the full (unpaginated) list, the featured services
+and each service detail with the API serializers and writes them under
+content-hashed, immutable names, e.g. ``snapshots/list.3f2a9c1b7d4e.json``.
+A manifest at a fixed name, written last, points to the current files::
+
+    {"version": "...", "generated_at": "...", "files": {"list": "snapshots/list.3f2a9c1b7d4e.json", ...}}
+
+Clients and CDNs read the short-lived manifest and cache the hashed files
+forever. Files of the previous snapshot are kept for clients that still
+hold the old manifest; older ones are deleted.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import RequestFactory
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from .models import Service
+from .serializers import ServiceDetailSerializer, ServiceSerializer
+
+logger = logging.getLogger('portfolio')
+
+MANIFEST_NAME = 'manifest.json'
+SCHEDULED_KEY = 'services:snapshots:scheduled'
+
+
+def get_storage():
+    storage_class = settings.SERVICES_SNAPSHOTS['STORAGE']
+    return import_string(storage_class)() if storage_class else default_storage
+
+
+def snapshot_path(name):
+    return f"{settings.SERVICES_SNAPSHOTS['PREFIX']}/{name}"
+
+
+def render_snapshots():
+    """Return ``{name: JSON bytes}`` for the list, featured and detail snapshots"""
+    options = settings.SERVICES_SNAPSHOTS
+    # Image URLs are absolute, so render them for the public host; the
+    # serializers read query_params, so they need a DRF request
+    request = Request(RequestFactory().get('/', HTTP_HOST=options['HOST'], secure=options['SECURE']))
+    context = {'request': request}
+    renderer = JSONRenderer()
+
+    services = list(Service.objects.all())
+    payloads = {
+        'list': ServiceSerializer(services, many=True, context=context).data,
+        'featured': ServiceSerializer([s for s in services if s.is_featured], many=True, context=context).data,
+    }
+    for service in services:
+        payloads[f'services/{service.slug}'] = ServiceDetailSerializer(service, context=context).data
+    return {name: renderer.render(data) for name, data in payloads.items()}
+
+
+def write_atomic(storage, name, content):
+    """Replace ``name`` in one step, so readers never see a partial file"""
+    try:
+        path = storage.path(name)
+    except NotImplementedError:
+        # Remote storages such as S3 replace objects atomically on upload;
+        # without overwriting, saving would pick a new name instead
+        if not getattr(storage, 'file_overwrite', False) and storage.exists(name):
+            storage.delete(name)
+        storage.save(name, ContentFile(content))
+        return
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), delete=False) as temp:
+        temp.write(content)
+    os.chmod(temp.name, getattr(storage, 'file_permissions_mode', None) or 0o644)
+    os.replace(temp.name, path)
+
+
+def read_manifest(storage):
+    name = snapshot_path(MANIFEST_NAME)
+    if not storage.exists(name):
+        return None
+    with storage.open(name, 'rb') as manifest:
+        return json.load(manifest)
+
+
+def publish_snapshots():
+    """Render and publish a new snapshot, then return its manifest"""
+    storage = get_storage()
+    files = {}
+    written = 0
+
+    for name, content in render_snapshots().items():
+        digest = hashlib.sha256(content).hexdigest()[:12]
+        path = snapshot_path(f'{name}.{digest}.json')
+        # Hashed files never change, so unchanged payloads are not rewritten
+        if not storage.exists(path):
+            storage.save(path, ContentFile(content))
+            written += 1
+        files[name] = path
+
+    previous = read_manifest(storage) or {'files': {}, 'previous': []}
+    current_paths = set(files.values())
+    kept = sorted(set(previous['files'].values()) - current_paths)
+    manifest = {
+        'version': hashlib.sha256('|'.join(sorted(current_paths)).encode()).hexdigest()[:12],
+        'generated_at': timezone.now().isoformat(),
+        'files': files,
+        'previous': kept,
+    }
+    write_atomic(storage, snapshot_path(MANIFEST_NAME), json.dumps(manifest, indent=2).encode())
+
+    for path in set(previous['previous']) - current_paths - set(kept):
+        try:
+            storage.delete(path)
+        except Exception as e:
+            logger.warning(f"Failed to delete old snapshot {path}: {str(e)}")
+
+    logger.info(f"Published catalog snapshot {manifest['version']} ({written} of {len(files)} files written)")
+    return manifest
+
+
+def schedule_publish():
+    """
+    Publish after ``DEBOUNCE`` seconds, once for a whole burst of changes.
+    The task clears the flag before rendering, so changes made while it
+    runs schedule another publish.
+    """
+    options = settings.SERVICES_SNAPSHOTS
+    if not options['ENABLED']:
+        return
+    if not cache.add(SCHEDULED_KEY, True, timeout=options['DEBOUNCE'] * 2):
+        return
+
+    from .tasks import publish_catalog_snapshots
+
+    try:
+        publish_catalog_snapshots.apply_async(countdown=options['DEBOUNCE'])
+    except Exception as e:
+        cache.delete(SCHEDULED_KEY)
+        logger.error(f"Failed to schedule catalog snapshot publish: {str(e)}")
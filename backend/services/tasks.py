@@ -1,5 +1,8 @@
 from celery import shared_task
+from django.core.cache import cache
 from django.core.management import call_command
+from portfolio_project.images import refresh_derivatives
+from .models import Service
 import logging
 
 logger = logging.getLogger('portfolio')
@@ -17,3 +20,38 @@ def backup_database():
     logger.info("Running database backup task")
     call_command('backup_db')
     return "Database backed up"
+
+@shared_task
+def refresh_cached_response(request_info):
+    """Recompute a stale cached services response in the background"""
+    from .replay import replay_request
+
+    response = replay_request(**request_info)
+    logger.info(f"Refreshed cached response for {request_info['path']}: {response.status_code}")
+    return response.status_code
+
+@shared_task
+def warm_service_caches(force=False):
+    """Precompute cached services responses, e.g. after a deploy"""
+    from .warmup import warm_once
+
+    report = warm_once(force=force)
+    if report is None:
+        return "Cache warmup already running"
+    return report.summary()
+
+@shared_task(autoretry_for=(OSError,), retry_backoff=True, max_retries=3)
+def publish_catalog_snapshots():
+    """Write static JSON snapshots of the catalog to storage"""
+    from .snapshots import SCHEDULED_KEY, publish_snapshots
+
+    # Changes from now on need a new snapshot
+    cache.delete(SCHEDULED_KEY)
+    manifest = publish_snapshots()
+    return f"Published catalog snapshot {manifest['version']}"
+
+@shared_task(autoretry_for=(OSError,), retry_backoff=True, max_retries=3)
+def generate_service_image_derivatives(service_id):
+    """Generate resized WebP/JPEG copies of a service image"""
+    refresh_derivatives(Service, service_id, 'image')
+    return f"Image derivatives generated for service {service_id}"
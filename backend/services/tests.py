@@ -1,23 +1,803 @@
 # services/tests.py
-from django.test import TestCase
+import csv
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+from asgiref.sync import async_to_sync
+from PIL import Image
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.db.models import FloatField, Value
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
-from rest_framework.test import APIClient
-from .models import ServiceCategory, Service
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from portfolio_project.compression import CompressionMiddleware, negotiate_encoding
+from portfolio_project.db_pool.base import ConnectionPool, DEFAULT_OPTIONS, get_pool
+from portfolio_project.db_router import PIN_COOKIE, PrimaryReplicaRouter, ReplicaRoutingMiddleware
+from portfolio_project.pagination import KeysetPagination, PageNumberOrKeysetPagination
+from portfolio_project.views import DatabasePoolStatsView
+from . import async_views
+from .cache import acquire_lock, get_generation, get_or_refresh
+from .loaders import CatalogLoadError, clean_row, iter_json_array, load_services
+from .models import Service
+from .snapshots import publish_snapshots
+from .tasks import generate_service_image_derivatives
+from .warmup import warm_service_caches, warmup_paths
+
+LOCMEM_CACHE = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'services-tests',
+    }
+}
+
+DUMMY_CACHE = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    }
+}
+
 
 class ServiceAPITestCase(TestCase):
     def setUp(self):
         self.client = APIClient()
-        self.category = ServiceCategory.objects.create(name="Web Development")
         self.service = Service.objects.create(
             title="Responsive Web Design",
+            slug="responsive-web-design",
             description="Design that works on all devices",
-            category=self.category,
+            short_description="Responsive design",
         )
-    
+
     def test_get_services(self):
         url = reverse('service-list')
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data['results']), 1)
-        self.assertEqual(response.data['results'][0]['title'], 'Responsive Web Design')
+        self.assertEqual(len(response.json()['results']), 1)
+        self.assertEqual(response.json()['results'][0]['title'], 'Responsive Web Design')
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ServiceCacheInvalidationTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.service = Service.objects.create(
+            title="Automations",
+            slug="automations",
+            description="Workflow automation",
+            short_description="Automation",
+            is_featured=True,
+        )
+
+    def test_save_bumps_generation(self):
+        generation = get_generation()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.service.save()
+        self.assertGreater(get_generation(), generation)
+
+    def test_bulk_update_bumps_generation(self):
+        generation = get_generation()
+        with self.captureOnCommitCallbacks(execute=True):
+            Service.objects.filter(pk=self.service.pk).update(title="Automation")
+        self.assertGreater(get_generation(), generation)
+
+    def test_cached_detail_is_refreshed_after_update(self):
+        url = reverse('service-detail', kwargs={'slug': self.service.slug})
+        self.assertEqual(self.client.get(url).json()['title'], "Automations")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Service.objects.filter(pk=self.service.pk).update(title="Automation")
+
+        self.assertEqual(self.client.get(url).json()['title'], "Automation")
+
+    def test_cached_body_matches_uncached_body(self):
+        for url in (
+            reverse('service-list'),
+            reverse('service-featured'),
+            reverse('service-detail', kwargs={'slug': self.service.slug}),
+        ):
+            with override_settings(CACHES=DUMMY_CACHE):
+                uncached = self.client.get(url)
+            first = self.client.get(url)
+            second = self.client.get(url)
+            self.assertEqual(uncached.content, first.content)
+            self.assertEqual(first.content, second.content)
+            self.assertEqual(second['Content-Type'], 'application/json')
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ServiceConditionalGetTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.service = Service.objects.create(
+            title="App Development",
+            slug="app-development",
+            description="Mobile apps",
+            short_description="Apps",
+            is_featured=True,
+        )
+
+    def test_matching_etag_returns_not_modified(self):
+        for url in (
+            reverse('service-list'),
+            reverse('service-featured'),
+            reverse('service-detail', kwargs={'slug': self.service.slug}),
+        ):
+            response = self.client.get(url)
+            self.assertIn('Last-Modified', response)
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(response.content, b'')
+
+    def test_if_modified_since_returns_not_modified(self):
+        url = reverse('service-detail', kwargs={'slug': self.service.slug})
+        response = self.client.get(url)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_etag_changes_when_catalog_changes(self):
+        url = reverse('service-list')
+        etag = self.client.get(url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.service.delete()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ServiceSparseFieldsetTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.service = Service.objects.create(
+            title="Social Media Management",
+            slug="social-media-management",
+            description="A long description",
+            short_description="Social media",
+            is_featured=True,
+        )
+
+    def test_fields_trims_list(self):
+        response = self.client.get(reverse('service-list'), {'fields': 'title,slug,short_description,image'})
+        self.assertEqual(
+            list(response.json()['results'][0]),
+            ['title', 'slug', 'short_description', 'image'],
+        )
+
+    def test_omit_trims_detail(self):
+        url = reverse('service-detail', kwargs={'slug': self.service.slug})
+        response = self.client.get(url, {'omit': 'description,features'})
+        self.assertNotIn('description', response.json())
+        self.assertIn('updated_at', response.json())
+
+    def test_fieldsets_are_cached_separately(self):
+        url = reverse('service-featured')
+        trimmed = self.client.get(url, {'fields': 'slug'}).json()
+        full = self.client.get(url).json()
+        self.assertEqual(list(trimmed[0]), ['slug'])
+        self.assertIn('description', full[0])
+
+    def test_large_columns_are_not_fetched(self):
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(reverse('service-list'), {'fields': 'title,slug'})
+        selects = [q['sql'] for q in context.captured_queries if '"services_service"."title"' in q['sql']]
+        self.assertTrue(selects)
+        for sql in selects:
+            self.assertNotIn('"services_service"."description"', sql)
+
+
+class ServiceImageDerivativesTestCase(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+        buffer = BytesIO()
+        Image.new('RGB', (1200, 600), 'red').save(buffer, 'JPEG')
+        self.service = Service.objects.create(
+            title="Web Development",
+            slug="web-development",
+            description="Websites",
+            short_description="Websites",
+            image=SimpleUploadedFile('web.jpg', buffer.getvalue(), content_type='image/jpeg'),
+        )
+
+    def test_derivatives_are_generated_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.service.save()
+
+        self.service.refresh_from_db()
+        derivatives = self.service.image_derivatives
+        self.assertEqual(derivatives['source'], self.service.image.name)
+        self.assertEqual(sorted(derivatives['webp'], key=int), ['320', '640', '1024', '1200'])
+        self.assertRegex(derivatives['jpeg']['320'], r'derivatives/web-[0-9a-f]{12}-320w\.jpeg$')
+
+    def test_srcset_is_exposed(self):
+        generate_service_image_derivatives(self.service.pk)
+        url = reverse('service-detail', kwargs={'slug': self.service.slug})
+        srcset = self.client.get(url).json()['image_srcset']
+        self.assertTrue(srcset['webp']['640'].startswith('http://testserver/media/'))
+
+
+class ServiceExportTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        for i in range(3):
+            Service.objects.create(
+                title=f"Service {i}",
+                slug=f"service-{i}",
+                description="Description",
+                short_description="Short",
+                features=["One", "Two"],
+            )
+
+    def test_export_ndjson(self):
+        response = self.client.get(reverse('service-export'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['slug'] for row in rows], ['service-0', 'service-1', 'service-2'])
+        self.assertEqual(rows[0]['features'], ['One', 'Two'])
+
+    def test_export_csv(self):
+        response = self.client.get(reverse('service-export'), {'format': 'csv'})
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        rows = list(csv.DictReader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]['features'], 'One|Two')
+
+    def test_export_streams_asynchronously_under_asgi(self):
+        async def export(fmt):
+            response = await AsyncClient().get(reverse('service-export'), {'format': fmt})
+            self.assertTrue(response.is_async)
+            return b''.join([chunk async for chunk in response.streaming_content]).decode().splitlines()
+
+        rows = [json.loads(line) for line in async_to_sync(export)('ndjson')]
+        self.assertEqual([row['slug'] for row in rows], ['service-0', 'service-1', 'service-2'])
+        rows = list(csv.DictReader(async_to_sync(export)('csv')))
+        self.assertEqual(rows[0]['features'], 'One|Two')
+
+
+class ServiceSearchTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        Service.objects.create(
+            title="Web Development",
+            slug="web-development",
+            description="Responsive websites built with Django and React",
+            short_description="Custom websites",
+            features=["Search Engine Optimization"],
+        )
+        Service.objects.create(
+            title="Automations",
+            slug="automations",
+            description="Workflow automation for web shops",
+            short_description="Save time",
+        )
+
+    def test_search_ranks_and_prefix_matches(self):
+        response = self.client.get(reverse('service-search'), {'q': 'web dev'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.json()['results']
+        self.assertEqual([r['slug'] for r in results], ['web-development'])
+        self.assertIn('rank', results[0])
+
+    def test_search_matches_features_and_highlights(self):
+        response = self.client.get(reverse('service-search'), {'q': 'django'})
+        results = response.json()['results']
+        self.assertEqual(len(results), 1)
+        self.assertIn('<mark>Django</mark>', results[0]['headline'])
+
+        response = self.client.get(reverse('service-search'), {'q': 'optimization'})
+        self.assertEqual(len(response.json()['results']), 1)
+
+    def test_search_requires_query(self):
+        response = self.client.get(reverse('service-search'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class GetOrRefreshTestCase(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.compute = mock.Mock(return_value='fresh')
+
+    def test_miss_computes_once(self):
+        self.assertEqual(get_or_refresh('key', self.compute), 'fresh')
+        self.assertEqual(get_or_refresh('key', self.compute), 'fresh')
+        self.compute.assert_called_once()
+
+    def set_stale(self, key, value):
+        cache.set(key, {'value': value, 'fresh_until': 0})
+
+    def test_stale_value_served_while_another_worker_refreshes(self):
+        self.set_stale('key', 'stale')
+        acquire_lock('key')
+        self.assertEqual(get_or_refresh('key', self.compute), 'stale')
+        self.compute.assert_not_called()
+
+    def test_stale_value_refreshed_by_lock_holder(self):
+        self.set_stale('key', 'stale')
+        self.assertEqual(get_or_refresh('key', self.compute), 'fresh')
+        self.assertEqual(get_or_refresh('key', self.compute), 'fresh')
+        self.compute.assert_called_once()
+
+    def test_stale_value_served_while_refresh_is_scheduled(self):
+        self.set_stale('key', 'stale')
+        schedule = mock.Mock()
+        self.assertEqual(get_or_refresh('key', self.compute, schedule_refresh=schedule), 'stale')
+        schedule.assert_called_once()
+        self.compute.assert_not_called()
+
+
+class ServiceKeysetPaginationTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        for i in range(25):
+            Service.objects.create(
+                title=f"Service {i % 7}",
+                slug=f"service-{i}",
+                description="Description",
+                short_description="Short",
+                is_featured=i % 3 == 0,
+            )
+
+    def walk(self, url, link):
+        slugs = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            body = response.json()
+            self.assertNotIn('count', body)
+            slugs.extend(service['slug'] for service in body['results'])
+            url = body[link]
+        return slugs
+
+    def test_keyset_pages_follow_model_ordering(self):
+        expected = list(Service.objects.order_by('-is_featured', 'title', 'id').values_list('slug', flat=True))
+        slugs = self.walk(reverse('service-list') + '?pagination=keyset', 'next')
+        self.assertEqual(slugs, expected)
+
+    def test_previous_links_walk_back(self):
+        url = reverse('service-list') + '?pagination=keyset'
+        while True:
+            body = self.client.get(url).json()
+            if not body['next']:
+                break
+            url = body['next']
+        first_page_previous = body['previous']
+        slugs = self.walk(first_page_previous, 'previous')
+        self.assertEqual(len(slugs), 20)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('service-list'), {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_annotation_ordering_falls_back_to_page_numbers(self):
+        queryset = Service.objects.annotate(rank=Value(0.5, output_field=FloatField())).order_by('-rank', 'title')
+        self.assertFalse(KeysetPagination().supports(queryset))
+
+        request = Request(APIRequestFactory().get('/', {'pagination': 'keyset'}))
+        paginator = PageNumberOrKeysetPagination()
+        page = paginator.paginate_queryset(queryset, request)
+        self.assertEqual(len(page), 10)
+        self.assertIn('count', paginator.get_paginated_response([]).data)
+
+
+class JSONArrayReaderTestCase(SimpleTestCase):
+    def test_rows_are_read_across_chunks(self):
+        rows = [{'title': 'Web', 'features': ['a', 'b']}, 12345, 'text, with ]', None]
+        source = StringIO(' [ ' + ' ,\n'.join(json.dumps(row) for row in rows) + ' ] ')
+        self.assertEqual(list(iter_json_array(source, chunk_size=3)), rows)
+        self.assertEqual(list(iter_json_array(StringIO('[]'))), [])
+
+    def test_malformed_files_are_rejected(self):
+        for text in ('{"title": "Web"}', '[{"title": "Web"} {"title": "App"}]', '[{"title": "Web"'):
+            with self.assertRaises(CatalogLoadError):
+                list(iter_json_array(StringIO(text), chunk_size=4))
+
+
+class CatalogLoaderTestCase(TestCase):
+    rows = [
+        {'title': 'Web Development', 'description': 'Websites', 'short_description': 'Web',
+         'features': ['Django', 'React'], 'is_featured': 'true', 'category': 1, 'price': '10.00'},
+        {'model': 'services.service', 'pk': 7, 'fields': {
+            'title': 'Automations', 'slug': 'automations', 'description': 'Pipelines', 'short_description': 'Auto'}},
+    ]
+
+    def test_clean_row_normalizes_input(self):
+        row = clean_row(self.rows[0])
+        self.assertEqual(row['slug'], 'web-development')
+        self.assertIs(row['is_featured'], True)
+        self.assertNotIn('price', row)
+
+    def test_malformed_rows_are_rejected(self):
+        row = {'title': 'Broken', 'description': 'Broken', 'short_description': 'Broken'}
+        for raw, field in [
+            ({**row, 'features': 'Django, React'}, 'features'),
+            ({**row, 'features': 5}, 'features'),
+            ({'model': 'services.service', 'fields': ['Broken']}, 'fields'),
+            (['Broken'], 'fields'),
+        ]:
+            with self.subTest(raw=raw):
+                with self.assertRaises(ValidationError) as raised:
+                    clean_row(raw)
+                self.assertIn(field, raised.exception.message_dict)
+
+        report = load_services(self.rows + [{**row, 'features': 'Django'}, 'Broken'], skip_invalid=True)
+        self.assertEqual(report.created, 2)
+        self.assertEqual([number for number, _ in report.errors], [3, 4])
+
+    def test_load_upserts_on_slug(self):
+        for method in ('bulk', 'copy'):
+            with self.subTest(method=method):
+                Service.objects.all().delete()
+                report = load_services(self.rows, method=method)
+                self.assertEqual((report.created, report.updated), (2, 0))
+
+                changed = [{**self.rows[0], 'short_description': 'Changed'}]
+                report = load_services(changed, method=method)
+                self.assertEqual((report.created, report.updated), (0, 1))
+                self.assertEqual(Service.objects.get(slug='web-development').short_description, 'Changed')
+                self.assertEqual(Service.objects.count(), 2)
+
+    @override_settings(CACHES=LOCMEM_CACHE)
+    def test_load_invalidates_once(self):
+        cache.clear()
+        generation = get_generation()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            load_services(self.rows, batch_size=1)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(get_generation(), generation + 1)
+
+    def test_invalid_rows_abort_the_load(self):
+        rows = self.rows + [{'title': 'No description'}, self.rows[0]]
+        with self.assertRaises(CatalogLoadError) as raised:
+            load_services(rows)
+        self.assertEqual([number for number, _ in raised.exception.report.errors], [3, 4])
+        self.assertFalse(Service.objects.exists())
+
+        report = load_services(rows, skip_invalid=True)
+        self.assertEqual(report.created, 2)
+
+
+@override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'PAGE_SIZE': 2})
+class ServiceWarmupTestCase(TestCase):
+    def setUp(self):
+        for i in range(5):
+            Service.objects.create(
+                title=f'Service {i}', slug=f'service-{i}', description='Description',
+                short_description='Short', is_featured=i == 0,
+            )
+
+    def test_paths_cover_featured_list_pages_and_details(self):
+        paths = warmup_paths(list_pages=5)
+        self.assertEqual(paths[:4], [
+            '/api/services/featured/', '/api/services/', '/api/services/?page=2', '/api/services/?page=3',
+        ])
+        self.assertEqual(len(paths), 4 + 5)
+
+    def test_warmup_replays_every_path_within_budget(self):
+        with mock.patch('services.warmup.replay_request', return_value=mock.Mock(status_code=200)) as replay:
+            report = warm_service_caches(hosts=['localhost:8000', 'backend:8000'], list_pages=1, threads=2)
+        self.assertEqual(replay.call_count, 2 * 7)
+        self.assertEqual((report.warmed, report.failed, report.skipped), (14, 0, 0))
+
+        with mock.patch('services.warmup.replay_request') as replay:
+            report = warm_service_caches(list_pages=1, budget=0)
+        replay.assert_not_called()
+        self.assertEqual(report.skipped, 7)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRoutingTestCase(SimpleTestCase):
+    router = PrimaryReplicaRouter()
+
+    def route(self, request, write=False, healthy=True):
+        routed = {}
+
+        def view(request):
+            if write:
+                self.router.db_for_write(Service)
+            routed['read'] = self.router.db_for_read(Service)
+            return HttpResponse()
+
+        with mock.patch('portfolio_project.db_router.replica_is_healthy', return_value=healthy):
+            response = ReplicaRoutingMiddleware(view)(request)
+        return routed['read'], response
+
+    def test_safe_requests_read_from_replica(self):
+        db, response = self.route(RequestFactory().get('/api/services/'))
+        self.assertEqual(db, 'replica1')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        # Outside of a request everything uses the primary
+        self.assertEqual(self.router.db_for_read(Service), 'default')
+
+    def test_writes_admin_and_unhealthy_replicas_use_primary(self):
+        factory = RequestFactory()
+        self.assertEqual(self.route(factory.get('/admin/'))[0], 'default')
+        self.assertEqual(self.route(factory.get('/api/services/'), healthy=False)[0], 'default')
+
+        db, response = self.route(factory.post('/api/contact/'))
+        self.assertEqual(db, 'default')
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+    def test_client_is_pinned_to_primary_after_write(self):
+        db, response = self.route(RequestFactory().get('/api/services/'), write=True)
+        self.assertEqual(db, 'default')
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        request = RequestFactory().get('/api/services/')
+        request.COOKIES[PIN_COOKIE] = '1'
+        self.assertEqual(self.route(request)[0], 'default')
+
+    @override_settings(CACHES=LOCMEM_CACHE)
+    def test_cached_values_are_computed_on_primary(self):
+        cache.clear()
+        routed = {}
+
+        def view(request):
+            routed['cached'] = get_or_refresh('key', lambda: self.router.db_for_read(Service))
+            routed['after'] = self.router.db_for_read(Service)
+            return HttpResponse()
+
+        with mock.patch('portfolio_project.db_router.replica_is_healthy', return_value=True):
+            ReplicaRoutingMiddleware(view)(RequestFactory().get('/api/services/'))
+        self.assertEqual(routed['cached'], 'default')
+        self.assertEqual(routed['after'], 'replica1')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_pin_cookie_without_replicas(self):
+        db, response = self.route(RequestFactory().post('/api/contact/'), write=True)
+        self.assertEqual(db, 'default')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+
+class ConnectionPoolTestCase(SimpleTestCase):
+    def make_pool(self, **options):
+        return ConnectionPool('default', {**DEFAULT_OPTIONS, **options})
+
+    def connect(self):
+        conn = mock.Mock(closed=False, autocommit=True)
+        conn.info.transaction_status = 0  # TRANSACTION_STATUS_IDLE
+        return conn
+
+    def test_connections_are_reused(self):
+        pool = self.make_pool()
+        conn = pool.getconn(self.connect)
+        pool.putconn(conn)
+        self.assertIs(pool.getconn(self.connect), conn)
+        self.assertEqual((pool.stats['opened'], pool.stats['reused']), (1, 1))
+
+    def test_checkout_waits_for_a_free_connection(self):
+        pool = self.make_pool(MAX_SIZE=1, TIMEOUT=0.01)
+        pool.getconn(self.connect)
+        with self.assertRaises(OperationalError):
+            pool.getconn(self.connect)
+        self.assertEqual(pool.stats['timeouts'], 1)
+
+    def test_broken_connections_are_discarded(self):
+        pool = self.make_pool()
+        conn = pool.getconn(self.connect)
+        conn.closed = True
+        pool.putconn(conn)
+        self.assertIsNot(pool.getconn(self.connect), conn)
+        self.assertEqual(pool.stats['closed'], 1)
+
+    def test_forked_processes_get_their_own_pool(self):
+        pool = get_pool('default', {'dbname': 'test'}, DEFAULT_OPTIONS)
+        self.assertIs(get_pool('default', {'dbname': 'test'}, DEFAULT_OPTIONS), pool)
+        with mock.patch('os.getpid', return_value=-1):
+            self.assertIsNot(get_pool('default', {'dbname': 'test'}, DEFAULT_OPTIONS), pool)
+
+    @override_settings(CACHES=LOCMEM_CACHE)
+    def test_stats_endpoint_is_admin_only(self):
+        get_pool('stats', {'dbname': 'test'}, DEFAULT_OPTIONS)
+        view = DatabasePoolStatsView.as_view()
+
+        request = APIRequestFactory().get('/api/db-pool/')
+        force_authenticate(request, user=mock.Mock(is_staff=True))
+        response = view(request)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['pools']['stats']['open'], 0)
+
+        request = APIRequestFactory().get('/api/db-pool/')
+        force_authenticate(request, user=mock.Mock(is_staff=False))
+        self.assertEqual(view(request).status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ServiceFeatureFilterTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        for title, features in [
+            ('Web Development', ['Django', 'React']),
+            ('App Development', ['React', 'Flutter']),
+            ('Automations', ['Django', 'Celery']),
+        ]:
+            Service.objects.create(
+                title=title, slug=title.lower().replace(' ', '-'), description='Description',
+                short_description='Short', features=features,
+            )
+
+    def titles(self, query):
+        response = self.client.get(f"{reverse('service-list')}?{query}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return sorted(item['title'] for item in response.json()['results'])
+
+    def test_features_all_and_any(self):
+        self.assertEqual(self.titles('features_all=Django&features_all=React'), ['Web Development'])
+        self.assertEqual(self.titles('features_any=Flutter&features_any=Celery'), ['App Development', 'Automations'])
+        self.assertEqual(self.titles('features_all=React&features_any=Flutter'), ['App Development'])
+
+    def test_feature_counts(self):
+        response = self.client.get(reverse('service-feature-counts'))
+        self.assertEqual(response.json()[:2], [{'feature': 'Django', 'count': 2}, {'feature': 'React', 'count': 2}])
+
+        response = self.client.get(f"{reverse('service-feature-counts')}?features_all=Django")
+        self.assertEqual(
+            response.json(),
+            [{'feature': 'Django', 'count': 2}, {'feature': 'Celery', 'count': 1}, {'feature': 'React', 'count': 1}],
+        )
+
+
+class ServiceAsyncViewsTestCase(TestCase):
+    def setUp(self):
+        self.service = Service.objects.create(
+            title='Web Development', slug='web-development', description='Websites',
+            short_description='Web', is_featured=True, features=['Django'],
+        )
+
+    def assertSameAsSync(self, async_view, path, **kwargs):
+        expected = APIClient().get(path)
+        response = async_to_sync(async_view)(RequestFactory().get(path), **kwargs)
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(response.content, expected.content)
+        self.assertEqual(response.get('ETag'), expected.get('ETag'))
+
+    def test_async_views_match_sync_views(self):
+        self.assertSameAsSync(async_views.service_list, reverse('service-list'))
+        self.assertSameAsSync(async_views.service_list, f"{reverse('service-list')}?pagination=keyset&fields=title")
+        self.assertSameAsSync(async_views.featured_services, reverse('service-featured'))
+        self.assertSameAsSync(
+            async_views.service_detail, reverse('service-detail', args=['web-development']), slug='web-development',
+        )
+        self.assertSameAsSync(async_views.service_detail, reverse('service-detail', args=['missing']), slug='missing')
+
+
+class CompressionTestCase(SimpleTestCase):
+    def test_negotiate_encoding(self):
+        factory = RequestFactory()
+        with mock.patch('portfolio_project.compression.brotli', object()):
+            self.assertEqual(negotiate_encoding(factory.get('/', HTTP_ACCEPT_ENCODING='gzip, deflate, br')), 'br')
+            self.assertEqual(negotiate_encoding(factory.get('/', HTTP_ACCEPT_ENCODING='br;q=0, gzip')), 'gzip')
+        with mock.patch('portfolio_project.compression.brotli', None):
+            self.assertEqual(negotiate_encoding(factory.get('/', HTTP_ACCEPT_ENCODING='br, *;q=0.1')), 'gzip')
+        self.assertIsNone(negotiate_encoding(factory.get('/', HTTP_ACCEPT_ENCODING='identity')))
+
+    @override_settings(COMPRESSION={**settings.COMPRESSION, 'MIN_SIZE': 100})
+    def test_middleware_threshold(self):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        middleware = CompressionMiddleware(lambda request: HttpResponse(b'x' * 99))
+        self.assertFalse(middleware(request).has_header('Content-Encoding'))
+
+        middleware = CompressionMiddleware(lambda request: HttpResponse(b'x' * 1000))
+        response = middleware(request)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), b'x' * 1000)
+
+    @override_settings(COMPRESSION={**settings.COMPRESSION, 'MIN_SIZE': 100})
+    def test_brotli_only_for_anonymous_responses(self):
+        brotli = mock.Mock()
+        brotli.compress.return_value = b'compressed'
+        factory = RequestFactory()
+
+        def view(request):
+            response = HttpResponse(b'x' * 1000)
+            if request.path == '/login/':
+                response.set_cookie('sessionid', 'secret')
+            return response
+
+        middleware = CompressionMiddleware(view)
+        with mock.patch('portfolio_project.compression.brotli', brotli):
+            self.assertEqual(middleware(factory.get('/', HTTP_ACCEPT_ENCODING='br, gzip'))['Content-Encoding'], 'br')
+
+            request = factory.get('/', HTTP_ACCEPT_ENCODING='br, gzip', HTTP_COOKIE='csrftoken=secret')
+            self.assertEqual(middleware(request)['Content-Encoding'], 'gzip')
+            request = factory.get('/', HTTP_ACCEPT_ENCODING='br, gzip', HTTP_AUTHORIZATION='Token secret')
+            self.assertEqual(middleware(request)['Content-Encoding'], 'gzip')
+            self.assertEqual(middleware(factory.get('/login/', HTTP_ACCEPT_ENCODING='br, gzip'))['Content-Encoding'], 'gzip')
+        brotli.compress.assert_called_once()
+
+
+@override_settings(CACHES=LOCMEM_CACHE, COMPRESSION={**settings.COMPRESSION, 'MIN_SIZE': 100})
+class ServiceCompressedCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        for i in range(5):
+            Service.objects.create(
+                title=f'Service {i}', slug=f'service-{i}', description='Description ' * 20, short_description='Short',
+            )
+
+    def test_cached_payload_is_compressed_once(self):
+        url = reverse('service-list')
+        plain = self.client.get(url)
+        self.assertFalse(plain.has_header('Content-Encoding'))
+
+        with mock.patch('portfolio_project.compression.compress') as compress:
+            response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        compress.assert_not_called()
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertNotEqual(response['ETag'], plain['ETag'])
+
+        not_modified = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+class ServiceSnapshotTestCase(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.service = Service.objects.create(
+            title='Web Development', slug='web-development', description='Websites',
+            short_description='Web', is_featured=True,
+        )
+
+    def read(self, path):
+        with open(os.path.join(self.media_root, path)) as snapshot:
+            return json.load(snapshot)
+
+    def test_publish_writes_hashed_files_and_manifest(self):
+        manifest = publish_snapshots()
+        self.assertEqual(set(manifest['files']), {'list', 'featured', 'services/web-development'})
+        self.assertRegex(manifest['files']['list'], r'^snapshots/list\.[0-9a-f]{12}\.json$')
+        self.assertEqual(self.read('snapshots/manifest.json')['files'], manifest['files'])
+        self.assertEqual(self.read(manifest['files']['services/web-development'])['title'], 'Web Development')
+        self.assertEqual([service['slug'] for service in self.read(manifest['files']['list'])], ['web-development'])
+        self.assertEqual(len(self.read(manifest['files']['featured'])), 1)
+
+    def test_publish_command_writes_snapshots(self):
+        call_command('publish_snapshots', stdout=StringIO())
+        manifest = self.read('snapshots/manifest.json')
+        self.assertEqual(self.read(manifest['files']['list'])[0]['title'], 'Web Development')
+
+    def test_old_snapshots_are_cleaned_up_after_one_version(self):
+        first = publish_snapshots()
+        Service.objects.filter(pk=self.service.pk).update(title='Web Apps')
+        second = publish_snapshots()
+        self.assertIn(first['files']['list'], second['previous'])
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, first['files']['list'])))
+
+        Service.objects.filter(pk=self.service.pk).update(title='Websites')
+        publish_snapshots()
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, first['files']['list'])))
+
+    @override_settings(CACHES=LOCMEM_CACHE, SERVICES_SNAPSHOTS={**settings.SERVICES_SNAPSHOTS, 'ENABLED': True})
+    def test_changes_are_debounced(self):
+        cache.clear()
+        with mock.patch('services.tasks.publish_catalog_snapshots.apply_async') as apply_async:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.service.save()
+            with self.captureOnCommitCallbacks(execute=True):
+                Service.objects.filter(pk=self.service.pk).update(is_featured=False)
+        apply_async.assert_called_once_with(countdown=settings.SERVICES_SNAPSHOTS['DEBOUNCE'])
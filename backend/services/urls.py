@@ -1,11 +1,26 @@
 # services/urls.py
-from django.urls import path, include
+from django.conf import settings
+from django.urls import path, re_path, include
 from rest_framework.routers import DefaultRouter
 from .views import ServiceViewSet
 
 router = DefaultRouter()
 router.register(r'', ServiceViewSet)
 
-urlpatterns = [
+urlpatterns = []
+
+if settings.SERVICES_ASYNC_VIEWS:
+    from . import async_views
+
+    # Take precedence over the router for the hot read endpoints; the
+    # detail pattern must not swallow the other list actions
+    list_actions = '|'.join(action.url_path for action in ServiceViewSet.get_extra_actions() if not action.detail)
+    urlpatterns += [
+        path('', async_views.service_list),
+        path('featured/', async_views.featured_services),
+        re_path(rf'^(?!(?:{list_actions})/$)(?P<slug>[^/.]+)/$', async_views.service_detail),
+    ]
+
+urlpatterns += [
     path('', include(router.urls)),
 ]
@@ -1,10 +1,20 @@
 import logging
-from django.core.cache import cache
-from rest_framework import viewsets, permissions
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from rest_framework import viewsets
 from rest_framework.decorators import action
-from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
+from portfolio_project.compression import negotiate_encoding
+from .cache import (
+    make_key, get_or_refresh, request_variant, render_payload, payload_response,
+    get_catalog_state, get_service_state, get_validators, conditional_response, set_validators,
+)
+from .exporters import ASYNC_EXPORTERS, EXPORTERS, CSVRenderer, NDJSONRenderer, aiter_services, iter_services
 from .models import Service
-from .serializers import ServiceSerializer, ServiceDetailSerializer
+from .replay import describe_request
+from .serializers import ServiceSerializer, ServiceDetailSerializer, ServiceSearchSerializer, get_requested_fields
+from .tasks import refresh_cached_response
 
 logger = logging.getLogger('portfolio')
 
@@ -12,45 +22,195 @@ class ServiceViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Service.objects.all()
     serializer_class = ServiceSerializer
     lookup_field = 'slug'
-    
+
     def get_serializer_class(self):
         if self.action == 'retrieve':
             return ServiceDetailSerializer
+        if self.action == 'search':
+            return ServiceSearchSerializer
         return ServiceSerializer
-    
+
+    def get_fieldset(self):
+        """Serializer fields selected with ``?fields=`` / ``?omit=``, or ``None``"""
+        return get_requested_fields(self.request, self.get_serializer_class().Meta.fields)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fieldset = self.get_fieldset()
+        if fieldset is None:
+            return queryset
+
+        # Only fetch the columns behind the selected fields, plus those
+        # needed for lookups and ordering, so large text columns stay in
+        # the database
+        model_fields = {field.name for field in Service._meta.concrete_fields}
+        sources = {
+            field.source.split('.')[0]
+            for field in self.get_serializer().fields.values()
+            if field.source != '*'
+        }
+        required = {'id', self.lookup_field} | {name.lstrip('-') for name in Service._meta.ordering}
+        return queryset.only(*(required | (sources & model_fields)))
+
+    def filter_queryset(self, queryset):
+        """
+        Filter listings by feature, e.g. ``?features_all=Django&features_all=React``
+        for services with both features or ``?features_any=...`` for either.
+        """
+        queryset = super().filter_queryset(queryset)
+        if self.action not in ('list', 'search', 'feature_counts'):
+            return queryset
+        return queryset.with_features(
+            all_of=self.request.query_params.getlist('features_all'),
+            any_of=self.request.query_params.getlist('features_any'),
+        )
+
+    @property
+    def refreshing_cache(self):
+        """True when the request is a background refresh of a cached entry"""
+        return getattr(self.request, 'refresh_cache', False)
+
+    def get_throttles(self):
+        # Background refreshes and warmups replay requests internally
+        if getattr(self.request, 'replayed', False):
+            return []
+        return super().get_throttles()
+
+    def cached_response(self, name, build, state=None, include_query=False):
+        """
+        Serve the encoded response body for ``name`` from the cache.
+
+        On a miss ``build`` returns the response data, which is rendered
+        once and cached as bytes, so hits skip serialization entirely.
+        When ``state`` is given the response carries ETag/Last-Modified
+        validators and matching conditional requests get a 304 before the
+        body is even looked up. Expired entries are served stale while a
+        single worker refreshes them (see ``get_or_refresh``).
+        """
+        variant = request_variant(self.request, include_query, fieldset=self.get_fieldset())
+        encoding = negotiate_encoding(self.request)
+
+        if state is not None:
+            etag, last_modified = get_validators(state, variant, encoding)
+            if not self.refreshing_cache:
+                not_modified = conditional_response(self.request, etag, last_modified)
+                if not_modified is not None:
+                    return not_modified
+
+        cache_key = make_key(f'{name}:{variant}')
+        entry = get_or_refresh(
+            cache_key,
+            lambda: render_payload(build(), self.request, self.get_renderer_context()),
+            schedule_refresh=self.get_refresh_scheduler(),
+            force=self.refreshing_cache,
+        )
+
+        response = payload_response(entry, encoding)
+        if state is not None:
+            set_validators(response, etag, last_modified)
+        return response
+
+    def get_refresh_scheduler(self):
+        """Return a callable that refreshes the current response in Celery, if enabled"""
+        if settings.SERVICES_CACHE['REFRESH'] != 'celery':
+            return None
+
+        def schedule():
+            refresh_cached_response.delay(describe_request(self.request))
+
+        return schedule
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(
+            'services_list',
+            lambda: super(ServiceViewSet, self).list(request, *args, **kwargs).data,
+            state=get_catalog_state(self.queryset),
+            include_query=True,
+        )
+
     def retrieve(self, request, *args, **kwargs):
+        def build():
+            serializer = self.get_serializer(self.get_object())
+            return serializer.data
+
         slug = kwargs.get('slug')
-        service = cache.get(f'service_{slug}')
-        
-        if service is None:
-            instance = self.get_object()
-            serializer = self.get_serializer(instance)
-            service = serializer.data
-            cache.set(f'service_{slug}', service, 3600)  # Cache for 1 hour
-            
-        return Response(service)
-    
+        return self.cached_response(
+            f'service_{slug}',
+            build,
+            state=get_service_state(self.queryset, slug),
+        )
+
     @action(detail=False)
     def featured(self, request):
-        featured_services = cache.get('featured_services')
-        
-        if featured_services is None:
-            queryset = self.queryset.filter(is_featured=True)
+        def build():
+            queryset = self.get_queryset().filter(is_featured=True)
             serializer = self.get_serializer(queryset, many=True)
-            featured_services = serializer.data
-            cache.set('featured_services', featured_services, 3600)  # Cache for 1 hour
-            
-        return Response(featured_services)
-    
-    @action(detail=False, url_path='category/(?P<category_slug>[^/.]+)')
-    def by_category(self, request, category_slug=None):
-        cache_key = f'category_services_{category_slug}'
-        services = cache.get(cache_key)
-        
-        if services is None:
-            queryset = self.queryset.filter(category__slug=category_slug)
-            serializer = self.get_serializer(queryset, many=True)
-            services = serializer.data
-            cache.set(cache_key, services, 3600)  # Cache for 1 hour
-            
-        return Response(services)
+            return serializer.data
+
+        return self.cached_response(
+            'featured_services',
+            build,
+            state=get_catalog_state(self.queryset),
+        )
+
+    @action(detail=False)
+    def search(self, request):
+        """
+        Ranked full-text search with prefix matching, e.g. ``?q=web dev``.
+
+        Results carry a ``rank`` and a ``headline`` snippet of the
+        description with matches wrapped in ``<mark>`` tags.
+        """
+        terms = request.query_params.get('q', '').strip()
+        if not terms:
+            raise ValidationError({'q': 'This query parameter is required.'})
+
+        def build():
+            queryset = self.filter_queryset(self.get_queryset()).search(terms, headline=True)
+            page = self.paginate_queryset(queryset)
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data).data
+
+        return self.cached_response(
+            'services_search',
+            build,
+            state=get_catalog_state(self.queryset),
+            include_query=True,
+        )
+
+    @action(detail=False, url_path='features')
+    def feature_counts(self, request):
+        """
+        Every feature with the number of services that have it, most
+        common first. Accepts the same feature filters as the list, so
+        clients can show the counts left after a selection.
+        """
+        def build():
+            queryset = self.filter_queryset(Service.objects.all())
+            return [{'feature': feature, 'count': count} for feature, count in queryset.feature_counts()]
+
+        return self.cached_response(
+            'services_feature_counts',
+            build,
+            state=get_catalog_state(self.queryset),
+            include_query=True,
+        )
+
+    @action(detail=False, renderer_classes=[NDJSONRenderer, CSVRenderer])
+    def export(self, request):
+        """
+        Stream the whole catalog as NDJSON (default) or CSV, chosen with
+        ``Accept`` or ``?format=csv``, in a single response.
+        """
+        fmt = request.accepted_renderer.format
+        if isinstance(request._request, ASGIRequest):
+            # ASGI servers would buffer a sync iterator whole
+            content = ASYNC_EXPORTERS[fmt](aiter_services())
+        else:
+            content = EXPORTERS[fmt](iter_services())
+        response = StreamingHttpResponse(
+            content,
+            content_type=f'{request.accepted_renderer.media_type}; charset=utf-8',
+        )
+        response['Content-Disposition'] = f'attachment; filename="services.{fmt}"'
+        return response
@@ -0,0 +1,139 @@
+"""
+Cache warmup for the services API.
+
+Replays the hottest read requests (featured services, the first list pages
+and every detail page) through the regular views, so the cache holds
+exactly the payloads live traffic will ask for. Requests run on a few
+threads and stop when the time budget runs out; whatever was not warmed
+is filled by the first real request as usual.
+"""
+import logging
+import math
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.urls import reverse
+
+from .models import Service
+from .replay import replay_request
+
+logger = logging.getLogger('portfolio')
+
+WARMUP_LOCK_KEY = 'services:warmup:lock'
+
+
+@dataclass
+class WarmupReport:
+    # (path, host, status code or None on error, seconds)
+    timings: list = field(default_factory=list)
+    skipped: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def warmed(self):
+        return sum(1 for _, _, status, _ in self.timings if status is not None and status < 400)
+
+    @property
+    def failed(self):
+        return len(self.timings) - self.warmed
+
+    def percentile(self, fraction):
+        durations = sorted(seconds for *_, seconds in self.timings)
+        if not durations:
+            return 0.0
+        return durations[min(len(durations) - 1, math.ceil(fraction * len(durations)) - 1)]
+
+    def summary(self):
+        return (
+            f'Warmed {self.warmed} responses in {self.elapsed:.2f}s '
+            f'({self.failed} failed, {self.skipped} skipped over budget; '
+            f'p50 {self.percentile(0.5) * 1000:.0f}ms, max {self.percentile(1.0) * 1000:.0f}ms)'
+        )
+
+
+def warmup_paths(list_pages=None):
+    """Return the paths to warm, most requested first"""
+    if list_pages is None:
+        list_pages = settings.SERVICES_WARMUP['LIST_PAGES']
+
+    list_path = reverse('service-list')
+    page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    slugs = list(Service.objects.values_list('slug', flat=True))
+    page_count = min(list_pages, max(1, math.ceil(len(slugs) / page_size)))
+
+    paths = [reverse('service-featured'), list_path]
+    # Clients request the first page without ?page=, which is a separate
+    # cache entry from ?page=1
+    paths += [f'{list_path}?page={page}' for page in range(2, page_count + 1)]
+    paths += [reverse('service-detail', kwargs={'slug': slug}) for slug in slugs]
+    return paths
+
+
+def warm_service_caches(hosts=None, list_pages=None, threads=None, budget=None, force=False):
+    """
+    Precompute cached service responses for every host and return a
+    ``WarmupReport``. Existing fresh entries are kept unless ``force``.
+    """
+    options = settings.SERVICES_WARMUP
+    hosts = hosts or options['HOSTS']
+    threads = threads or options['THREADS']
+    budget = budget if budget is not None else options['BUDGET']
+
+    started = time.monotonic()
+    deadline = started + budget
+    report = WarmupReport()
+    lock = threading.Lock()
+
+    jobs = queue.Queue()
+    for path in warmup_paths(list_pages):
+        for host in hosts:
+            jobs.put((path, host))
+
+    def work():
+        try:
+            while time.monotonic() < deadline:
+                try:
+                    path, host = jobs.get_nowait()
+                except queue.Empty:
+                    return
+                request_started = time.monotonic()
+                try:
+                    response = replay_request(path, host, secure=options['SECURE'], refresh=force)
+                    status = response.status_code
+                except Exception as e:
+                    logger.warning(f"Cache warmup failed for {host}{path}: {str(e)}")
+                    status = None
+                with lock:
+                    report.timings.append((path, host, status, time.monotonic() - request_started))
+        finally:
+            # Each thread opened its own database connection
+            connections.close_all()
+
+    workers = [threading.Thread(target=work, name=f'cache-warmup-{i}', daemon=True) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    report.skipped = jobs.qsize()
+    report.elapsed = time.monotonic() - started
+    logger.info(report.summary())
+    return report
+
+
+def warm_once(**kwargs):
+    """
+    Run the warmup unless another process sharing the cache is already
+    doing it. With a per-process cache such as LocMem the lock is local
+    too, so every process warms its own cache.
+    """
+    budget = kwargs.get('budget', settings.SERVICES_WARMUP['BUDGET'])
+    if not cache.add(WARMUP_LOCK_KEY, True, timeout=budget):
+        logger.info("Cache warmup already running elsewhere, skipping")
+        return None
+    return warm_service_caches(**kwargs)